@@ -2,16 +2,28 @@
 Data Extraction Agent - Executes SQL queries and retrieves data
 """
 import pandas as pd
-from typing import Any, Dict
+from typing import Any, Dict, List
+from config import settings
 from utils.data_layer import get_data_layer
+from utils.arrow_results import (
+    ArrowQueryResult,
+    column_summary,
+    head_records,
+    numeric_columns
+)
 from agents.query_agent import AgentState
 
 
 class DataExtractionAgent:
     """Agent that executes SQL queries and extracts data"""
     
-    def __init__(self):
+    def __init__(self, result_format: str = None, stream_threshold_rows: int = None):
         self.data_layer = get_data_layer()
+        self.result_format = result_format or settings.result_format
+        self.stream_threshold_rows = (
+            settings.stream_threshold_rows if stream_threshold_rows is None else stream_threshold_rows
+        )
+        self.preview_rows = 1000  # Rows of a streamed result kept in memory for validation and display
     
     def extract_data(self, state: AgentState) -> Dict[str, Any]:
         """
@@ -37,8 +49,15 @@ class DataExtractionAgent:
             
             print(f"🔍 Executing SQL: {sql_query}")
             
-            # Execute query
-            result_df = self.data_layer.execute_query(sql_query)
+            # Execute query; oversized results come back as a lazy handle
+            result, handle = self._execute(sql_query)
+            if handle is not None:
+                return self._extract_streaming(state, handle)
+            
+            if self.result_format == "arrow":
+                return self._extract_arrow(state, result)
+            
+            result_df = result
             
             # Convert to dict for easier handling
             result_data = {
@@ -67,6 +86,94 @@ class DataExtractionAgent:
                 "error": error_msg
             }
     
+    def _execute(self, sql_query: str):
+        """Run the query in the configured format, streaming results above the row threshold"""
+        if self.stream_threshold_rows > 0:
+            return self.data_layer.execute_bounded(sql_query, self.stream_threshold_rows, self.result_format)
+        if self.result_format == "arrow":
+            return self.data_layer.execute_arrow(sql_query), None
+        return self.data_layer.execute_query(sql_query), None
+    
+    def _extract_arrow(self, state: AgentState, table) -> Dict[str, Any]:
+        """Package a pyarrow.Table result; pandas is only built if a consumer asks for it"""
+        result_data = ArrowQueryResult(
+            table=table,
+            row_count=table.num_rows,
+            columns=table.column_names,
+            data=head_records(table, 100),
+            summary=self._generate_arrow_summary(table)
+        )
+        
+        print(f"✅ Query executed successfully. Retrieved {table.num_rows} rows.")
+        
+        return {
+            **state,
+            "query_result": result_data,
+            "error": None
+        }
+    
+    def _extract_streaming(self, state: AgentState, handle) -> Dict[str, Any]:
+        """
+        Package a large result without materializing it
+        
+        Only a preview is held in memory; totals and numeric statistics are
+        computed by DuckDB over the full result.
+        """
+        preview = handle.head(self.preview_rows)
+        column_stats = handle.numeric_summary()
+        row_count = handle.row_count
+        
+        result_data = ArrowQueryResult(
+            table=preview,
+            result_handle=handle,
+            truncated=True,
+            row_count=row_count,
+            columns=handle.columns,
+            column_stats=column_stats,
+            data=head_records(preview, 100),
+            summary=self._generate_streaming_summary(row_count, handle.columns, column_stats, preview.num_rows)
+        )
+        
+        print(f"✅ Query executed successfully. Streaming {row_count} rows ({preview.num_rows} held in memory).")
+        
+        return {
+            **state,
+            "query_result": result_data,
+            "error": None
+        }
+    
+    def _generate_streaming_summary(self, row_count: int, columns: List[str],
+                                    column_stats: Dict[str, Dict[str, Any]], preview_rows: int) -> str:
+        """Generate a summary of a streamed result from DuckDB-computed statistics"""
+        summary = f"Retrieved {row_count} records with {len(columns)} columns (first {preview_rows} rows kept in memory).\n"
+        
+        if column_stats:
+            summary += "Numeric summaries:\n"
+            for col, stats in list(column_stats.items())[:5]:  # Limit to first 5 numeric columns
+                if not stats["count"]:
+                    continue
+                summary += f"  - {col}: min={stats['min']:.2f}, max={stats['max']:.2f}, mean={stats['mean']:.2f}\n"
+        
+        return summary
+    
+    def _generate_arrow_summary(self, table) -> str:
+        """Generate the same summary as _generate_summary from an Arrow table"""
+        if table.num_rows == 0:
+            return "No data found."
+        
+        summary = f"Retrieved {table.num_rows} records with {table.num_columns} columns.\n"
+        
+        numeric_cols = numeric_columns(table)
+        if len(numeric_cols) > 0:
+            summary += "Numeric summaries:\n"
+            for col in numeric_cols[:5]:  # Limit to first 5 numeric columns
+                stats = column_summary(table[col])
+                if stats["count"] == 0:
+                    continue
+                summary += f"  - {col}: min={stats['min']:.2f}, max={stats['max']:.2f}, mean={stats['mean']:.2f}\n"
+        
+        return summary
+    
     def _generate_summary(self, df: pd.DataFrame) -> str:
         """Generate a brief summary of the results"""
         if df.empty:
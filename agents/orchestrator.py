@@ -3,7 +3,8 @@ Agent Orchestrator using LangGraph
 Coordinates multiple agents with enhanced memory, edge case handling, 
 hallucination prevention, and evaluation
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
+from langchain_core.messages import AIMessageChunk
 from langgraph.graph import StateGraph, END
 from agents.query_agent import QueryResolutionAgent, AgentState
 from agents.extraction_agent import DataExtractionAgent
@@ -31,7 +32,8 @@ class AgentOrchestrator:
         # Initialize core agents
         self.query_agent = QueryResolutionAgent()
         self.extraction_agent = DataExtractionAgent()
-        self.validation_agent = ValidationAgent()
+        # Validation checks results against the profile of the data the extraction agent queries
+        self.validation_agent = ValidationAgent(data_layer=self.extraction_agent.data_layer)
         self.response_agent = ResponseAgent()
         self.router_agent = RouterAgent()
         
@@ -253,13 +255,16 @@ class AgentOrchestrator:
         """Node: Extract verifiable facts from data for grounded response"""
         print("\n[INFO] Fact Extraction")
         
-        query_result = state.get("query_result", {})
-        df = query_result.get("dataframe")
+        query_result = state.get("query_result") or {}
+        df = self._result_data(query_result)
         query_intent = state.get("query_intent")
         
         facts = []
-        if df is not None and not df.empty:
-            facts = self.fact_extractor.extract_facts(df, query_intent)
+        if df is not None and len(df) > 0:
+            # Streamed results carry full-result statistics; df is then only a preview
+            facts = self.fact_extractor.extract_facts(
+                df, query_intent, column_stats=query_result.get("column_stats")
+            )
             print(f"   [INFO] Extracted {len(facts)} verifiable facts")
         
         return {
@@ -314,8 +319,8 @@ class AgentOrchestrator:
         
         # Run evaluation
         if self.evaluation and state.get("final_answer"):
-            query_result = state.get("query_result", {})
-            df = query_result.get("dataframe")
+            query_result = state.get("query_result") or {}
+            df = self._result_data(query_result)
             
             if df is not None:
                 eval_result = self.evaluation.evaluate_response(
@@ -329,6 +334,14 @@ class AgentOrchestrator:
         
         return state
     
+    @staticmethod
+    def _result_data(query_result: Dict[str, Any]):
+        """Result rows as the Arrow table when present, so pandas is never built just for scoring"""
+        table = query_result.get("table")
+        if table is not None:
+            return table
+        return query_result.get("dataframe")
+    
     def _handle_error_node(self, state: AgentState) -> Dict[str, Any]:
         """Node: Handle errors gracefully with helpful suggestions"""
         print("\n[ERROR] Error Handler")
@@ -414,23 +427,8 @@ class AgentOrchestrator:
             print(f"INFO: Question: {question}")
             print(f"{'='*80}")
             
-            # Initialize state with new fields
-            initial_state = AgentState(
-                question=question,
-                query_intent=None,
-                query_result=None,
-                validation_passed=False,
-                final_answer="",
-                error=None,
-                confidence_scores=None,
-                conversation_context=None,
-                edge_case_handled=None,
-                facts=None,
-                report_content=report_content
-            )
-            
             # Run the graph
-            final_state = self.graph.invoke(initial_state)
+            final_state = self.graph.invoke(self._initial_state(question, report_content))
             
             print(f"\n{'='*80}")
             print("INFO: Processing Complete")
@@ -443,6 +441,74 @@ class AgentOrchestrator:
             print(f"❌ {error_msg}")
             return f"I encountered an unexpected error: {error_msg}"
     
+    def stream_query(self, question: str, report_content: Optional[str] = None) -> Iterator[str]:
+        """
+        Process a question like process_query, yielding the answer as it is written
+        
+        The response node's LLM tokens are streamed as they arrive; whatever the
+        later steps add (grounding notes) follows once the graph finishes.
+        Answers that involve no LLM response (greetings, edge cases, errors)
+        arrive in one piece. The yielded text joins to process_query's answer.
+        
+        Args:
+            question: User's natural language question
+            report_content: Optional report text to ground the answer in
+            
+        Yields:
+            Consecutive pieces of the final answer
+        """
+        streamed = ""
+        try:
+            print(f"\n{'='*80}")
+            print(f"INFO: Question (streaming): {question}")
+            print(f"{'='*80}")
+            
+            final_state = None
+            for mode, data in self.graph.stream(self._initial_state(question, report_content),
+                                                stream_mode=["messages", "values"]):
+                if mode == "values":
+                    final_state = data
+                    continue
+                chunk, metadata = data
+                if (metadata.get("langgraph_node") == "generate_response"
+                        and isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content):
+                    streamed += chunk.content
+                    yield chunk.content
+            
+            print(f"\n{'='*80}")
+            print("INFO: Processing Complete")
+            print(f"{'='*80}\n")
+            answer = final_state["final_answer"] if final_state else ""
+        except Exception as e:
+            error_msg = f"Orchestrator error: {str(e)}"
+            print(f"❌ {error_msg}")
+            answer = f"I encountered an unexpected error: {error_msg}"
+        
+        if answer.startswith(streamed):
+            remainder = answer[len(streamed):]
+        else:
+            # The node replaced what was streamed (e.g. the LLM failed mid-answer)
+            remainder = "\n\n" + answer
+        if remainder:
+            yield remainder
+    
+    @staticmethod
+    def _initial_state(question: str, report_content: Optional[str]) -> AgentState:
+        """Initialize state with new fields"""
+        return AgentState(
+            question=question,
+            query_intent=None,
+            query_result=None,
+            validation_passed=False,
+            final_answer="",
+            error=None,
+            confidence_scores=None,
+            conversation_context=None,
+            edge_case_handled=None,
+            facts=None,
+            report_content=report_content
+        )
+    
     def get_conversation_summary(self) -> Dict[str, Any]:
         """Get summary of current conversation session"""
         if self.memory:
@@ -11,7 +11,7 @@ try:
 except ImportError:
     from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from utils.llm_utils import get_llm, create_prompt_template
+from utils.llm_utils import get_chain, get_llm, create_prompt_template
 
 
 class QueryIntent(BaseModel):
@@ -28,6 +28,17 @@ class QueryResolutionAgent:
     def __init__(self):
         self.llm = get_llm(temperature=0.1)
         self.parser = PydanticOutputParser(pydantic_object=QueryIntent)
+        # Schema and format instructions never change, so they are bound into
+        # the prompt once and the compiled chain is shared by every agent instance
+        self.chain = get_chain("query_resolution", self.llm, self._build_chain)
+    
+    def _build_chain(self, llm):
+        """Compile prompt | llm | parser with the fixed prompt variables filled in"""
+        prompt = self.create_prompt().partial(
+            schema=self.get_schema_context(),
+            format_instructions=self.parser.get_format_instructions()
+        )
+        return prompt | llm | self.parser
         
     def get_schema_context(self) -> str:
         """Return Amazon sales database schema information"""
@@ -157,20 +168,12 @@ User Question: {question}
             QueryIntent with SQL query and metadata
         """
         try:
-            prompt = self.create_prompt()
-            
             # Include context if available
             full_question = question
             if context:
                 full_question = f"{context}\n\nCurrent question: {question}"
             
-            chain = prompt | self.llm | self.parser
-            
-            result = chain.invoke({
-                "question": full_question,
-                "schema": self.get_schema_context(),
-                "format_instructions": self.parser.get_format_instructions()
-            })
+            result = self.chain.invoke({"question": full_question})
             
             return result
             
@@ -211,22 +214,14 @@ User Question: {question}
                         error_context += f"{i}. {err}\n"
                     error_context += "\nPlease avoid these mistakes in your SQL query."
                 
-                # Get the prompt with error context
-                prompt = self.create_prompt()
-                
+                # Add the error context to the question
                 full_question = question
                 if context:
                     full_question = f"{context}\n\nCurrent question: {question}"
                 if error_context:
                     full_question += error_context
                 
-                chain = prompt | self.llm | self.parser
-                
-                result = chain.invoke({
-                    "question": full_question,
-                    "schema": self.get_schema_context(),
-                    "format_instructions": self.parser.get_format_instructions()
-                })
+                result = self.chain.invoke({"question": full_question})
                 
                 # Validate the generated SQL syntax
                 validation_result = self._validate_sql_syntax(result.sql_query)
@@ -1,13 +1,14 @@
 """
 Response Generation Agent - Creates human-readable responses
 """
-from typing import Dict, Any
+from typing import Dict, Any, List
 try:
     from langchain_core.prompts import ChatPromptTemplate
 except ImportError:
     from langchain.prompts import ChatPromptTemplate
 from agents.query_agent import AgentState
-from utils.llm_utils import get_llm, create_prompt_template
+from utils.llm_utils import get_chain, get_llm, create_prompt_template
+from utils.arrow_results import column_summary, numeric_columns
 import pandas as pd
 
 
@@ -16,6 +17,7 @@ class ResponseAgent:
     
     def __init__(self):
         self.llm = get_llm(temperature=0.3)  # Slightly higher for more natural responses
+        self.chain = get_chain("response", self.llm, self._build_chain)
     
     def generate_response(self, state: AgentState) -> Dict[str, Any]:
         """
@@ -55,11 +57,38 @@ class ResponseAgent:
             # Debug: Print what we are sending to LLM
             print(f"\n--- DEBUG: DATA SENT TO LLM ---\n{data_summary}\n-------------------------------\n")
             
-            # Create prompt
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", create_prompt_template(
-                    "Retail Analytics Response Specialist",
-                    """You provide clear, insightful answers to business questions about retail sales data.
+            response = self.chain.invoke({
+                "question": question,
+                "explanation": query_intent.explanation if query_intent else "N/A",
+                "sql_query": sql_query,
+                "data_summary": data_summary,
+                "report_content": state.get("report_content", "No additional report context provided.")
+            })
+            
+            final_answer = response.content
+            
+            print(f"✅ Response generated successfully")
+            
+            return {
+                **state,
+                "final_answer": final_answer
+            }
+            
+        except Exception as e:
+            error_msg = f"Response generation error: {str(e)}"
+            print(f"❌ {error_msg}")
+            
+            return {
+                **state,
+                "final_answer": f"I encountered an error generating the response: {error_msg}"
+            }
+    
+    def _build_chain(self, llm):
+        """Compile the response prompt | llm"""
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", create_prompt_template(
+                "Retail Analytics Response Specialist",
+                """You provide clear, insightful answers to business questions about retail sales data.
                     
 Your responses should:
 1. Directly answer the user's question.
@@ -73,8 +102,8 @@ Your responses should:
 If the data shows trends, explain what they mean for the business.
 If comparing values, clearly state the differences and their significance.
 """
-                )),
-                ("user", """
+            )),
+            ("user", """
 Original Question: {question}
 
 Query Explanation: {explanation}
@@ -93,54 +122,27 @@ Please provide a clear, business-focused answer to the original question.
 - If the user asked for the SQL query, include it in your response in a code block.
 - Synthesize information from both the Database and the Additional Report Context if both are relevant.
 """)
-            ])
-            
-            chain = prompt | self.llm
-            
-            response = chain.invoke({
-                "question": question,
-                "explanation": query_intent.explanation if query_intent else "N/A",
-                "sql_query": sql_query,
-                "data_summary": data_summary,
-                "report_content": state.get("report_content", "No additional report context provided.")
-            })
-            
-            final_answer = response.content
-            
-            print(f"✅ Response generated successfully")
-            
-            return {
-                **state,
-                "final_answer": final_answer
-            }
-            
-        except Exception as e:
-            error_msg = f"Response generation error: {str(e)}"
-            print(f"❌ {error_msg}")
-            
-            return {
-                **state,
-                "final_answer": f"I encountered an error generating the response: {error_msg}"
-            }
+        ])
+        
+        return prompt | llm
     
     def _format_results(self, query_result: Dict[str, Any]) -> str:
         """Format query results for LLM consumption - optimized for data visibility"""
+        if query_result.get("table") is not None:
+            if query_result.get("truncated"):
+                return self._format_arrow_results(
+                    query_result["table"],
+                    total_rows=query_result.get("row_count"),
+                    column_stats=query_result.get("column_stats")
+                )
+            return self._format_arrow_results(query_result["table"])
+        
         df = query_result.get("dataframe")
         
         if df is None or df.empty:
             return "No data found matching the query criteria."
         
-        # Determine which columns to show. 
-        # For analytical queries, we usually have few columns, so show them all.
-        # If there are too many columns (>15), prioritize important ones.
-        if len(df.columns) <= 15:
-            display_cols = df.columns.tolist()
-        else:
-            important_patterns = ['id', 'date', 'category', 'status', 'revenue', 'profit', 'amount', 'total', 'count', 'sum', 'avg']
-            display_cols = [c for c in df.columns if any(p in c.lower() for p in important_patterns)]
-            # Ensure we at least have some columns
-            if not display_cols:
-                display_cols = df.columns[:10].tolist()
+        display_cols = self._display_columns(df.columns.tolist())
         
         # Use subset of columns
         df_subset = df[display_cols]
@@ -164,3 +166,56 @@ Please provide a clear, business-focused answer to the original question.
             formatted += f"\n\n(Showing 10 of {len(df)} total records)"
         
         return formatted
+    
+    def _display_columns(self, columns: List[str]) -> List[str]:
+        """Pick the columns shown to the LLM"""
+        # For analytical queries, we usually have few columns, so show them all.
+        # If there are too many columns (>15), prioritize important ones.
+        if len(columns) <= 15:
+            return columns
+        important_patterns = ['id', 'date', 'category', 'status', 'revenue', 'profit', 'amount', 'total', 'count', 'sum', 'avg']
+        display_cols = [c for c in columns if any(p in c.lower() for p in important_patterns)]
+        # Ensure we at least have some columns
+        return display_cols or columns[:10]
+    
+    def _format_arrow_results(self, table, total_rows: int = None,
+                              column_stats: Dict[str, Dict[str, Any]] = None) -> str:
+        """
+        Format an Arrow result, converting only the rows that are printed
+        
+        For streamed results, table is a preview and total_rows/column_stats
+        describe the full result.
+        """
+        if table.num_rows == 0:
+            return "No data found matching the query criteria."
+        
+        total_rows = total_rows if total_rows is not None else table.num_rows
+        display_cols = self._display_columns(table.column_names)
+        
+        formatted = f"Results: {total_rows} records, {table.num_columns} columns\n"
+        formatted += f"Columns shown: {', '.join(display_cols)}\n\n"
+        
+        # If small dataset, show all rows
+        if total_rows <= 20:
+            formatted += table.select(display_cols).to_pandas().to_string(index=False)
+            return formatted
+        
+        # Show summary statistics for numeric columns
+        stats = column_stats
+        if stats is None:
+            stats = {col: column_summary(table[col]) for col in numeric_columns(table)}
+        stats = {col: s for col, s in stats.items() if s["count"]}
+        if stats:
+            stats_df = pd.DataFrame(
+                {col: [s["mean"], s["min"], s["max"], s["sum"]] for col, s in stats.items()},
+                index=['mean', 'min', 'max', 'sum']
+            )
+            formatted += "Summary Statistics (All Records):\n"
+            formatted += stats_df.to_string()
+            formatted += "\n\n"
+        
+        formatted += f"Sample Data (first 10 rows):\n"
+        formatted += table.select(display_cols).slice(0, 10).to_pandas().to_string(index=False)
+        formatted += f"\n\n(Showing 10 of {total_rows} total records)"
+        
+        return formatted
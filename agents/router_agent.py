@@ -4,7 +4,7 @@ Categories: analytics, greeting, out_of_scope, appreciation
 """
 from typing import Dict, Any, List
 import re
-from utils.llm_utils import get_llm
+from utils.llm_utils import get_chain, get_llm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
@@ -18,8 +18,11 @@ class RouterAgent:
     def __init__(self):
         self.llm = get_llm(temperature=0)
         self.parser = JsonOutputParser(pydantic_object=IntentClassification)
-        
-        self.prompt = ChatPromptTemplate.from_messages([
+        self.chain = get_chain("router", self.llm, self._build_chain)
+    
+    def _build_chain(self, llm):
+        """Compile the classification prompt | llm | parser"""
+        prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a specialized router and conversational guardrail for a Retail Insights Assistant.
 Classify the user's input into one of these categories:
 1. analytics: Questions about sales, revenue, products, orders, or customers. This includes requests for SQL queries or data synthesis from reports.
@@ -40,7 +43,7 @@ Return ONLY a JSON object."""),
             ("user", "{input}")
         ])
         
-        self.chain = self.prompt | self.llm | self.parser
+        return prompt | llm | self.parser
 
     def classify(self, question: str, report_content: str = None) -> Dict[str, Any]:
         """Classify user intent using LLM"""
@@ -1,11 +1,13 @@
 """
 Validation Agent - Validates query results and data quality with confidence scoring
 """
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass
 from agents.query_agent import AgentState
+from utils.arrow_results import ResultColumns
+from utils.data_profile import DataProfile, range_warnings
 
 
 @dataclass
@@ -28,13 +30,14 @@ class ConfidenceScorer:
         Calculate confidence scores for the result
         
         Args:
-            df: Query result DataFrame
+            df: Query result DataFrame or pyarrow.Table
             query_intent: The original query intent
             
         Returns:
             Dictionary of confidence scores
         """
-        if df is None or df.empty:
+        columns = None if df is None else ResultColumns(df)
+        if columns is None or columns.empty:
             return {
                 "data_quality": 0.5,  # Empty might be valid
                 "completeness": 0.0,
@@ -42,9 +45,10 @@ class ConfidenceScorer:
                 "overall": 0.3
             }
         
-        data_quality = self._score_data_quality(df)
-        completeness = self._score_completeness(df)
-        consistency = self._score_consistency(df)
+        stats = {col: columns.summary(col) for col in columns.numeric()}
+        data_quality = self._score_data_quality(columns, stats)
+        completeness = self._score_completeness(columns)
+        consistency = self._score_consistency(stats)
         
         # Weighted overall score
         overall = (
@@ -60,69 +64,56 @@ class ConfidenceScorer:
             "overall": overall
         }
     
-    def _score_data_quality(self, df: pd.DataFrame) -> float:
+    @staticmethod
+    def _null_ratio(columns: ResultColumns) -> float:
+        return sum(columns.null_counts().values()) / (columns.num_rows * len(columns.names))
+    
+    def _score_data_quality(self, columns: ResultColumns, stats: Dict[str, Dict]) -> float:
         """Score based on data quality metrics"""
         score = 1.0
         
         # Penalize for null values
-        null_ratio = df.isnull().sum().sum() / (len(df) * len(df.columns))
-        score -= null_ratio * 0.5
+        score -= self._null_ratio(columns) * 0.5
         
         # Penalize for suspicious patterns
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        for col in numeric_cols:
+        for col, col_stats in stats.items():
             # Check for negative values in typically positive columns
             if col in ['revenue', 'quantity', 'amount', 'orders']:
-                if (df[col] < 0).any():
+                if col_stats["min"] is not None and col_stats["min"] < 0:
                     score -= 0.1
             
             # Check for extreme outliers (>5 std from mean)
-            if len(df[col].dropna()) > 10:
-                mean = df[col].mean()
-                std = df[col].std()
-                if std > 0:
-                    outliers = ((df[col] - mean).abs() > 5 * std).sum()
-                    if outliers > 0:
-                        score -= 0.05 * min(outliers, 5)
+            if col_stats["count"] > 10 and col_stats["std"]:
+                mean, std = col_stats["mean"], col_stats["std"]
+                outliers = columns.count_outside(col, mean - 5 * std, mean + 5 * std)
+                if outliers > 0:
+                    score -= 0.05 * min(outliers, 5)
         
         return max(0.0, min(1.0, score))
     
-    def _score_completeness(self, df: pd.DataFrame) -> float:
+    def _score_completeness(self, columns: ResultColumns) -> float:
         """Score based on data completeness"""
-        if df.empty:
-            return 0.0
-        
         # Calculate non-null ratio
-        non_null_ratio = 1 - (df.isnull().sum().sum() / (len(df) * len(df.columns)))
+        non_null_ratio = 1 - self._null_ratio(columns)
         
         # Bonus for having expected columns
         expected_cols = ['revenue', 'orders', 'count', 'total', 'sum', 'avg']
-        col_names_lower = [c.lower() for c in df.columns]
+        col_names_lower = [c.lower() for c in columns.names]
         has_expected = sum(1 for e in expected_cols if any(e in c for c in col_names_lower))
         expected_bonus = min(has_expected * 0.1, 0.2)
         
         return min(1.0, non_null_ratio + expected_bonus)
     
-    def _score_consistency(self, df: pd.DataFrame) -> float:
+    def _score_consistency(self, stats: Dict[str, Dict]) -> float:
         """Score based on data consistency"""
         score = 1.0
         
-        numeric_cols = df.select_dtypes(include=['number']).columns
-        
-        for col in numeric_cols:
-            # Check for consistent data types
-            if df[col].dtype == 'object':
-                score -= 0.1
-            
-            # Check for reasonable value ranges
-            if len(df[col].dropna()) > 0:
-                min_val = df[col].min()
-                max_val = df[col].max()
-                
-                # Very large ranges might indicate issues
-                if max_val > 0 and min_val > 0:
-                    if max_val / min_val > 10000:
-                        score -= 0.1
+        for col_stats in stats.values():
+            # Very large ranges might indicate issues
+            min_val, max_val = col_stats["min"], col_stats["max"]
+            if min_val is not None and max_val > 0 and min_val > 0:
+                if max_val / min_val > 10000:
+                    score -= 0.1
         
         return max(0.0, min(1.0, score))
 
@@ -130,13 +121,29 @@ class ConfidenceScorer:
 class ValidationAgent:
     """Agent that validates query results with enhanced checks and confidence scoring"""
     
-    def __init__(self):
+    def __init__(self, data_profile: Optional[DataProfile] = None, data_layer: Any = None):
+        """
+        Initialize validator
+        
+        Args:
+            data_profile: Profile of the queried data
+            data_layer: DataLayer whose current profile is used when data_profile is not given
+        """
         self.validation_rules = {
             "min_rows": 0,  # Allow empty results
             "max_rows": 1000000,  # Sanity check
             "required_numeric_cols": ["revenue", "profit", "total"],  # At least one of these
         }
         self.confidence_scorer = ConfidenceScorer()
+        self._data_profile = data_profile
+        self.data_layer = data_layer
+    
+    @property
+    def data_profile(self) -> Optional[DataProfile]:
+        """Profile of the data queried now (follows loads and appends of the data layer)"""
+        if self._data_profile is not None or self.data_layer is None:
+            return self._data_profile
+        return self.data_layer.data_profile
     
     def validate(self, state: AgentState) -> Dict[str, Any]:
         """
@@ -167,7 +174,10 @@ class ValidationAgent:
                     "confidence_scores": {"overall": 0.0}
                 }
             
-            df = query_result.get("dataframe")
+            # Prefer the Arrow table so validation never forces a pandas conversion
+            df = query_result.get("table")
+            if df is None:
+                df = query_result.get("dataframe")
             
             if df is None:
                 return {
@@ -203,8 +213,9 @@ class ValidationAgent:
                     print(f"⚠️  Warning: {warning}")
             
             row_count = len(df)
+            column_count = len(ResultColumns(df).names)
             confidence_pct = confidence_scores['overall'] * 100
-            print(f"✅ Validation passed: {row_count} rows, {len(df.columns)} columns, confidence: {confidence_pct:.1f}%")
+            print(f"✅ Validation passed: {row_count} rows, {column_count} columns, confidence: {confidence_pct:.1f}%")
             
             return {
                 **state,
@@ -231,16 +242,18 @@ class ValidationAgent:
         Perform comprehensive validation checks
         
         Args:
-            df: DataFrame to validate
+            df: DataFrame or pyarrow.Table to validate
             query_intent: Query intent for context
             
         Returns:
             ValidationResult with detailed information
         """
+        columns = ResultColumns(df)
         issues = []
         warnings = []
         
-        row_count = len(df)
+        row_count = columns.num_rows
+        column_count = len(columns.names)
         
         # Check 1: Row count bounds
         if row_count > self.validation_rules["max_rows"]:
@@ -251,18 +264,18 @@ class ValidationAgent:
             warnings.append("Query returned no results - this might be expected")
         
         # Check 3: Data type validation
-        numeric_cols = df.select_dtypes(include=['number']).columns
+        numeric_cols = columns.numeric()
         if len(numeric_cols) == 0:
             categorical_cols = ['region', 'category', 'product', 'month', 'quarter', 'state', 'status']
-            if not any(col in df.columns for col in categorical_cols):
+            if not any(col in columns.names for col in categorical_cols):
                 warnings.append("No numeric columns found in result")
         
         # Check 4: Null value analysis
-        null_counts = df.isnull().sum()
-        total_nulls = null_counts.sum()
+        null_counts = columns.null_counts()
+        total_nulls = sum(null_counts.values())
         if total_nulls > 0:
-            null_cols = null_counts[null_counts > 0].index.tolist()
-            null_pct = (total_nulls / (len(df) * len(df.columns))) * 100
+            null_cols = [name for name, count in null_counts.items() if count > 0]
+            null_pct = (total_nulls / (row_count * column_count)) * 100
             if null_pct > 50:
                 issues.append(f"High null ratio: {null_pct:.1f}%")
             elif null_pct > 10:
@@ -271,7 +284,7 @@ class ValidationAgent:
         # Check 5: Negative value validation
         for col in numeric_cols:
             if col.lower() in ['revenue', 'quantity', 'unit_price', 'amount', 'orders', 'count']:
-                neg_count = (df[col] < 0).sum()
+                neg_count = columns.count_outside(col, low=0)
                 if neg_count > 0:
                     if col.lower() in ['revenue', 'quantity', 'amount']:
                         issues.append(f"Negative values in {col}: {neg_count}")
@@ -279,32 +292,36 @@ class ValidationAgent:
                         warnings.append(f"Negative values in {col}: {neg_count}")
         
         # Check 6: Duplicate detection
-        if len(df) > 0:
-            dup_count = df.duplicated().sum()
+        if row_count > 0:
+            dup_count = columns.duplicate_count()
             if dup_count > 0:
-                dup_pct = (dup_count / len(df)) * 100
+                dup_pct = (dup_count / row_count) * 100
                 if dup_pct > 50:
                     warnings.append(f"High duplicate ratio: {dup_pct:.1f}%")
         
         # Check 7: Outlier detection
         for col in numeric_cols:
-            if len(df[col].dropna()) > 10:
-                q1 = df[col].quantile(0.25)
-                q3 = df[col].quantile(0.75)
+            if null_counts[col] < row_count - 10:
+                q1, q3 = columns.quantiles(col, [0.25, 0.75])
                 iqr = q3 - q1
                 if iqr > 0:
-                    outliers = ((df[col] < q1 - 3*iqr) | (df[col] > q3 + 3*iqr)).sum()
-                    if outliers > len(df) * 0.1:
+                    outliers = columns.count_outside(col, q1 - 3 * iqr, q3 + 3 * iqr)
+                    if outliers > row_count * 0.1:
                         warnings.append(f"Many outliers detected in {col}")
         
         # Check 8: SQL injection patterns (paranoia check)
-        for col in df.columns:
+        for col in columns.names:
             if any(pattern in str(col).lower() for pattern in ['drop', 'delete', ';--', 'exec']):
                 issues.append(f"Suspicious column name detected: {col}")
         
+        # Check 9: Values the queried data cannot have produced (from its profile)
+        profile = self.data_profile
+        if profile is not None:
+            warnings.extend(range_warnings(profile, df))
+        
         # Calculate component scores
         data_quality_score = 1.0 - (len(issues) * 0.2) - (len(warnings) * 0.05)
-        completeness_score = 1.0 - (total_nulls / max(len(df) * len(df.columns), 1))
+        completeness_score = 1.0 - (total_nulls / max(row_count * column_count, 1))
         consistency_score = 1.0 if len(issues) == 0 else 0.5
         
         return ValidationResult(
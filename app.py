@@ -7,6 +7,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import itertools
 import sys
 import os
 
@@ -14,6 +15,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agents.orchestrator import get_orchestrator, reset_orchestrator
 from utils.data_layer import get_data_layer
+from utils.llm_cache import get_llm_cache
+from utils.model_health import get_model_health
 from utils.memory import get_memory, reset_memory
 from config import settings
 
@@ -357,26 +360,28 @@ def render_ai_chat():
         
         # Assistant response
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing..."):
-                try:
-                    report_content = st.session_state.get('report_content')
-                    answer = st.session_state.orchestrator.process_query(prompt, report_content=report_content)
-                    
-                    confidence = 85
-                    if st.session_state.orchestrator.evaluation:
-                        es = st.session_state.orchestrator.get_evaluation_summary()
-                        confidence = es.get('overall', 0.85) * 100
-                    
-                    st.markdown(answer)
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": answer,
-                        "time": datetime.now().strftime("%H:%M"),
-                        "conf": confidence
-                    })
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error: {e}")
+            try:
+                report_content = st.session_state.get('report_content')
+                pieces = st.session_state.orchestrator.stream_query(prompt, report_content=report_content)
+                # Spinner until the first token; the rest of the answer is written as it arrives
+                with st.spinner("Analyzing..."):
+                    first = next(pieces, "")
+                answer = st.write_stream(itertools.chain([first], pieces))
+                
+                confidence = 85
+                if st.session_state.orchestrator.evaluation:
+                    es = st.session_state.orchestrator.get_evaluation_summary()
+                    confidence = es.get('overall', 0.85) * 100
+                
+                st.session_state.messages.append({
+                    "role": "assistant", 
+                    "content": answer,
+                    "time": datetime.now().strftime("%H:%M"),
+                    "conf": confidence
+                })
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error: {e}")
 
 
 def render_analytics():
@@ -541,7 +546,20 @@ def render_analytics():
             df_full = st.session_state.data_layer.get_raw_data(500)
             st.markdown(f"Displaying sample of records from the database.")
             st.dataframe(df_full, use_container_width=True)
-                
+
+            # Full export is streamed to Parquet by DuckDB, never loaded into pandas
+            if st.button("Prepare Full Export (Parquet)"):
+                export_path = st.session_state.data_layer.execute_streaming(
+                    "SELECT * FROM sales"
+                ).to_parquet("data/exports/sales_export.parquet")
+                with open(export_path, "rb") as f:
+                    st.download_button(
+                        "Download Parquet",
+                        data=f,
+                        file_name="sales_export.parquet",
+                        mime="application/octet-stream"
+                    )
+
     except Exception as e:
         st.error(f"Analytics Error: {e}")
 
@@ -601,7 +619,18 @@ def render_data_upload():
                         reset_memory()
                         st.success("Data loaded! Refreshing system...")
                         st.rerun()
-                
+
+                    if 'order_id' in df.columns and st.button("Add to Current Dataset (upsert on order_id)"):
+                        save_path = f"data/uploaded_delta{file_ext}"
+                        with open(save_path, "wb") as f:
+                            f.write(uploaded_file.getbuffer())
+
+                        result = st.session_state.data_layer.append_file(save_path)
+                        st.success(
+                            f"Added {result['inserted']:,} rows ({result['replaced']:,} replaced), "
+                            f"{result['total_rows']:,} total"
+                        )
+
                 # Handle text reports
                 elif file_ext == '.txt':
                     content = uploaded_file.read().decode("utf-8")
@@ -943,6 +972,14 @@ def render_system_panel():
             st.info(f"{settings.llm_provider.upper()}")
             model = settings.gemini_model if settings.llm_provider == 'google' else settings.openai_model
             st.info(f"{model}")
+            llm_cache = get_llm_cache()
+            if llm_cache:
+                cs = llm_cache.get_stats()
+                st.info(f"Response cache {cs['hit_rate']*100:.0f}% hits, "
+                        f"{cs['entries']:,} entries, {cs['seconds_saved']:.0f}s saved")
+            cooling = [m.split(":", 1)[1] for m, h in get_model_health().get_stats().items() if h["state"] == "open"]
+            if cooling:
+                st.warning(f"Cooling down: {', '.join(cooling)}")
         
         with cols[1]:
             st.markdown("**Data**")
@@ -951,6 +988,10 @@ def render_system_panel():
                 o = stats.get("overall", {})
                 st.success(f"{o.get('total_orders', 0):,} records")
                 st.info(f"{o.get('date_range', 'N/A')}")
+                pool = st.session_state.data_layer.get_pool_stats()
+                if pool:
+                    st.info(f"DB cursors {pool['in_use']}/{pool['max_size']}, "
+                            f"avg wait {pool['avg_wait']*1000:.1f} ms")
         
         with cols[2]:
             st.markdown("**Session**")
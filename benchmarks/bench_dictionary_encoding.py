@@ -0,0 +1,93 @@
+"""
+Benchmark: VARCHAR vs dictionary-encoded (ENUM / categorical) text columns
+
+Each setting runs in a fresh process over the same synthetic file and measures
+the load, a DuckDB group-by, fetching a row-level result into pandas, its
+memory, a pandas group-by on it and FactExtractor's categorical facts.
+Usage:
+    python benchmarks/bench_dictionary_encoding.py --rows 2000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.bench_load_modes import make_source  # noqa: E402
+
+GROUP_QUERY = (
+    "SELECT state, category, status, SUM(revenue) AS revenue, COUNT(*) AS orders "
+    "FROM sales GROUP BY state, category, status"
+)
+ROWS_QUERY = "SELECT order_id, status, category, state, amount FROM sales"
+
+
+def run_child(source: str) -> dict:
+    """Measure one setting inside this process (it comes from ENABLE_DICTIONARY_ENCODING)"""
+    from utils.data_layer import DataLayer
+    from utils.hallucination_prevention import FactExtractor
+
+    start = time.perf_counter()
+    dl = DataLayer(csv_path=source, db_path=":memory:")
+    loaded = time.perf_counter()
+    dl.execute_query(GROUP_QUERY)
+    grouped = time.perf_counter()
+    rows = dl.execute_query(ROWS_QUERY)
+    fetched = time.perf_counter()
+    rows.groupby(["state", "category", "status"], observed=True)["amount"].sum()
+    pandas_grouped = time.perf_counter()
+    extractor = FactExtractor()
+    for col in ("status", "category", "state"):
+        extractor._extract_categorical_facts(rows, col)
+    facts = time.perf_counter()
+
+    return {
+        "load_s": loaded - start,
+        "duckdb_group_by_s": grouped - loaded,
+        "fetch_rows_s": fetched - grouped,
+        "result_mb": rows.memory_usage(index=True, deep=True).sum() / 1024 / 1024,
+        "pandas_group_by_s": pandas_grouped - fetched,
+        "categorical_facts_s": facts - pandas_grouped,
+    }
+
+
+def run_setting(encoded: bool, source: str) -> dict:
+    """Run one setting in a subprocess and return its measurements"""
+    env = dict(os.environ, DUCKDB_PATH=":memory:", ENABLE_ROLLUP="false", LOG_LEVEL="WARNING",
+               ENABLE_DICTIONARY_ENCODING="true" if encoded else "false")
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", "--source", source],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.source)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_source(args.rows, "csv", tmp)
+        print(f"Source: {args.rows:,} rows of CSV\n")
+        results = {name: run_setting(name == "encoded", source) for name in ("varchar", "encoded")}
+
+    print(f"{'metric':<22}{'varchar':>12}{'encoded':>12}")
+    for metric in results["varchar"]:
+        print(f"{metric:<22}{results['varchar'][metric]:>12.3f}{results['encoded'][metric]:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
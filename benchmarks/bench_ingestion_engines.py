@@ -0,0 +1,179 @@
+"""
+Benchmark: pandas vs DuckDB engines of the ingestion pipeline
+
+Each engine runs in a fresh process over the same synthetic raw files so peak
+RSS is measured in isolation. --verify also checks that the pandas, parallel
+and DuckDB outputs are identical. The parallel column is the pandas engine on a
+process pool of --workers processes (peak RSS is the parent's only). The
+streaming column is the chunked pandas mode; its time includes writing the
+CSV/Parquet output, which the others skip.
+Usage:
+    python benchmarks/bench_ingestion_engines.py --rows 1000000 --verify --workers 8
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT))
+
+ENGINES = ("pandas", "parallel", "streaming", "duckdb")
+
+
+def make_raw_sources(rows: int, out_dir: str) -> str:
+    """Write Amazon/International raw reports shaped like the Kaggle files"""
+    rng = np.random.default_rng(42)
+    out = Path(out_dir)
+    dates = pd.Timestamp("2022-03-31") + pd.to_timedelta(rng.integers(0, 91, rows), unit="D")
+    amount = rng.gamma(2.0, 350.0, rows).round(2)
+    amount[rng.random(rows) < 0.06] = np.nan
+    pd.DataFrame({
+        "index": np.arange(rows),
+        "Order ID": np.char.add("405-", rng.integers(0, rows, rows).astype(str)),
+        "Date": dates.strftime("%m-%d-%y"),
+        "Status": rng.choice(["Shipped", "Shipped - Delivered to Buyer", "Cancelled", "Pending"], rows,
+                             p=[0.6, 0.25, 0.1, 0.05]),
+        "Fulfilment": rng.choice(["Amazon", "Merchant"], rows),
+        "Sales Channel ": "Amazon.in",
+        "ship-service-level": rng.choice(["Standard", "Expedited"], rows),
+        "Style": np.char.add("SET", rng.integers(100, 999, rows).astype(str)),
+        "SKU": np.char.add("SKU-", rng.integers(0, 5000, rows).astype(str)),
+        "Category": rng.choice(["Set", "kurta", "Western Dress", "Top", "Ethnic Dress", "Saree"], rows),
+        "Size": rng.choice(["S", "M", "L", "XL", "Free"], rows),
+        "ASIN": np.char.add("B0", rng.integers(10**7, 10**8, rows).astype(str)),
+        "Courier Status": rng.choice(["Shipped", "Cancelled", None], rows),
+        "Qty": rng.integers(0, 4, rows),
+        "currency": "INR",
+        "Amount": amount,
+        "ship-city": rng.choice(["MUMBAI", "BENGALURU", "HYDERABAD", "NEW DELHI"], rows),
+        "ship-state": rng.choice(["MAHARASHTRA", "KARNATAKA", "TELANGANA", "DELHI"], rows),
+        "ship-postal-code": rng.choice([400001.0, 560085.0, 500032.0, 110001.0], rows),
+        "ship-country": "IN",
+        "promotion-ids": rng.choice(["Amazon PLCC Free-Financing Universal Merchant", None], rows),
+        "B2B": rng.random(rows) < 0.05,
+        "fulfilled-by": rng.choice(["Easy Ship", None], rows),
+        "Unnamed: 22": None,
+    }).to_csv(out / "Amazon Sale Report.csv", index=False)
+
+    intl_rows = max(rows // 30, 1)
+    pd.DataFrame({
+        "index": np.arange(intl_rows),
+        "DATE": (pd.Timestamp("2021-06-05") + pd.to_timedelta(rng.integers(0, 300, intl_rows), unit="D"))
+        .strftime("%m-%d-%y"),
+        "Months": "Jun-21",
+        "CUSTOMER": rng.choice(["REVATHY LOGANATHAN", "VISHA DEVI", "MULBERRIES BOUTIQUE"], intl_rows),
+        "Style": np.char.add("MEN", rng.integers(1000, 9999, intl_rows).astype(str)),
+        "SKU": np.char.add("MEN", rng.integers(1000, 9999, intl_rows).astype(str)),
+        "Size": rng.choice(["S", "M", "XL"], intl_rows),
+        "PCS": rng.integers(1, 5, intl_rows),
+        "RATE": rng.gamma(2, 300, intl_rows).round(2),
+        "GROSS AMT": rng.gamma(2, 400, intl_rows).round(2),
+    }).to_csv(out / "International sale Report.csv", index=False)
+    return str(out)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process (VmHWM resets on exec, ru_maxrss does not)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(engine: str, data_dir: str, output: str, chunk_rows: int, workers: int) -> dict:
+    """Transform the raw files with one engine inside this process"""
+    warnings.simplefilter("ignore")  # pandas' dateutil fallback warning
+    from utils.data_ingestion import DataIngestionPipeline
+    from utils.sql_ingestion import SQLIngestionEngine
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    if engine == "streaming":
+        with tempfile.TemporaryDirectory() as out_dir:
+            stats = DataIngestionPipeline(data_dir).ingest_streaming(chunk_rows, output_dir=out_dir)
+        rows_out = stats["rows_written"]
+    elif engine == "duckdb":
+        df = SQLIngestionEngine(data_dir).run()
+        rows_out = len(df)
+    elif engine == "parallel":
+        df = DataIngestionPipeline(data_dir, engine="pandas", workers=workers)._transform_with_pandas()
+        rows_out = len(df)
+    else:
+        df = DataIngestionPipeline(data_dir, engine="pandas", workers=1)._transform_with_pandas()
+        rows_out = len(df)
+    elapsed = time.perf_counter() - start
+
+    if output and engine != "streaming":
+        df.to_csv(output, index=False)
+    return {
+        "transform_s": elapsed,
+        "rows_out": rows_out,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_engine(engine: str, data_dir: str, output: str, chunk_rows: int, workers: int) -> dict:
+    """Run one engine in a subprocess and return its measurements"""
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", engine, "--data-dir", data_dir, "--output", output,
+         "--chunk-rows", str(chunk_rows), "--workers", str(workers)],
+        env=dict(os.environ, LOG_LEVEL="WARNING"), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--verify", action="store_true", help="Check the engines write identical CSV")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Chunk size of the streaming mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes of the parallel mode")
+    parser.add_argument("--child", choices=ENGINES, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--output", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.data_dir, args.output, args.chunk_rows, args.workers)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = make_raw_sources(args.rows, tmp)
+        size_mb = sum(f.stat().st_size for f in Path(tmp).glob("*.csv")) / 1024 / 1024
+        print(f"Source: {args.rows:,} Amazon rows, {size_mb:.1f} MB of raw CSV\n")
+
+        outputs = {e: str(Path(tmp) / f"out_{e}.csv") if args.verify else "" for e in ENGINES}
+        results = {
+            engine: run_engine(engine, data_dir, outputs[engine], args.chunk_rows, args.workers)
+            for engine in ENGINES
+        }
+
+        if args.verify:
+            reference = Path(outputs["pandas"]).read_bytes()
+            for engine in ("parallel", "duckdb"):
+                identical = Path(outputs[engine]).read_bytes() == reference
+                print(f"{engine} output byte-identical to pandas: {identical}")
+            print()
+
+    print(f"{'metric':<18}" + "".join(f"{engine:>12}" for engine in ENGINES))
+    for metric in ("transform_s", "rows_out", "rss_before_mb", "peak_rss_mb"):
+        print(f"{metric:<18}" + "".join(f"{results[engine][metric]:>12.3f}" for engine in ENGINES))
+
+
+if __name__ == "__main__":
+    main()
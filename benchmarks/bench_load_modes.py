@@ -0,0 +1,139 @@
+"""
+Benchmark: copy-in vs zero-load (view) modes of the data layer
+
+Each mode runs in a fresh process so peak RSS is measured in isolation.
+Usage:
+    python benchmarks/bench_load_modes.py --rows 2000000 --format csv
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT))
+
+FIRST_QUERY = (
+    "SELECT state, SUM(revenue) AS total_revenue, COUNT(*) AS orders FROM sales "
+    "WHERE year = 2022 AND month = 4 GROUP BY state ORDER BY total_revenue DESC"
+)
+SECOND_QUERY = (
+    "SELECT category, SUM(estimated_profit) AS total_profit FROM sales "
+    "GROUP BY category ORDER BY total_profit DESC LIMIT 5"
+)
+
+
+def make_source(rows: int, fmt: str, out_dir: str) -> str:
+    """Write a synthetic file shaped like processed_sales_data.csv"""
+    rng = np.random.default_rng(42)
+    dates = pd.Timestamp("2022-03-01") + pd.to_timedelta(rng.integers(0, 300, rows), unit="D")
+    amount = rng.gamma(2.0, 350.0, rows).round(2)
+    status = rng.choice(["Shipped", "Shipped - Delivered to Buyer", "Cancelled", "Pending"], rows,
+                        p=[0.6, 0.25, 0.1, 0.05])
+    df = pd.DataFrame({
+        "order_id": np.char.add("ORD-", np.arange(rows).astype(str)),
+        "date": dates,
+        "status": status,
+        "category": rng.choice(["Set", "kurta", "Western Dress", "Top", "Ethnic Dress", "Saree"], rows),
+        "state": rng.choice(["MAHARASHTRA", "KARNATAKA", "TELANGANA", "DELHI", "TAMIL NADU"], rows),
+        "quantity": rng.integers(1, 4, rows),
+        "amount": amount,
+        "is_b2b": rng.random(rows) < 0.05,
+        "year": dates.year,
+        "month": dates.month,
+    })
+    df["is_cancelled"] = df["status"] == "Cancelled"
+    df["revenue"] = np.where(df["is_cancelled"], 0.0, df["amount"])
+    df["estimated_profit"] = df["revenue"] * 0.30
+
+    path = Path(out_dir) / f"bench_sales.{fmt}"
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    return str(path)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process (VmHWM resets on exec, ru_maxrss does not)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(source: str) -> dict:
+    """Measure one mode inside this process (mode comes from LOAD_MODE)"""
+    from utils.data_layer import DataLayer
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    dl = DataLayer(csv_path=source, db_path=":memory:")
+    ready = time.perf_counter()
+    dl.execute_query(FIRST_QUERY)
+    first = time.perf_counter()
+    dl.execute_query(SECOND_QUERY)
+    second = time.perf_counter()
+
+    return {
+        "load_s": ready - start,
+        "first_query_s": first - ready,
+        "time_to_first_answer_s": first - start,
+        "second_query_s": second - first,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_load_mb": rss_before,
+    }
+
+
+def run_mode(mode: str, source: str, rollup: bool) -> dict:
+    """Run one mode in a subprocess and return its measurements"""
+    env = dict(os.environ, LOAD_MODE=mode, DUCKDB_PATH=":memory:",
+               ENABLE_ROLLUP="true" if rollup else "false")
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", "--source", source],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--rollup", action="store_true", help="Build the rollup cube at load time")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.source)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_source(args.rows, args.format, tmp)
+        size_mb = os.path.getsize(source) / 1024 / 1024
+        print(f"Source: {args.rows:,} rows, {args.format}, {size_mb:.1f} MB, rollup={'on' if args.rollup else 'off'}\n")
+
+        results = {mode: run_mode(mode, source, args.rollup) for mode in ("copy", "view")}
+
+    metrics = ["load_s", "first_query_s", "time_to_first_answer_s", "second_query_s",
+               "rss_before_load_mb", "peak_rss_mb"]
+    print(f"{'metric':<26}{'copy':>12}{'view':>12}")
+    for metric in metrics:
+        print(f"{metric:<26}{results['copy'][metric]:>12.3f}{results['view'][metric]:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
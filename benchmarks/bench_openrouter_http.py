@@ -0,0 +1,223 @@
+"""
+Benchmark: per-call requests.post vs the pooled OpenRouter HTTP clients
+
+Runs against a local mock of the chat completions endpoint (HTTPS with a
+throwaway self-signed certificate unless --no-tls), so the difference is the
+TCP+TLS handshake each unpooled call pays. --delay-ms simulates model time on
+the server. The concurrent section compares --concurrency calls on threads
+(pooled session) with the same calls as asyncio tasks (_agenerate). The last
+section simulates generating --tokens tokens and compares waiting for the
+whole completion with the first token of a streamed one.
+Usage:
+    python benchmarks/bench_openrouter_http.py --calls 200 --concurrency 16 --delay-ms 20 --tokens 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT))
+
+MESSAGES = [{"role": "user", "content": "What were total sales in 2022?"}]
+
+
+class MockCompletions(BaseHTTPRequestHandler):
+    """Answers every POST like /chat/completions; counts connections"""
+    protocol_version = "HTTP/1.1"
+    delay_s = 0.0
+    tokens = 0
+    token_s = 0.0
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; without NODELAY the
+        # second waits on the client's delayed ACK (~40 ms per call)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with MockCompletions.lock:
+            MockCompletions.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.delay_s)
+        if body.get("stream"):
+            self._stream_tokens()
+            return
+        time.sleep(self.token_s * max(self.tokens - 1, 0))  # generating the whole answer first
+        out = json.dumps({
+            "model": body["model"],
+            "choices": [{"message": {"role": "assistant", "content": "SELECT SUM(amount) FROM sales"}}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _stream_tokens(self):
+        """Server-sent events, one token every token_s (chunked transfer encoding)"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [{"choices": [{"delta": {"content": f"token{i} "}}]} for i in range(self.tokens)]
+        for i, event in enumerate(events):
+            if i:
+                time.sleep(self.token_s)
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(tls_dir: str = ""):
+    """Serve the mock on a free localhost port; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("localhost", 0), MockCompletions)
+    server.daemon_threads = True
+    scheme = "http"
+    if tls_dir:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(Path(tls_dir) / "cert.pem", Path(tls_dir) / "key.pem")
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://localhost:{server.server_address[1]}/api/v1"
+
+
+def make_certificate(out_dir: str) -> str:
+    """Self-signed certificate for localhost (needs the openssl CLI)"""
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", str(Path(out_dir) / "key.pem"), "-out", str(Path(out_dir) / "cert.pem"),
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost"],
+        check=True, capture_output=True
+    )
+    return str(Path(out_dir) / "cert.pem")
+
+
+def timed(fn, calls: int):
+    """Latencies in ms of calling fn sequentially"""
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=200, help="Sequential calls per client")
+    parser.add_argument("--concurrency", type=int, default=16, help="Simultaneous calls in the concurrent section")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Simulated model time per call")
+    parser.add_argument("--tokens", type=int, default=300, help="Tokens of the streamed completion")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="Simulated time per generated token")
+    parser.add_argument("--no-tls", action="store_true", help="Plain HTTP (no TLS handshake to save)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        if not args.no_tls:
+            if shutil.which("openssl") is None:
+                sys.exit("openssl not found; rerun with --no-tls")
+            cert = make_certificate(tmp)
+            # Trust the throwaway certificate in requests and httpx
+            os.environ["REQUESTS_CA_BUNDLE"] = os.environ["SSL_CERT_FILE"] = cert
+        os.environ["LLM_HTTP_POOL_SIZE"] = str(max(args.concurrency, 10))
+
+        import requests
+        from langchain_core.messages import HumanMessage
+        from utils.openrouter_llm import OpenRouterLLM
+
+        MockCompletions.delay_s = args.delay_ms / 1000
+        server, base_url = start_server("" if args.no_tls else tmp)
+        llm = OpenRouterLLM(model="mock/model", api_key="test", base_url=base_url)
+        args_of = llm._request_args("mock/model", MESSAGES)
+        messages = [HumanMessage(content=MESSAGES[0]["content"])]
+
+        def unpooled():
+            requests.post(**args_of, timeout=60).raise_for_status()
+
+        def pooled():
+            llm._generate(messages)
+
+        print(f"Mock server {base_url}, {args.delay_ms:.0f} ms simulated model time\n")
+        print(f"{'client':<22}{'mean_ms':>10}{'p50_ms':>10}{'p95_ms':>10}{'connections':>13}")
+        for name, fn in (("requests.post", unpooled), ("pooled session", pooled)):
+            fn()  # warm up imports and DNS
+            before = MockCompletions.connections
+            latencies = sorted(timed(fn, args.calls))
+            print(f"{name:<22}{statistics.mean(latencies):>10.2f}{statistics.median(latencies):>10.2f}"
+                  f"{latencies[int(len(latencies) * 0.95) - 1]:>10.2f}{MockCompletions.connections - before:>13}")
+
+        total = args.concurrency * 4
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(lambda _: pooled(), range(args.concurrency)))
+            before = MockCompletions.connections
+            started = time.perf_counter()
+            list(pool.map(lambda _: pooled(), range(total)))
+            threaded_s = time.perf_counter() - started
+            threaded_connections = MockCompletions.connections - before
+
+        async def run_async():
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one():
+                async with semaphore:
+                    await llm._agenerate(messages)
+
+            await asyncio.gather(*(one() for _ in range(args.concurrency)))
+            before = MockCompletions.connections
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            return time.perf_counter() - started, MockCompletions.connections - before
+
+        async_s, async_connections = asyncio.run(run_async())
+        print(f"\n{total} calls, {args.concurrency} at a time:")
+        print(f"   threads + pooled session: {threaded_s:.3f}s ({total / threaded_s:,.0f} calls/s, "
+              f"{args.concurrency} threads, {threaded_connections} new connections)")
+        print(f"   asyncio + _agenerate:     {async_s:.3f}s ({total / async_s:,.0f} calls/s, 1 thread, {async_connections} new connections)")
+
+        # Time to first token: the whole completion vs the first streamed chunk
+        MockCompletions.tokens, MockCompletions.token_s = args.tokens, args.token_ms / 1000
+        full, first = [], []
+        for _ in range(5):
+            started = time.perf_counter()
+            llm._generate(messages)
+            full.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            stream = llm.stream(messages)
+            next(chunk for chunk in stream if chunk.content)
+            first.append(time.perf_counter() - started)
+            for _ in stream:
+                pass
+        print(f"\n{args.tokens} tokens at {args.token_ms:.0f} ms each:")
+        print(f"   full completion (_generate): {statistics.median(full) * 1000:,.0f} ms")
+        print(f"   first token (_stream):       {statistics.median(first) * 1000:,.0f} ms")
+        server.shutdown()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
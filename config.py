@@ -72,8 +72,98 @@ class Settings(BaseSettings):
     temperature: float = float(os.getenv("TEMPERATURE", "0.1"))
     max_tokens: int = int(os.getenv("MAX_TOKENS", "2000"))
     
-    # Database Configuration - Use in-memory for Streamlit Cloud
-    duckdb_path: str = os.getenv("DUCKDB_PATH", ":memory:")
+    # Database Configuration - Persistent catalog so restarts skip the CSV reload
+    # (set DUCKDB_PATH=:memory: on hosts without a writable filesystem)
+    duckdb_path: str = os.getenv("DUCKDB_PATH", str(BASE_DIR / "data" / "retail_catalog.duckdb"))
+    
+    # Storage layout of processed data: "table" loads one CSV into DuckDB,
+    # "partitioned" also writes year=/month= Parquet and queries it through a view
+    storage_mode: str = os.getenv("STORAGE_MODE", "table")
+    partitioned_data_path: str = os.getenv(
+        "PARTITIONED_DATA_PATH", str(BASE_DIR / "data" / "processed_sales")
+    )
+    
+    # How CSV/Parquet sources become the 'sales' table: "copy" loads them into
+    # DuckDB, "view" queries the files in place (no load step, bounded memory)
+    load_mode: str = os.getenv("LOAD_MODE", "copy")
+    
+    # Engine for the raw-data ingestion pipeline: "pandas" (in memory) or
+    # "duckdb" (SQL over read_csv, multi-threaded and out of core; same output)
+    ingestion_engine: str = os.getenv("INGESTION_ENGINE", "pandas")
+    # Rows per chunk for streaming ingestion of larger-than-memory files (0 reads whole files)
+    ingestion_chunk_rows: int = int(os.getenv("INGESTION_CHUNK_ROWS", "0"))
+    # Worker processes for loading/processing sources in parallel (1 = sequential,
+    # 0 = one per CPU) and the size above which a source is split into shards
+    ingestion_workers: int = int(os.getenv("INGESTION_WORKERS", "1"))
+    ingestion_shard_mb: int = int(os.getenv("INGESTION_SHARD_MB", "64"))
+    # Skip unchanged source files (cached processed rows + manifest in the cache
+    # directory) and rewrite only the output partitions whose contents changed
+    incremental_ingestion: bool = os.getenv("INCREMENTAL_INGESTION", "false").lower() == "true"
+    ingestion_cache_dir: str = os.getenv("INGESTION_CACHE_DIR", str(BASE_DIR / "data" / "ingestion_cache"))
+    # Per-stage run reports (timings, rows/sec, peak memory; empty disables) and
+    # whether to also trace Python allocations per stage (slower)
+    ingestion_report_dir: str = os.getenv("INGESTION_REPORT_DIR", str(BASE_DIR / "data" / "ingestion_reports"))
+    ingestion_trace_memory: bool = os.getenv("INGESTION_TRACE_MEMORY", "false").lower() == "true"
+    
+    # Query result cache budget (bytes of cached result frames)
+    query_cache_max_bytes: int = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    
+    # Result format carried through the agent pipeline: "pandas" or "arrow"
+    # (arrow keeps results as pyarrow.Table and converts to pandas only when needed)
+    result_format: str = os.getenv("RESULT_FORMAT", "pandas")
+    
+    # Results with more rows than this are streamed instead of materialized (0 disables)
+    stream_threshold_rows: int = int(os.getenv("STREAM_THRESHOLD_ROWS", "100000"))
+    stream_batch_size: int = int(os.getenv("STREAM_BATCH_SIZE", "65536"))
+    
+    # Concurrent queries on the shared database (one pooled cursor each) and how
+    # long a query waits for a free cursor before failing
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "4"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    
+    # DuckDB resource governance (empty/0 keeps DuckDB's defaults); the temp
+    # directory is where sorts, joins and aggregates spill beyond the memory limit
+    duckdb_memory_limit: str = os.getenv("DUCKDB_MEMORY_LIMIT", "")
+    duckdb_threads: int = int(os.getenv("DUCKDB_THREADS", "0"))
+    duckdb_temp_directory: str = os.getenv(
+        "DUCKDB_TEMP_DIRECTORY", str(BASE_DIR / "data" / "duckdb_tmp")
+    )
+    
+    # Wall-clock limit per query in seconds; longer queries are interrupted (0 disables)
+    query_timeout_seconds: float = float(os.getenv("QUERY_TIMEOUT_SECONDS", "30"))
+    
+    # Pre-aggregated rollup over year/month/state/category/status/is_b2b that
+    # answers matching aggregate queries instead of scanning the sales table
+    enable_rollup: bool = os.getenv("ENABLE_ROLLUP", "true").lower() == "true"
+    
+    # Store status/category/state/city/... as DuckDB ENUMs so query results come
+    # back as pandas categoricals / Arrow dictionary arrays
+    enable_dictionary_encoding: bool = os.getenv("ENABLE_DICTIONARY_ENCODING", "true").lower() == "true"
+    
+    # HTTP client of the OpenRouter wrapper: keep-alive connections per host,
+    # retries of failed connects and 502/503/504 responses, and request timeout
+    llm_http_pool_size: int = int(os.getenv("LLM_HTTP_POOL_SIZE", "10"))
+    llm_http_retries: int = int(os.getenv("LLM_HTTP_RETRIES", "2"))
+    llm_http_timeout: float = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+    
+    # Circuit breakers of the Gemini/OpenRouter fallback chains: a rate-limited or
+    # failing model is skipped for a cooldown (doubling up to the max on repeated
+    # failures) and then probed by one call; the error rate that opens a breaker
+    # is measured over the last window of seconds
+    model_cooldown_seconds: float = float(os.getenv("MODEL_COOLDOWN_SECONDS", "30"))
+    model_max_cooldown_seconds: float = float(os.getenv("MODEL_MAX_COOLDOWN_SECONDS", "600"))
+    model_health_window_seconds: float = float(os.getenv("MODEL_HEALTH_WINDOW_SECONDS", "300"))
+    model_error_rate_threshold: float = float(os.getenv("MODEL_ERROR_RATE_THRESHOLD", "0.5"))
+    
+    # Persistent LLM response cache (SQLite; empty path disables) keyed by provider,
+    # model, temperature and the normalized prompt. Entries expire after the TTL
+    # (0 keeps them) and the least recently used are evicted beyond the size
+    # limits; models sampled above the max temperature are never cached
+    llm_cache_path: str = os.getenv("LLM_CACHE_PATH", str(BASE_DIR / "data" / "llm_cache.sqlite"))
+    llm_cache_ttl_seconds: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    llm_cache_max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+    llm_cache_max_bytes: int = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    llm_cache_max_temperature: float = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
     
     # Agent Configuration
     enable_logging: bool = os.getenv("ENABLE_LOGGING", "true").lower() == "true"
@@ -1,145 +1,465 @@
 """
-Generate realistic retail sales data for testing
+Generate synthetic retail sales data in the processed Amazon schema
+Vectorized with NumPy/Arrow and sized by a scale factor (1x = 1M rows), with
+skewed states and SKUs and seasonal daily volumes. Writes a CSV, or a
+year=/month= partitioned Parquet dataset laid out like the ingestion
+pipeline's, optionally from several processes.
+Usage:
+    python data/generate_data.py                                   # 50,000 rows to data/sales_data.csv
+    python data/generate_data.py --scale 100 --workers 8           # 100M rows to data/synthetic_sales/
 """
-import pandas as pd
+import argparse
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
 import numpy as np
-from datetime import datetime, timedelta
-import random
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+ROOT = Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT))
+
+from utils.partitioned_store import DEFAULT_ROW_GROUP_SIZE  # noqa: E402
+
+# Rows per unit of --scale (1x = 1M, 1000x = 1B)
+ROWS_PER_SCALE = 1_000_000
+
+# Rows per Parquet file; each file is generated in memory by one worker
+DEFAULT_ROWS_PER_FILE = 1_000_000
+
+DEFAULT_START = "2021-01-01"
+DEFAULT_END = "2023-12-31"
+
+# Columns and types of the processed data as the pipeline writes it to Parquet
+PROCESSED_SCHEMA = pa.schema([
+    ("order_id", pa.string()), ("date", pa.timestamp("us")), ("status", pa.string()),
+    ("fulfilment", pa.string()), ("sales_channel", pa.string()), ("service_level", pa.string()),
+    ("style", pa.string()), ("sku", pa.string()), ("category", pa.string()), ("size", pa.string()),
+    ("asin", pa.string()), ("courier_status", pa.string()), ("quantity", pa.int64()),
+    ("currency", pa.string()), ("amount", pa.float64()), ("city", pa.string()), ("state", pa.string()),
+    ("postal_code", pa.float64()), ("country", pa.string()), ("promotions", pa.string()),
+    ("is_b2b", pa.bool_()), ("fulfilled_by", pa.string()), ("year", pa.int32()), ("month", pa.int32()),
+    ("month_name", pa.string()), ("quarter", pa.int32()), ("quarter_name", pa.string()),
+    ("revenue", pa.float64()), ("data_source", pa.string()), ("index", pa.float64()),
+    ("Months", pa.string()), ("customer", pa.string()), ("unit_price", pa.float64()),
+    ("order_value_category", pa.string()), ("is_cancelled", pa.bool_()), ("is_shipped", pa.bool_()),
+    ("has_promotion", pa.bool_()), ("day_of_week", pa.string()), ("is_weekend", pa.bool_()),
+    ("estimated_profit", pa.float64()),
+])
+
+# State: (share of orders, [(city, postal code, share within the state)]), shaped like the Kaggle report
+STATES = {
+    "MAHARASHTRA": (0.172, [("MUMBAI", 400001, 0.45), ("PUNE", 411001, 0.35), ("NAGPUR", 440001, 0.20)]),
+    "KARNATAKA": (0.134, [("BENGALURU", 560001, 0.85), ("MYSURU", 570001, 0.15)]),
+    "TAMIL NADU": (0.087, [("CHENNAI", 600001, 0.65), ("COIMBATORE", 641001, 0.35)]),
+    "TELANGANA": (0.087, [("HYDERABAD", 500001, 0.9), ("WARANGAL", 506001, 0.1)]),
+    "UTTAR PRADESH": (0.083, [("LUCKNOW", 226001, 0.4), ("NOIDA", 201301, 0.35), ("KANPUR", 208001, 0.25)]),
+    "DELHI": (0.054, [("NEW DELHI", 110001, 1.0)]),
+    "KERALA": (0.051, [("KOCHI", 682001, 0.5), ("THIRUVANANTHAPURAM", 695001, 0.5)]),
+    "WEST BENGAL": (0.046, [("KOLKATA", 700001, 0.85), ("SILIGURI", 734001, 0.15)]),
+    "ANDHRA PRADESH": (0.042, [("VISAKHAPATNAM", 530001, 0.55), ("VIJAYAWADA", 520001, 0.45)]),
+    "GUJARAT": (0.035, [("AHMEDABAD", 380001, 0.6), ("SURAT", 395001, 0.4)]),
+    "HARYANA": (0.034, [("GURUGRAM", 122001, 0.7), ("FARIDABAD", 121001, 0.3)]),
+    "RAJASTHAN": (0.021, [("JAIPUR", 302001, 1.0)]),
+    "MADHYA PRADESH": (0.018, [("INDORE", 452001, 0.55), ("BHOPAL", 462001, 0.45)]),
+    "ODISHA": (0.016, [("BHUBANESWAR", 751001, 1.0)]),
+    "BIHAR": (0.016, [("PATNA", 800001, 1.0)]),
+    "ASSAM": (0.012, [("GUWAHATI", 781001, 1.0)]),
+    "JHARKHAND": (0.012, [("RANCHI", 834001, 1.0)]),
+    "UTTARAKHAND": (0.010, [("DEHRADUN", 248001, 1.0)]),
+    "PUNJAB": (0.009, [("LUDHIANA", 141001, 0.5), ("AMRITSAR", 143001, 0.5)]),
+    "GOA": (0.009, [("PANAJI", 403001, 1.0)]),
+    "CHHATTISGARH": (0.007, [("RAIPUR", 492001, 1.0)]),
+    "JAMMU & KASHMIR": (0.005, [("SRINAGAR", 190001, 1.0)]),
+    "HIMACHAL PRADESH": (0.004, [("SHIMLA", 171001, 1.0)]),
+    "PUDUCHERRY": (0.002, [("PUDUCHERRY", 605001, 1.0)]),
+    "CHANDIGARH": (0.001, [("CHANDIGARH", 160017, 1.0)]),
+    "MANIPUR": (0.001, [("IMPHAL", 795001, 1.0)]),
+    "SIKKIM": (0.0005, [("GANGTOK", 737101, 1.0)]),
+    "MEGHALAYA": (0.0005, [("SHILLONG", 793001, 1.0)]),
+}
+
+# Category: (share of styles, style prefix, median unit price in INR)
+CATEGORIES = {
+    "Set": (0.30, "SET", 830), "kurta": (0.36, "JNE", 455), "Western Dress": (0.12, "J0", 760),
+    "Top": (0.12, "J0", 525), "Ethnic Dress": (0.03, "J0", 720), "Blouse": (0.03, "BL", 520),
+    "Bottom": (0.03, "BTM", 360), "Saree": (0.008, "SAR", 800), "Dupatta": (0.002, "DPT", 300),
+}
+STYLES = 1500
+# Popularity of styles falls off as rank^-SKU_SKEW (Zipf)
+SKU_SKEW = 0.8
+
+SIZES = ["3XL", "4XL", "5XL", "6XL", "Free", "L", "M", "S", "XL", "XS", "XXL"]
+SIZE_P = [0.11, 0.01, 0.01, 0.01, 0.01, 0.17, 0.18, 0.13, 0.16, 0.07, 0.14]
+
+STATUSES = [
+    "Cancelled", "Pending", "Pending - Waiting for Pick Up", "Shipped", "Shipped - Delivered to Buyer",
+    "Shipped - Out for Delivery", "Shipped - Picked Up", "Shipped - Returned to Seller",
+    "Shipped - Returning to Seller", "Shipped - Rejected by Buyer",
+]
+STATUS_P = [0.142, 0.005, 0.002, 0.603, 0.223, 0.0003, 0.0076, 0.015, 0.0011, 0.0010]
+
+# courier_status given status: Shipped, Unshipped, Cancelled, missing
+COURIER_STATUSES = ["Shipped", "Unshipped", "Cancelled"]
+COURIER_P = {"Cancelled": [0.10, 0.05, 0.45, 0.40], "Pending": [0.0, 0.9, 0.0, 0.1]}
+COURIER_P_SHIPPED = [0.98, 0.0, 0.0, 0.02]
+
+PROMOTIONS = [
+    "Amazon PLCC Free-Financing Universal Merchant AAT-WNKTBO3K27EJC",
+    "IN Core Free Shipping 2015/04/08 23-48-5-108",
+    "Amazon PLCC Free-Financing Universal Merchant AAT-7MD5PERXSXDUM",
+    "VPC-44571-64537737 Coupon",
+]
+ORDER_PREFIXES = ["171", "402", "403", "404", "405", "406", "407", "408"]
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June", "July",
+               "August", "September", "October", "November", "December"]
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Yearly growth of daily order volume
+GROWTH = 0.25
+
+
+class _Catalog:
+    """Fixed lookup tables shared by every task (styles, cities, cumulative weights)"""
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.states = sorted(STATES)
+        self.state_cum = _cumulative([STATES[s][0] for s in self.states])
+
+        # Cities of state i occupy [i, i + 1) of a cumulative axis, so one searchsorted picks a city per row
+        self.cities, pins, cum = [], [], []
+        for i, state in enumerate(self.states):
+            shares = np.array([share for _, _, share in STATES[state][1]])
+            edges = i + np.cumsum(shares) / shares.sum()
+            edges[-1] = i + 1
+            self.cities += [city for city, _, _ in STATES[state][1]]
+            pins += [pin for _, pin, _ in STATES[state][1]]
+            cum += list(edges)
+        self.city_pins = np.array(pins, dtype=np.float64)
+        self.city_cum = np.array(cum)
+
+        self.categories = sorted(CATEGORIES)
+        shares = np.array([CATEGORIES[c][0] for c in self.categories])
+        self.style_category = rng.choice(len(self.categories), STYLES, p=shares / shares.sum())
+        medians = np.array([CATEGORIES[c][2] for c in self.categories])[self.style_category]
+        self.style_price = np.round(medians * rng.lognormal(0, 0.25, STYLES))
+        prefixes = [CATEGORIES[c][1] for c in self.categories]
+        self.style_names = [f"{prefixes[c]}{100 + i}" for i, c in enumerate(self.style_category)]
+        self.style_cum = _cumulative(1.0 / np.arange(1, STYLES + 1) ** SKU_SKEW)
+
+        self.courier_cum = np.cumsum([COURIER_P.get(s.split(" - ")[0], COURIER_P_SHIPPED) for s in STATUSES], axis=1)
+        self.is_cancelled = np.array(["cancel" in s.lower() for s in STATUSES])
+        self.is_shipped = np.array(["shipped" in s.lower() for s in STATUSES])
+        self.keeps_revenue = np.array([s not in ("Cancelled", "Returned") for s in STATUSES])
+
+
+def _cumulative(weights) -> np.ndarray:
+    """Cumulative distribution of weights, ending exactly at 1 (for searchsorted sampling)"""
+    cum = np.cumsum(weights) / np.sum(weights)
+    cum[-1] = 1.0
+    return cum
+
+
+@lru_cache(maxsize=1)
+def _catalog() -> _Catalog:
+    return _Catalog()
+
+
+def _strings(values: List[str], codes: np.ndarray, mask: Optional[np.ndarray] = None) -> pa.Array:
+    """Arrow string array of values[codes] (null where mask is set)"""
+    return pa.array(values, pa.string()).take(pa.array(codes, mask=mask))
+
+
+def _digits(numbers: np.ndarray, width: int) -> pa.Array:
+    """Zero-padded decimal strings of non-negative integers"""
+    return pc.utf8_lpad(pc.cast(pa.array(numbers), pa.string()), width, "0")
+
+
+def _order_numbers(rows: np.ndarray) -> np.ndarray:
+    """
+    Scramble row numbers into 14-digit order numbers without collisions
+
+    A three-round Feistel network over the two 7-digit halves is a bijection,
+    so order IDs stay unique without looking sequential.
+    """
+    left, right = rows // 10 ** 7, rows % 10 ** 7
+    for key in (5_438_291, 2_718_281, 9_650_137):
+        left, right = right, (left + right * 7919 + key) % 10 ** 7
+    return left * 10 ** 7 + right
+
+
+def daily_weights(days: pd.DatetimeIndex) -> np.ndarray:
+    """Relative order volume of each day: growth trend, festive/sale seasons and weekends"""
+    years = (days - days[0]).days.to_numpy() / 365.25
+    doy = days.dayofyear.to_numpy()
+    festive = 0.6 * np.exp(-0.5 * ((doy - 300) / 18) ** 2)      # Diwali / festive sales (late Oct)
+    year_end = 0.25 * np.exp(-0.5 * ((doy - 355) / 8) ** 2)     # Year-end sale
+    summer = 0.15 * np.exp(-0.5 * ((doy - 140) / 20) ** 2)      # End-of-season sale (May)
+    weekend = np.where(days.dayofweek.to_numpy() >= 5, 1.15, 1.0)
+    return (1 + GROWTH * years) * (1 + festive + year_end + summer) * weekend
+
+
+def allocate(total: int, weights: np.ndarray) -> np.ndarray:
+    """Split total into integer counts proportional to weights (largest remainder)"""
+    exact = weights / weights.sum() * total
+    counts = np.floor(exact).astype(np.int64)
+    counts[np.argsort(counts - exact, kind="stable")[:total - counts.sum()]] += 1
+    return counts
+
 
+def generate_rows(dates: np.ndarray, offset: int, seed) -> pa.Table:
+    """
+    Generate processed sales rows for the given order dates
+
+    Rows come out sorted by month, state, category and date, the order the
+    partitioned store writes, so row-group statistics prune the same way.
+
+    Args:
+        dates: Order date of each row (datetime64[D])
+        offset: Global number of the first row (order IDs are unique across calls)
+        seed: Seed of this call's random stream
 
-def generate_sales_data(num_rows=50000, output_path="data/sales_data.csv"):
+    Returns:
+        Table with PROCESSED_SCHEMA
     """
-    Generate realistic retail sales data
-    
+    cat = _catalog()
+    rng = np.random.default_rng(seed)
+    n = len(dates)
+
+    state = np.searchsorted(cat.state_cum, rng.random(n), side="right")
+    style = np.searchsorted(cat.style_cum, rng.random(n), side="right")
+    category = cat.style_category[style]
+
+    # Sort on integer codes (assigned in name order) before any strings exist
+    months = dates.astype("datetime64[M]")
+    order = np.lexsort((dates, category, state, months))
+    dates, months, state, style, category = dates[order], months[order], state[order], style[order], category[order]
+
+    city = np.searchsorted(cat.city_cum, state + rng.random(n), side="right")
+    size = rng.choice(len(SIZES), n, p=SIZE_P)
+    status = rng.choice(len(STATUSES), n, p=STATUS_P)
+    courier = (rng.random(n)[:, None] > cat.courier_cum[status]).sum(axis=1)
+    amazon = rng.random(n) < 0.695
+    cancelled = cat.is_cancelled[status]
+
+    quantity = rng.choice([1, 2, 3, 4], n, p=[0.93, 0.05, 0.015, 0.005])
+    quantity[cancelled & (rng.random(n) < 0.8)] = 0
+    missing_amount = rng.random(n) < np.where(cancelled, 0.35, 0.01)
+    amount = np.where(missing_amount, 0.0, cat.style_price[style] * np.maximum(quantity, 1))
+    revenue = np.where(cat.keeps_revenue[status], amount, 0.0)
+    promoted = rng.random(n) < np.where(amazon, 0.70, 0.45)
+
+    ids = _order_numbers(offset + np.arange(n, dtype=np.int64))
+    order_id = pc.binary_join_element_wise(
+        _strings(ORDER_PREFIXES, rng.integers(0, len(ORDER_PREFIXES), n)),
+        _digits(ids // 10 ** 7, 7), _digits(ids % 10 ** 7, 7), "-"
+    )
+    style_names = _strings(cat.style_names, style)
+    asin = pc.binary_join_element_wise(
+        "B0", _digits((style * len(SIZES) + size) * 7919 % 90_000_000 + 10_000_000, 8), ""
+    )
+
+    month = (months.astype(np.int64) % 12 + 1).astype(np.int32)
+    quarter = ((month - 1) // 3 + 1).astype(np.int32)
+    weekday = (dates.astype(np.int64) + 3) % 7
+    value_band = np.searchsorted([300, 600, 1000], amount, side="left")
+
+    columns = {
+        "order_id": order_id,
+        "date": pa.array(dates.astype("datetime64[us]")),
+        "status": _strings(STATUSES, status),
+        "fulfilment": _strings(["Merchant", "Amazon"], amazon.astype(np.int8)),
+        "sales_channel": _strings(["Amazon.in", "Non-Amazon"], (rng.random(n) < 0.001).astype(np.int8)),
+        "service_level": _strings(["Standard", "Expedited"], amazon.astype(np.int8)),
+        "style": style_names,
+        "sku": pc.binary_join_element_wise(style_names, _strings(SIZES, size), "-"),
+        "category": _strings(cat.categories, category),
+        "size": _strings(SIZES, size),
+        "asin": asin,
+        "courier_status": _strings(COURIER_STATUSES, np.minimum(courier, 2), mask=courier == 3),
+        "quantity": pa.array(quantity.astype(np.int64)),
+        "currency": _strings(["INR"], np.zeros(n, dtype=np.int8), mask=missing_amount),
+        "amount": pa.array(amount),
+        "city": _strings(cat.cities, city),
+        "state": _strings(cat.states, state),
+        "postal_code": pa.array(cat.city_pins[city] + rng.integers(0, 40, n)),
+        "country": _strings(["IN"], np.zeros(n, dtype=np.int8)),
+        "promotions": _strings(PROMOTIONS, rng.integers(0, len(PROMOTIONS), n), mask=~promoted),
+        "is_b2b": pa.array(rng.random(n) < 0.007),
+        "fulfilled_by": _strings(["Easy Ship"], np.zeros(n, dtype=np.int8), mask=amazon),
+        "year": pa.array((dates.astype("datetime64[Y]").astype(np.int64) + 1970).astype(np.int32)),
+        "month": pa.array(month),
+        "month_name": _strings(MONTH_NAMES, month - 1),
+        "quarter": pa.array(quarter),
+        "quarter_name": _strings(["Q1", "Q2", "Q3", "Q4"], quarter - 1),
+        "revenue": pa.array(revenue),
+        "data_source": _strings(["Amazon India"], np.zeros(n, dtype=np.int8)),
+        "index": pa.nulls(n, pa.float64()),
+        "Months": pa.nulls(n, pa.string()),
+        "customer": pa.nulls(n, pa.string()),
+        "unit_price": pa.nulls(n, pa.float64()),
+        "order_value_category": _strings(["Low", "Medium", "High", "Premium"], value_band, mask=amount <= 0),
+        "is_cancelled": pa.array(cancelled),
+        "is_shipped": pa.array(cat.is_shipped[status]),
+        "has_promotion": pa.array(promoted),
+        "day_of_week": _strings(DAY_NAMES, weekday),
+        "is_weekend": pa.array(weekday >= 5),
+        "estimated_profit": pa.array(revenue * 0.30),
+    }
+    return pa.Table.from_arrays([columns[f.name] for f in PROCESSED_SCHEMA], schema=PROCESSED_SCHEMA)
+
+
+def plan_files(rows: int, start: str = DEFAULT_START, end: str = DEFAULT_END,
+               rows_per_file: int = DEFAULT_ROWS_PER_FILE) -> List[Dict]:
+    """
+    Spread rows over the days of the range and cut each month into files
+
+    Args:
+        rows: Total rows
+        start: First order date
+        end: Last order date
+        rows_per_file: Largest file
+
+    Returns:
+        One task per file: its month, day counts, slice of the month and first global row
+    """
+    days = pd.date_range(start, end, freq="D")
+    counts = allocate(rows, daily_weights(days))
+    tasks, offset = [], 0
+    for (year, month), positions in pd.Series(np.arange(len(days))).groupby([days.year, days.month]):
+        month_days = days[positions.to_numpy()].to_numpy().astype("datetime64[D]")
+        month_counts = counts[positions.to_numpy()]
+        total = int(month_counts.sum())
+        for part, lo in enumerate(range(0, total, rows_per_file)):
+            tasks.append({
+                "year": int(year), "month": int(month), "part": part, "days": month_days,
+                "counts": month_counts, "lo": lo, "hi": min(lo + rows_per_file, total), "offset": offset + lo,
+            })
+        offset += total
+    return tasks
+
+
+def _write_file(task: Dict, root: str, seed: int) -> int:
+    """Generate one file of a month partition (runs in a worker process)"""
+    dates = np.repeat(task["days"], task["counts"])[task["lo"]:task["hi"]]
+    table = generate_rows(dates, task["offset"], [seed, task["year"], task["month"], task["part"]])
+    directory = Path(root) / f"year={task['year']}" / f"month={task['month']}"
+    directory.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, directory / f"data_{task['part']}.parquet",
+                   row_group_size=DEFAULT_ROW_GROUP_SIZE, compression="snappy")
+    return table.num_rows
+
+
+def generate_partitioned(rows: int, output_dir: str = "data/synthetic_sales", workers: int = 1,
+                         start: str = DEFAULT_START, end: str = DEFAULT_END,
+                         rows_per_file: int = DEFAULT_ROWS_PER_FILE, seed: int = 42) -> str:
+    """
+    Generate a year=/month= partitioned Parquet dataset in the processed schema
+
+    The output is the same for any number of workers: every file has its own
+    random stream and row numbers.
+
+    Args:
+        rows: Total rows
+        output_dir: Dataset directory (replaced if it exists)
+        workers: Processes generating files side by side
+        start: First order date
+        end: Last order date
+        rows_per_file: Largest file (bounds each worker's memory)
+        seed: Random seed
+
+    Returns:
+        The dataset directory
+    """
+    tasks = plan_files(rows, start, end, rows_per_file)
+    root = Path(output_dir)
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True)
+
+    print(f"Generating {rows:,} sales records in {len(tasks)} files with {workers} workers...")
+    every = max(len(tasks) // 10, 1)
+    done = 0
+    args = (tasks, [str(root)] * len(tasks), [seed] * len(tasks))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for i, written in enumerate(pool.map(_write_file, *args) if pool else map(_write_file, *args), 1):
+            done += written
+            if i % every == 0 or i == len(tasks):
+                print(f"  Generated {done:,} records...")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return str(root)
+
+
+def generate_sales_data(num_rows=50000, output_path="data/sales_data.csv", seed=42,
+                        start=DEFAULT_START, end=DEFAULT_END):
+    """
+    Generate processed sales data in memory and save it as CSV or Parquet
+
     Args:
         num_rows: Number of sales records to generate
-        output_path: Path to save the CSV file
+        output_path: Path to save the file (.parquet for Parquet, CSV otherwise)
+        seed: Random seed
+        start: First order date
+        end: Last order date
     """
-    
-    # Seed for reproducibility
-    np.random.seed(42)
-    random.seed(42)
-    
-    # Define business entities
-    regions = ["North", "South", "East", "West", "Central"]
-    categories = ["Electronics", "Clothing", "Home & Garden", "Sports", "Toys", "Books"]
-    
-    products = {
-        "Electronics": ["Laptop", "Smartphone", "Tablet", "Headphones", "Smart Watch"],
-        "Clothing": ["T-Shirt", "Jeans", "Jacket", "Shoes", "Dress"],
-        "Home & Garden": ["Furniture", "Bedding", "Kitchen Appliances", "Garden Tools", "Decor"],
-        "Sports": ["Gym Equipment", "Sports Shoes", "Yoga Mat", "Bicycle", "Tennis Racket"],
-        "Toys": ["Action Figures", "Board Games", "Dolls", "Building Blocks", "Puzzles"],
-        "Books": ["Fiction", "Non-Fiction", "Children's Books", "Comics", "Textbooks"]
-    }
-    
-    channels = ["Online", "In-Store", "Mobile App"]
-    payment_methods = ["Credit Card", "Debit Card", "Cash", "Digital Wallet"]
-    
-    # Date range: 3 years of data
-    start_date = datetime(2021, 1, 1)
-    end_date = datetime(2023, 12, 31)
-    date_range = (end_date - start_date).days
-    
-    # Generate data
-    data = []
-    
-    print(f"Generating {num_rows:,} sales records...")
-    
-    for i in range(num_rows):
-        # Random date with seasonal trends
-        days_offset = random.randint(0, date_range)
-        sale_date = start_date + timedelta(days=days_offset)
-        month = sale_date.month
-        
-        # Seasonal factor (higher sales in Nov-Dec)
-        seasonal_factor = 1.5 if month in [11, 12] else 1.0
-        
-        # Select category and product
-        category = random.choice(categories)
-        product = random.choice(products[category])
-        
-        # Region
-        region = random.choice(regions)
-        
-        # Quantity (1-10 items per transaction)
-        quantity = random.randint(1, 10)
-        
-        # Base prices by category
-        base_prices = {
-            "Electronics": (200, 2000),
-            "Clothing": (20, 200),
-            "Home & Garden": (50, 500),
-            "Sports": (30, 300),
-            "Toys": (10, 100),
-            "Books": (10, 50)
-        }
-        
-        min_price, max_price = base_prices[category]
-        unit_price = round(random.uniform(min_price, max_price), 2)
-        
-        # Calculate revenue
-        revenue = round(quantity * unit_price * seasonal_factor, 2)
-        
-        # Cost (70-85% of revenue)
-        cost = round(revenue * random.uniform(0.70, 0.85), 2)
-        profit = round(revenue - cost, 2)
-        
-        # Channel (Online growing over time)
-        if sale_date.year == 2021:
-            channel = random.choices(channels, weights=[0.3, 0.6, 0.1])[0]
-        elif sale_date.year == 2022:
-            channel = random.choices(channels, weights=[0.4, 0.5, 0.1])[0]
-        else:
-            channel = random.choices(channels, weights=[0.5, 0.4, 0.1])[0]
-        
-        # Customer info
-        customer_id = f"CUST{random.randint(10000, 99999)}"
-        
-        # Transaction
-        transaction_id = f"TXN{i+1:08d}"
-        
-        data.append({
-            "transaction_id": transaction_id,
-            "date": sale_date.strftime("%Y-%m-%d"),
-            "year": sale_date.year,
-            "quarter": f"Q{(month-1)//3 + 1}",
-            "month": sale_date.strftime("%B"),
-            "region": region,
-            "category": category,
-            "product": product,
-            "quantity": quantity,
-            "unit_price": unit_price,
-            "revenue": revenue,
-            "cost": cost,
-            "profit": profit,
-            "channel": channel,
-            "payment_method": random.choice(payment_methods),
-            "customer_id": customer_id
-        })
-        
-        if (i + 1) % 10000 == 0:
-            print(f"  Generated {i+1:,} records...")
-    
-    # Create DataFrame
-    df = pd.DataFrame(data)
-    
-    # Save to CSV
-    df.to_csv(output_path, index=False)
-    
+    days = pd.date_range(start, end, freq="D")
+    dates = np.repeat(days.to_numpy().astype("datetime64[D]"), allocate(num_rows, daily_weights(days)))
+    df = generate_rows(dates, 0, seed).to_pandas()
+
+    if str(output_path).endswith(".parquet"):
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False)
+
     print(f"\n✅ Successfully generated {num_rows:,} records")
     print(f"📁 Saved to: {output_path}")
     print(f"\nDataset Summary:")
-    print(f"  Date Range: {df['date'].min()} to {df['date'].max()}")
-    print(f"  Total Revenue: ${df['revenue'].sum():,.2f}")
-    print(f"  Total Profit: ${df['profit'].sum():,.2f}")
-    print(f"  Regions: {', '.join(df['region'].unique())}")
-    print(f"  Categories: {', '.join(df['category'].unique())}")
-    print(f"\nSample Records:")
-    print(df.head(10).to_string())
-    
+    print(f"  Date Range: {df['date'].min():%Y-%m-%d} to {df['date'].max():%Y-%m-%d}")
+    print(f"  Total Revenue: ₹{df['revenue'].sum():,.2f}")
+    print(f"  Estimated Profit: ₹{df['estimated_profit'].sum():,.2f}")
+    print(f"  Top States: {', '.join(df['state'].value_counts().index[:5])}")
+    print(f"  Categories: {', '.join(df['category'].value_counts().index)}")
+
     return df
 
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, help="Rows to generate (overrides --scale)")
+    parser.add_argument("--scale", type=float, help=f"Scale factor: {ROWS_PER_SCALE:,} rows per unit")
+    parser.add_argument("--output", help="CSV/Parquet file, or dataset directory with --partitioned")
+    parser.add_argument("--partitioned", action="store_true",
+                        help="Write year=/month= partitioned Parquet (implied by --scale)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for partitioned output (0 = one per CPU)")
+    parser.add_argument("--rows-per-file", type=int, default=DEFAULT_ROWS_PER_FILE)
+    parser.add_argument("--start", default=DEFAULT_START)
+    parser.add_argument("--end", default=DEFAULT_END)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = args.rows or int((args.scale or 0) * ROWS_PER_SCALE) or 50000
+    if args.partitioned or args.scale:
+        started = time.perf_counter()
+        root = generate_partitioned(rows, args.output or "data/synthetic_sales", args.workers or os.cpu_count() or 1,
+                                    args.start, args.end, args.rows_per_file, args.seed)
+        print(f"\n✅ Successfully generated {rows:,} records in {time.perf_counter() - started:.1f}s")
+        print(f"📁 Saved to: {root} (query it with STORAGE_MODE=partitioned PARTITIONED_DATA_PATH={root})")
+    else:
+        generate_sales_data(rows, args.output or "data/sales_data.csv", args.seed, args.start, args.end)
+
+
 if __name__ == "__main__":
-    generate_sales_data()
+    main()
@@ -3,7 +3,7 @@ Unit tests for Retail Insights Assistant agents
 """
 import pytest
 import pandas as pd
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock, patch
 import sys
 import os
 
@@ -79,6 +79,33 @@ class TestDataExtractionAgent:
         
         assert "3 records" in summary
         assert "revenue" in summary.lower()
+    
+    def test_extract_arrow_result(self, tmp_path):
+        """Arrow mode keeps the result as a pyarrow.Table and converts lazily"""
+        csv_path = tmp_path / "sales.csv"
+        pd.DataFrame({
+            "category": ["Set", "Kurta", "Top"],
+            "revenue": [100.0, 200.0, 300.0]
+        }).to_csv(csv_path, index=False)
+        
+        agent = DataExtractionAgent(result_format="arrow")
+        agent.data_layer = DataLayer(csv_path=str(csv_path), db_path=":memory:")
+        state = AgentState(
+            question="Test question",
+            query_intent=Mock(sql_query="SELECT category, revenue FROM sales ORDER BY revenue"),
+            query_result=None,
+            validation_passed=False,
+            final_answer="",
+            error=None
+        )
+        
+        result = agent.extract_data(state)["query_result"]
+        
+        assert result["row_count"] == 3
+        assert result["data"][0] == {"category": "Set", "revenue": 100.0}
+        assert "min=100.00" in result["summary"]
+        assert "dataframe" not in dict.keys(result)
+        assert result["dataframe"]["revenue"].sum() == 600.0
 
 
 class TestValidationAgent:
@@ -126,6 +153,272 @@ class TestValidationAgent:
         
         result = agent.validate(state)
         assert result["validation_passed"] == True
+    
+    def test_validate_arrow_matches_pandas(self):
+        """Arrow results get the same verdict and scores as pandas results"""
+        import pyarrow as pa
+        agent = ValidationAgent()
+        
+        df = pd.DataFrame({
+            "state": ["A", "B", "C", "D"],
+            "revenue": [100.0, -5.0, 300.0, None],
+            "orders": [1, 2, 3, 4]
+        })
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        
+        assert agent._comprehensive_validation(table) == agent._comprehensive_validation(df)
+        assert agent.confidence_scorer.score(table) == pytest.approx(agent.confidence_scorer.score(df))
+    
+    def test_profile_flags_values_outside_the_data(self):
+        """Group-by keys outside the data's range and surplus distinct values are flagged"""
+        import pyarrow as pa
+        from utils.data_profile import DataProfile
+        data = pd.DataFrame({
+            "year": [2022] * 6,
+            "state": ["A", "B", "C", "A", "B", "C"],
+            "revenue": [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+        })
+        agent = ValidationAgent(data_profile=DataProfile.of(data))
+        
+        good = pd.DataFrame({"year": [2022], "state": ["A"], "revenue": [210.0]})
+        assert agent._comprehensive_validation(good).warnings == []
+        
+        bad = pd.DataFrame({"year": [2022] * 7 + [2025], "state": list("ABCDEFGH"), "revenue": [1.0] * 8})
+        result = agent._comprehensive_validation(bad)
+        assert result.passed
+        assert any("year" in w for w in result.warnings) and any("state" in w for w in result.warnings)
+        assert agent._comprehensive_validation(pa.Table.from_pandas(bad, preserve_index=False)) == result
+
+
+class TestLLMResponseCache:
+    """Test the persistent LLM response cache"""
+    
+    def test_repeated_prompts_skip_the_model_across_restarts(self, tmp_path):
+        """Exact and whitespace-variant repeats are answered from the SQLite file"""
+        from langchain_core.language_models import FakeListChatModel
+        from utils.llm_cache import CachedChatModel, LLMResponseCache
+        
+        path = str(tmp_path / "llm_cache.sqlite")
+        model = FakeListChatModel(responses=["first", "second"])
+        llm = CachedChatModel(llm=model, response_cache=LLMResponseCache(path), provider="fake", model_name="m")
+        
+        assert llm.invoke("Total sales in 2022?").content == "first"
+        assert llm.invoke("Total sales in 2022?").content == "first"
+        assert llm.invoke("  Total   sales in\n2022? ").content == "first"
+        assert llm.response_cache.get_stats()["exact_hits"] == 1
+        assert llm.response_cache.get_stats()["normalized_hits"] == 1
+        
+        restarted = CachedChatModel(llm=model, response_cache=LLMResponseCache(path), provider="fake", model_name="m")
+        assert restarted.invoke("Total sales in 2022?").content == "first"
+        # Another model or temperature is a different key
+        other = CachedChatModel(llm=model, response_cache=LLMResponseCache(path), provider="fake",
+                                model_name="m", temperature=0.1)
+        assert other.invoke("Total sales in 2022?").content == "second"
+    
+    def test_ttl_and_size_eviction(self):
+        """Expired entries miss and the least recently used go beyond max_entries"""
+        from langchain_core.messages import AIMessage
+        from langchain_core.outputs import ChatGeneration, ChatResult
+        from utils.llm_cache import LLMResponseCache
+        
+        cache = LLMResponseCache(":memory:", max_entries=2)
+        result = ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+        for key in ("a", "b", "c"):
+            cache.put(key, key, result, latency_s=1.0)
+        
+        assert cache.get("a", "a") is None
+        assert cache.get("c", "c")[0].generations[0].message.content == "ok"
+        assert cache.get_stats()["evictions"] == 1 and cache.get_stats()["entries"] == 2
+        
+        cache.ttl_seconds = 1e-9
+        assert cache.get("c", "c") is None
+        assert cache.get_stats()["expirations"] == 1
+
+
+class TestModelHealthRegistry:
+    """Test the per-model circuit breakers"""
+    
+    def test_breaker_opens_probes_once_and_recovers(self, monkeypatch):
+        """A rate-limited model is skipped, then re-admitted by a single half-open probe"""
+        import utils.model_health as model_health
+        
+        clock = [1000.0]
+        monkeypatch.setattr(model_health.time, "time", lambda: clock[0])
+        health = model_health.ModelHealthRegistry(cooldown_seconds=30)
+        models = ["a", "b", "c"]
+        
+        assert health.candidates(models) == models
+        health.record_failure("a", model_health.RATE_LIMIT)
+        assert health.candidates(models) == ["b", "c"]
+        
+        clock[0] += 31
+        assert health.candidates(models) == models
+        assert health.acquire("a")                      # this caller probes "a"
+        assert health.candidates(models) == ["b", "c"]  # others wait for the probe
+        assert not health.acquire("a")
+        health.record_failure("a", model_health.ERROR)
+        assert health.get_stats()["a"]["reopens_in_s"] == 60  # cooldown doubled
+        
+        clock[0] += 61
+        assert health.candidates(models)[0] == "a"
+        health.record_success("a", latency_s=0.5)
+        assert health.get_stats()["a"]["state"] == "closed"
+        
+        # A much slower model moves behind the others; all open still returns every model
+        health.record_success("b", latency_s=0.5)
+        health.record_success("c", latency_s=0.5)
+        health.record_success("a", latency_s=10.0)
+        assert health.candidates(models) == ["b", "c", "a"]
+        for model in models:
+            health.record_failure(model, model_health.RATE_LIMIT)
+        assert sorted(health.candidates(models)) == models
+    
+    def test_unsent_probe_does_not_block_the_model(self, monkeypatch):
+        """Listing a half-open model claims nothing; an unsettled claim is released"""
+        import utils.model_health as model_health
+        
+        clock = [1000.0]
+        monkeypatch.setattr(model_health.time, "time", lambda: clock[0])
+        health = model_health.ModelHealthRegistry(cooldown_seconds=30)
+        health.record_failure("b", model_health.RATE_LIMIT)
+        clock[0] += 31
+        
+        # The first caller is answered by "a" and never sends to "b"
+        assert health.candidates(["a", "b"]) == ["a", "b"]
+        assert health.acquire("a")
+        health.record_success("a", latency_s=0.5)
+        assert health.candidates(["a", "b"]) == ["a", "b"]
+        
+        # A claim whose request ended without an outcome is given back
+        assert health.acquire("b")
+        assert health.candidates(["a", "b"]) == ["a"]
+        health.release("b")
+        assert health.candidates(["a", "b"]) == ["a", "b"]
+        assert health.get_stats()["b"]["state"] == "half_open"
+
+
+class TestOpenRouterLLM:
+    """Test the OpenRouter wrapper's pooled clients"""
+    
+    def test_sync_and_async_fall_back_past_rate_limits(self, monkeypatch):
+        """Both paths go through the pooled clients and skip a rate-limited model"""
+        import asyncio
+        import json
+        import httpx
+        import utils.openrouter_llm as openrouter
+        from langchain_core.messages import HumanMessage
+        from utils.model_health import ModelHealthRegistry
+        
+        health = ModelHealthRegistry()
+        monkeypatch.setattr(openrouter, "get_model_health", lambda: health)
+        
+        def respond(model):
+            if model == "primary/model":
+                return 429, {}
+            return 200, {"choices": [{"message": {"content": f"answer from {model}"}}]}
+        
+        session = Mock()
+        session.post.side_effect = lambda **kwargs: Mock(
+            status_code=respond(kwargs["json"]["model"])[0], json=lambda: respond(kwargs["json"]["model"])[1], text=""
+        )
+        monkeypatch.setattr(openrouter, "get_http_session", lambda: session)
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(respond(json.loads(request.content)["model"])[0],
+                                           json=respond(json.loads(request.content)["model"])[1])
+        )
+        monkeypatch.setattr(openrouter, "get_async_http_client", lambda: httpx.AsyncClient(transport=transport))
+        
+        llm = openrouter.OpenRouterLLM(model="primary/model", api_key="key", base_url="https://mock/api/v1")
+        fallback = openrouter.OPENROUTER_FALLBACK_MODELS[0]
+        assert llm.invoke([HumanMessage(content="hi")]).content == f"answer from {fallback}"
+        assert session.post.call_count == 2
+        # The 429 opened the primary's breaker, so the next call goes straight to the fallback
+        assert llm.invoke([HumanMessage(content="hi")]).content == f"answer from {fallback}"
+        assert session.post.call_count == 3
+        assert health.get_stats()["openrouter:primary/model"]["state"] == "open"
+        assert asyncio.run(llm.ainvoke([HumanMessage(content="hi")])).content == f"answer from {fallback}"
+    
+    def test_stream_yields_server_sent_tokens(self, monkeypatch):
+        """_stream parses the SSE deltas and skips a rate-limited model before the first token"""
+        import utils.openrouter_llm as openrouter
+        from langchain_core.messages import HumanMessage
+        from utils.model_health import ModelHealthRegistry
+        
+        monkeypatch.setattr(openrouter, "get_model_health", lambda: ModelHealthRegistry())
+        events = [": OPENROUTER PROCESSING", "",
+                  'data: {"choices": [{"delta": {"role": "assistant", "content": ""}}]}', "",
+                  'data: {"choices": [{"delta": {"content": "Total "}}]}', "",
+                  'data: {"choices": [{"delta": {"content": "revenue"}}]}', "",
+                  "data: [DONE]"]
+        
+        def post(**kwargs):
+            assert kwargs["json"]["stream"] and kwargs["stream"]
+            response = MagicMock(status_code=429 if kwargs["json"]["model"] == "primary/model" else 200)
+            response.__enter__.return_value = response
+            response.iter_lines.return_value = iter(events)
+            return response
+        
+        monkeypatch.setattr(openrouter, "get_http_session", lambda: Mock(post=post))
+        llm = openrouter.OpenRouterLLM(model="primary/model", api_key="key", base_url="https://mock/api/v1")
+        tokens = [chunk.content for chunk in llm.stream([HumanMessage(content="hi")]) if chunk.content]
+        assert tokens == ["Total ", "revenue"]
+
+
+class TestOrchestratorStreaming:
+    """Test token streaming of the agent graph"""
+    
+    def test_stream_query_yields_response_tokens_then_the_rest(self):
+        """Response-node tokens stream as they come and join to the final answer"""
+        from langchain_core.language_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        from langgraph.graph import StateGraph, END
+        from agents.orchestrator import AgentOrchestrator
+        
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="Revenue grew 12% in Q2")]))
+        
+        def generate_response(state):
+            answer = llm.invoke(state["question"]).content
+            return {**state, "final_answer": answer + "\n\nNote: verify"}
+        
+        graph = StateGraph(AgentState)
+        graph.add_node("generate_response", generate_response)
+        graph.set_entry_point("generate_response")
+        graph.add_edge("generate_response", END)
+        orchestrator = AgentOrchestrator.__new__(AgentOrchestrator)
+        orchestrator.graph = graph.compile()
+        
+        pieces = list(orchestrator.stream_query("How did revenue do?"))
+        assert len(pieces) > 2
+        assert "".join(pieces) == "Revenue grew 12% in Q2\n\nNote: verify"
+        assert pieces[-1] == "\n\nNote: verify"
+
+
+class TestLLMRegistry:
+    """Test the shared LLM clients and compiled chains"""
+    
+    def test_agents_share_clients_and_chains(self, monkeypatch):
+        """Rebuilt agents reuse the client and chain; a new key builds new ones"""
+        from config import settings
+        from utils.llm_utils import clear_llm_registry, get_llm
+        
+        monkeypatch.setenv("LLM_PROVIDER", "groq")
+        monkeypatch.setenv("GROQ_API_KEY", "first-key")
+        monkeypatch.setattr(settings, "llm_cache_path", "")
+        clear_llm_registry()
+        try:
+            first, second = QueryResolutionAgent(), QueryResolutionAgent()
+            assert first.llm is second.llm and first.chain is second.chain
+            assert get_llm(temperature=0.1) is first.llm
+            assert get_llm(temperature=0) is not first.llm
+            
+            # Fixed prompt variables are bound once; only the question is left
+            assert first.chain.first.input_variables == ["question"]
+            
+            monkeypatch.setenv("GROQ_API_KEY", "second-key")
+            rebuilt = QueryResolutionAgent()
+            assert rebuilt.llm is not first.llm and rebuilt.chain is not first.chain
+        finally:
+            clear_llm_registry()
 
 
 class TestDataLayer:
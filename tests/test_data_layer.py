@@ -0,0 +1,975 @@
+"""
+Unit tests for the DuckDB data layer
+"""
+import duckdb
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_layer import DataLayer
+from utils.catalog import compute_fingerprint
+from utils.connection_pool import PoolTimeoutError
+from utils.partitioned_store import dataset_scan, write_partitioned
+from utils.query_cache import canonicalize_sql
+from utils.query_timeout import QueryTimeoutError
+from utils.data_ingestion import DataIngestionPipeline, DateParser, SeenKeys
+from utils.data_profile import DataProfile, profile_path
+from utils.ingestion_profiler import compare_reports, load_latest_report
+from utils.sql_ingestion import SQLIngestionEngine
+
+
+def make_sales_frame(n: int = 200) -> pd.DataFrame:
+    """Build a small frame shaped like processed_sales_data.csv"""
+    states = ["MAHARASHTRA", "KARNATAKA", "TELANGANA", "DELHI"]
+    categories = ["Set", "kurta", "Western Dress", "Top"]
+    statuses = ["Shipped", "Cancelled", "Shipped - Delivered to Buyer", "Pending"]
+    dates = pd.date_range("2022-03-01", periods=n, freq="D")
+
+    df = pd.DataFrame({
+        "order_id": [f"ORD-{i:05d}" for i in range(n)],
+        "date": dates,
+        "status": [statuses[i % 4] for i in range(n)],
+        "fulfilment": ["Amazon" if i % 3 else "Merchant" for i in range(n)],
+        "sku": [f"SKU-{i % 17}" for i in range(n)],
+        "category": [categories[i % 4] for i in range(n)],
+        "quantity": [1 + i % 3 for i in range(n)],
+        "amount": [100.0 + (i * 7) % 900 for i in range(n)],
+        "city": ["MUMBAI" if i % 2 else "BENGALURU" for i in range(n)],
+        "state": [states[i % 4] for i in range(n)],
+        "is_b2b": [i % 5 == 0 for i in range(n)],
+        "year": dates.year,
+        "month": dates.month,
+        "quarter": dates.quarter,
+    })
+    df["is_cancelled"] = df["status"] == "Cancelled"
+    df["revenue"] = df["amount"].where(~df["is_cancelled"], 0.0)
+    df["estimated_profit"] = df["revenue"] * 0.30
+    return df
+
+
+@pytest.fixture
+def sales_csv(tmp_path):
+    """Write the sample frame to a CSV file"""
+    path = tmp_path / "processed_sales_data.csv"
+    make_sales_frame().to_csv(path, index=False)
+    return path
+
+
+class TestPersistentCatalog:
+    """Test the fingerprinted on-disk catalog"""
+
+    def test_restart_reuses_catalog(self, sales_csv, tmp_path, monkeypatch):
+        """A restart with an unchanged source attaches the existing table"""
+        db_path = str(tmp_path / "catalog.duckdb")
+        dl = DataLayer(csv_path=str(sales_csv), db_path=db_path)
+        assert dl.catalog.is_current(str(sales_csv))
+        dl.close()
+
+        reloads = []
+        monkeypatch.setattr(DataLayer, "load_file", lambda self, file_path: reloads.append(file_path))
+        dl = DataLayer(csv_path=str(sales_csv), db_path=db_path)
+        assert reloads == []
+        assert dl.execute_query("SELECT COUNT(*) AS n FROM sales")["n"].iloc[0] == 200
+        dl.close()
+
+    def test_changed_source_triggers_rebuild(self, sales_csv, tmp_path):
+        """A modified source is detected and the table rebuilt"""
+        db_path = str(tmp_path / "catalog.duckdb")
+        DataLayer(csv_path=str(sales_csv), db_path=db_path).close()
+
+        make_sales_frame(50).to_csv(sales_csv, index=False)
+        dl = DataLayer(csv_path=str(sales_csv), db_path=db_path)
+        assert dl.execute_query("SELECT COUNT(*) AS n FROM sales")["n"].iloc[0] == 50
+        assert dl.catalog.get().matches(compute_fingerprint(str(sales_csv)))
+        dl.close()
+
+
+class TestSummaryStats:
+    """Test the single-pass cached summary statistics"""
+
+    def test_summary_matches_table(self, sales_csv):
+        """Rollup slices agree with direct aggregates"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        stats = dl.get_summary_stats()
+
+        expected = make_sales_frame()
+        assert stats["overall"]["total_orders"] == len(expected)
+        assert stats["overall"]["total_revenue"] == round(expected["revenue"].sum(), 2)
+        assert {r["category"] for r in stats["by_category"]} == set(expected["category"])
+        assert sum(r["orders"] for r in stats["monthly_trend"]) == len(expected)
+
+    def test_summary_cached_until_reload(self, sales_csv):
+        """Repeated calls reuse the cache and load_file invalidates it"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        first = dl.get_summary_stats()
+        assert dl.get_summary_stats() is first
+
+        make_sales_frame(40).to_csv(sales_csv, index=False)
+        dl.load_file(str(sales_csv))
+        assert dl.get_summary_stats()["overall"]["total_orders"] == 40
+
+
+class TestQueryCache:
+    """Test the query result cache"""
+
+    def test_equivalent_queries_hit(self, sales_csv):
+        """Whitespace, casing and alias differences share one cache entry"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        first = dl.execute_query(
+            "SELECT state, SUM(revenue) AS total_revenue FROM sales GROUP BY state ORDER BY total_revenue DESC"
+        )
+        second = dl.execute_query(
+            "select state,\n  sum(revenue) as rev\nfrom sales group by state order by rev desc"
+        )
+
+        stats = dl.get_cache_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert list(second.columns) == ["state", "rev"]
+        assert second["rev"].tolist() == first["total_revenue"].tolist()
+
+    def test_column_aliases_are_not_conflated(self, sales_csv):
+        """Aliases named after columns keep queries on different columns apart"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        revenue = dl.execute_query("SELECT SUM(revenue) AS revenue FROM sales")
+        amount = dl.execute_query("SELECT SUM(amount) AS amount FROM sales")
+
+        assert dl.get_cache_stats()["hits"] == 0
+        assert revenue["revenue"].iloc[0] != amount["amount"].iloc[0]
+
+    def test_casts_and_comments_keep_queries_apart(self, sales_csv):
+        """CAST target types and commented-out SQL are part of the key"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        as_int = dl.execute_query("SELECT CAST(amount AS INT) AS a FROM sales LIMIT 3")
+        as_text = dl.execute_query("SELECT CAST(amount AS TEXT) AS a FROM sales LIMIT 3")
+        assert as_int["a"].dtype != as_text["a"].dtype
+        assert dl.execute_query("SELECT 1 AS a -- note\n, 2 AS b").shape == (1, 2)
+        assert dl.execute_query("SELECT 1 AS a -- note, 2 AS b").shape == (1, 1)
+        assert dl.get_cache_stats()["hits"] == 0
+
+    def test_cached_results_are_not_shared(self, sales_csv):
+        """In-place edits by one caller do not change later cache hits"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        query = "SELECT state, COUNT(*) AS n FROM sales GROUP BY state ORDER BY state"
+        first = dl.execute_query(query)
+        first.loc[0, "n"] = -1
+        second = dl.execute_query(query)
+        second.loc[1, "n"] = -1
+
+        assert dl.execute_query(query)["n"].tolist() == [50] * 4
+        assert dl.get_cache_stats()["hits"] == 2
+
+    def test_volatile_queries_are_not_cached(self, sales_csv):
+        """Random functions and sampling clauses are run again every time"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        for query in ["SELECT RANDOM() AS r FROM sales LIMIT 1",
+                      "SELECT order_id FROM sales USING SAMPLE 10 ROWS",
+                      "SELECT order_id FROM sales TABLESAMPLE 5%",
+                      "SELECT AVG(amount) AS a FROM sales USING SAMPLE 10% (bernoulli)"]:
+            assert not canonicalize_sql(query).cacheable, query
+            dl.execute_query(query)
+            dl.execute_query(query)
+        assert dl.get_cache_stats()["entries"] == 0
+        assert dl.get_cache_stats()["hits"] == 0
+
+    def test_lru_eviction_and_invalidation(self, sales_csv):
+        """The byte budget evicts old entries and load_file clears the cache"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        dl.query_cache.max_bytes = dl.query_cache.max_entry_bytes = 2000
+
+        for limit in (10, 20, 30, 40):
+            dl.execute_query(f"SELECT order_id, amount FROM sales LIMIT {limit}")
+        assert dl.get_cache_stats()["evictions"] > 0
+        assert dl.get_cache_stats()["bytes"] <= 2000
+
+        dl.load_file(str(sales_csv))
+        assert dl.get_cache_stats()["entries"] == 0
+
+
+class TestStreaming:
+    """Test streamed execution of large results"""
+
+    def test_bounded_returns_handle_above_threshold(self, sales_csv):
+        """Small results materialize; large ones come back as a lazy handle"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        result, handle = dl.execute_bounded("SELECT state, COUNT(*) AS n FROM sales GROUP BY state", 10)
+        assert handle is None and len(result) == 4
+
+        result, handle = dl.execute_bounded("SELECT order_id, amount FROM sales ORDER BY order_id", 50)
+        assert result is None
+        assert handle.row_count == 200
+        assert handle.head(5).column("order_id").to_pylist() == [f"ORD-{i:05d}" for i in range(5)]
+
+    def test_handle_batches_stats_and_parquet(self, sales_csv, tmp_path):
+        """Batches cover the whole result and stats/exports are computed in DuckDB"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        handle = dl.execute_streaming("SELECT order_id, amount FROM sales", batch_size=64)
+
+        assert sum(batch.num_rows for batch in handle.iter_batches()) == 200
+        assert handle.numeric_summary()["amount"]["sum"] == pytest.approx(make_sales_frame()["amount"].sum())
+
+        path = handle.to_parquet(str(tmp_path / "export.parquet"))
+        assert len(pd.read_parquet(path)) == 200
+
+    def test_extraction_agent_streams_large_results(self, sales_csv):
+        """The extraction agent keeps only a preview plus full-result statistics"""
+        from unittest.mock import Mock
+        from agents.extraction_agent import DataExtractionAgent
+
+        agent = DataExtractionAgent(stream_threshold_rows=50)
+        agent.data_layer = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        state = {"query_intent": Mock(sql_query="SELECT order_id, revenue FROM sales")}
+
+        result = agent.extract_data(state)["query_result"]
+        assert result["truncated"] is True
+        assert result["row_count"] == 200
+        assert result["table"].num_rows <= agent.preview_rows
+        assert result["column_stats"]["revenue"]["count"] == 200
+
+
+class TestCursorPool:
+    """Test concurrent access through pooled cursors"""
+
+    def test_concurrent_queries(self, sales_csv):
+        """Several threads query the shared data layer at once"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        dl.query_cache.max_bytes = dl.query_cache.max_entry_bytes = 0  # force real queries
+
+        def count_state(i):
+            state = ["MAHARASHTRA", "KARNATAKA", "TELANGANA", "DELHI"][i % 4]
+            return dl.execute_query(f"SELECT COUNT(*) AS n FROM sales WHERE state = '{state}'")["n"].iloc[0]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            counts = list(executor.map(count_state, range(32)))
+
+        assert counts == [50] * 32
+        stats = dl.get_pool_stats()
+        assert stats["created"] <= stats["max_size"]
+        assert stats["checkouts"] >= 32 and stats["in_use"] == 0
+
+    def test_checkout_times_out_when_exhausted(self, sales_csv):
+        """Checkouts beyond max_size wait, then fail with a timeout"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        held = [dl.pool.checkout() for _ in range(dl.pool.max_size)]
+
+        with pytest.raises(PoolTimeoutError):
+            dl.pool.checkout(timeout=0.05)
+        assert dl.get_pool_stats()["timeouts"] == 1
+
+        for cursor in held:
+            dl.pool.checkin(cursor)
+        assert dl.execute_query("SELECT COUNT(*) AS n FROM sales")["n"].iloc[0] == 200
+
+
+class TestRollup:
+    """Test the materialized rollup and aggregate navigation"""
+
+    QUERIES = [
+        "SELECT SUM(revenue) as total_revenue, COUNT(*) as orders FROM sales WHERE year = 2022 AND month = 3",
+        "SELECT state, SUM(revenue) as total_revenue, COUNT(*) as orders FROM sales "
+        "WHERE state IS NOT NULL GROUP BY state ORDER BY total_revenue DESC LIMIT 1",
+        "SELECT SUM(CASE WHEN is_cancelled THEN 1 ELSE 0 END) * 100.0 / COUNT(*) as cancellation_rate FROM sales",
+        "SELECT CASE WHEN is_b2b THEN 'B2B' ELSE 'B2C' END as customer_type, SUM(revenue) as total_revenue "
+        "FROM sales GROUP BY is_b2b ORDER BY total_revenue",
+        "SELECT ROUND(SUM(revenue), 2) as total_revenue, CAST(year AS INTEGER) as y FROM sales GROUP BY year",
+        "SELECT year -- year\n, SUM(revenue) as total_revenue /* by year */ FROM sales GROUP BY year",
+        "SELECT category, AVG(amount), MAX(quantity) FROM sales GROUP BY category ORDER BY category",
+    ]
+
+    def test_rewritten_queries_match_fact_table(self, sales_csv):
+        """Covered queries read the rollup and return the fact-table answer"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        for query in self.QUERIES:
+            sql, from_rollup = dl.rollup.navigate(dl.conn, query)
+            assert from_rollup, query
+            expected = dl.conn.execute(query).fetchdf()
+            actual = dl.conn.execute(sql).fetchdf()
+            pd.testing.assert_frame_equal(actual, expected, check_exact=False)
+
+    def test_uncovered_queries_fall_back(self, sales_csv):
+        """Row-level queries and non-rollup columns go to the fact table"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        for query in ["SELECT * FROM sales LIMIT 5",
+                      "SELECT city, SUM(revenue) FROM sales GROUP BY city",
+                      "SELECT SUM(amount) FROM sales WHERE amount > 500"]:
+            assert dl.rollup.rewrite(query) is None
+        assert dl.execute_query("SELECT SUM(amount) AS a FROM sales WHERE amount > 500")["a"].iloc[0] > 0
+
+    def test_unknown_functions_and_shadowing_aliases_fall_back(self, sales_csv, monkeypatch):
+        """Unlisted functions and aliases named after fact columns give the fact-table answer"""
+        from config import settings
+        queries = [
+            "SELECT state, COUNT_IF(is_cancelled) AS n FROM sales GROUP BY state ORDER BY state",
+            "SELECT MODE(state) AS top_state FROM sales",
+            "SELECT state AS city, SUM(revenue) AS total FROM sales WHERE city = 'MUMBAI' "
+            "GROUP BY state ORDER BY city",
+        ]
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        monkeypatch.setattr(settings, "enable_rollup", False)
+        direct = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        assert not direct.get_rollup_stats()["ready"]
+
+        for query in queries:
+            assert dl.rollup.rewrite(query) is None, query
+            pd.testing.assert_frame_equal(dl.execute_query(query), direct.execute_query(query))
+        assert dl.get_rollup_stats()["rewrites"] == 0
+
+    def test_rollup_persists_and_tracks_reloads(self, sales_csv, tmp_path):
+        """A restart reuses the stored rollup and a reload rebuilds it"""
+        db_path = str(tmp_path / "catalog.duckdb")
+        DataLayer(csv_path=str(sales_csv), db_path=db_path).close()
+
+        dl = DataLayer(csv_path=str(sales_csv), db_path=db_path)
+        assert dl.get_rollup_stats()["ready"]
+        make_sales_frame(40).to_csv(sales_csv, index=False)
+        dl.load_file(str(sales_csv))
+        assert dl.execute_query("SELECT COUNT(*) AS n FROM sales")["n"].iloc[0] == 40
+        assert dl.get_rollup_stats()["rewrites"] >= 1
+        dl.close()
+
+    def test_stale_rollup_is_not_reused(self, sales_csv, tmp_path, monkeypatch):
+        """A reload without the rollup drops it, and a rollup of another source is never attached"""
+        from config import settings
+        db_path = str(tmp_path / "catalog.duckdb")
+        DataLayer(csv_path=str(sales_csv), db_path=db_path).close()
+
+        monkeypatch.setattr(settings, "enable_rollup", False)
+        make_sales_frame(250).to_csv(sales_csv, index=False)
+        dl = DataLayer(csv_path=str(sales_csv), db_path=db_path)
+        tables = dl.conn.execute("SELECT table_name FROM duckdb_tables()").fetchdf()["table_name"].tolist()
+        assert "_rollup_sales" not in tables
+        # Leave a rollup of different data behind, as a failed drop would
+        dl.conn.execute("CREATE TABLE _rollup_sales AS SELECT year, COUNT(*) AS _rows, "
+                        "SUM(revenue) AS _sum_revenue FROM sales WHERE month = 3 GROUP BY year")
+        dl.conn.execute("COMMENT ON TABLE _rollup_sales IS 'another source'")
+        dl.close()
+
+        monkeypatch.setattr(settings, "enable_rollup", True)
+        dl = DataLayer(csv_path=str(sales_csv), db_path=db_path)
+        assert dl.get_rollup_stats()["ready"]
+        assert dl.execute_query("SELECT COUNT(*) AS n FROM sales")["n"].iloc[0] == 250
+        assert dl.get_rollup_stats()["rewrites"] == 1
+        dl.close()
+
+
+class TestPartitionedStorage:
+    """Test the hive-partitioned Parquet backend"""
+
+    def test_partitioned_dataset_matches_table(self, sales_csv, tmp_path):
+        """A view over year=/month= files answers like the loaded table"""
+        root = write_partitioned(make_sales_frame(), str(tmp_path / "processed_sales"))
+        assert (tmp_path / "processed_sales" / "year=2022" / "month=3").is_dir()
+
+        table = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        dataset = DataLayer(csv_path=root, db_path=":memory:")
+        query = ("SELECT state, SUM(revenue) AS revenue, COUNT(*) AS orders FROM sales "
+                 "WHERE year = 2022 AND month = 5 GROUP BY state ORDER BY state")
+
+        pd.testing.assert_frame_equal(dataset.execute_query(query), table.execute_query(query))
+        assert list(dataset.schema_info["column_name"]) == list(table.schema_info["column_name"])
+
+    def test_partition_filters_prune_files(self, tmp_path):
+        """A year/month filter reads one partition's files"""
+        root = write_partitioned(make_sales_frame(), str(tmp_path / "processed_sales"))
+        dl = DataLayer(csv_path=root, db_path=":memory:")
+
+        plan = dl.conn.execute(
+            "EXPLAIN ANALYZE SELECT SUM(revenue) FROM sales WHERE year = 2022 AND month = 5"
+        ).fetchall()[0][1]
+        assert "Total Files Read: 1" in plan
+
+    def test_restart_reuses_dataset_view(self, tmp_path):
+        """The dataset directory is fingerprinted like a file"""
+        root = write_partitioned(make_sales_frame(), str(tmp_path / "processed_sales"))
+        db_path = str(tmp_path / "catalog.duckdb")
+        DataLayer(csv_path=root, db_path=db_path).close()
+
+        dl = DataLayer(csv_path=root, db_path=db_path)
+        assert dl.catalog.is_current(root)
+        assert dl.execute_query("SELECT COUNT(*) AS n FROM sales")["n"].iloc[0] == 200
+        dl.close()
+
+
+class TestExternalTables:
+    """Test the zero-load view mode"""
+
+    @pytest.mark.parametrize("fmt", ["csv", "parquet"])
+    def test_view_mode_matches_copy_mode(self, tmp_path, monkeypatch, fmt):
+        """A view over the file answers like the copied table"""
+        from config import settings
+
+        source = tmp_path / f"sales.{fmt}"
+        frame = make_sales_frame()
+        frame.to_csv(source, index=False) if fmt == "csv" else frame.to_parquet(source, index=False)
+        query = "SELECT category, SUM(amount) AS total, COUNT(*) AS n FROM sales GROUP BY category ORDER BY category"
+
+        copied = DataLayer(csv_path=str(source), db_path=":memory:")
+        monkeypatch.setattr(settings, "load_mode", "view")
+        viewed = DataLayer(csv_path=str(source), db_path=":memory:")
+
+        kind = viewed.conn.execute(
+            "SELECT table_type FROM information_schema.tables WHERE table_name = 'sales'"
+        ).fetchone()[0]
+        assert kind == "VIEW"
+        pd.testing.assert_frame_equal(viewed.execute_query(query), copied.execute_query(query))
+
+
+class TestResourceGovernance:
+    """Test DuckDB resource limits and query deadlines"""
+
+    def test_runaway_query_times_out(self, sales_csv, monkeypatch):
+        """A cross join is interrupted at the deadline and the cursor stays usable"""
+        from config import settings
+        monkeypatch.setattr(settings, "query_timeout_seconds", 0.3)
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+
+        with pytest.raises(QueryTimeoutError):
+            dl.execute_query("SELECT COUNT(*) FROM sales a, sales b, sales c, sales d")
+        assert dl.get_pool_stats()["query_timeouts"] == 1
+        assert dl.execute_query("SELECT COUNT(*) AS n FROM sales")["n"].iloc[0] == 200
+
+    def test_streamed_queries_time_out(self, sales_csv, monkeypatch):
+        """Queries behind a streaming handle are interrupted at the deadline too"""
+        from config import settings
+        monkeypatch.setattr(settings, "query_timeout_seconds", 0.3)
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        handle = dl.execute_streaming("SELECT a.amount FROM sales a, sales b, sales c, sales d")
+
+        with pytest.raises(QueryTimeoutError):
+            handle.numeric_summary()
+        with pytest.raises(QueryTimeoutError):
+            handle.row_count
+        assert dl.get_pool_stats()["query_timeouts"] == 2
+        assert dl.get_pool_stats()["in_use"] == 0
+        assert handle.head(5).num_rows == 5
+
+    def test_slow_consumers_and_exports_outlast_the_timeout(self, sales_csv, tmp_path, monkeypatch):
+        """The deadline covers query work, not time spent between batches or writing an export"""
+        import time
+        from config import settings
+        monkeypatch.setattr(settings, "query_timeout_seconds", 0.3)
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+
+        rows = 0
+        for batch in dl.execute_streaming("SELECT order_id FROM sales", batch_size=16).iter_batches():
+            time.sleep(0.05)
+            rows += batch.num_rows
+        assert rows == 200
+
+        monkeypatch.setattr(settings, "query_timeout_seconds", 0.01)
+        handle = dl.execute_streaming("SELECT a.amount FROM sales a, sales b, sales c")
+        path = handle.to_parquet(str(tmp_path / "export.parquet"))
+        assert pd.read_parquet(path).shape[0] == 200 ** 3
+        assert dl.get_pool_stats()["query_timeouts"] == 0
+
+    def test_timeout_reaches_retry_path(self, sales_csv, monkeypatch):
+        """The extraction agent reports the timeout as a retryable error"""
+        from unittest.mock import Mock
+        from config import settings
+        from agents.extraction_agent import DataExtractionAgent
+
+        monkeypatch.setattr(settings, "query_timeout_seconds", 0.3)
+        agent = DataExtractionAgent()
+        agent.data_layer = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        state = {"query_intent": Mock(sql_query="SELECT COUNT(*) FROM sales a, sales b, sales c, sales d")}
+
+        result = agent.extract_data(state)
+        assert result["query_result"] is None
+        assert "timed out" in result["error"]
+
+    def test_resource_limits_applied(self, sales_csv, tmp_path, monkeypatch):
+        """Memory, thread and spill settings reach DuckDB"""
+        from config import settings
+        monkeypatch.setattr(settings, "duckdb_memory_limit", "512MB")
+        monkeypatch.setattr(settings, "duckdb_threads", 2)
+        monkeypatch.setattr(settings, "duckdb_temp_directory", str(tmp_path / "spill"))
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+
+        threads, temp_dir = dl.conn.execute(
+            "SELECT current_setting('threads'), current_setting('temp_directory')"
+        ).fetchone()
+        assert threads == 2
+        assert temp_dir == str(tmp_path / "spill")
+
+
+class TestIncrementalLoad:
+    """Test appending and upserting delta files"""
+
+    @pytest.fixture
+    def delta_setup(self, tmp_path):
+        """Base file with the first 150 orders, delta with orders 100-199 (first 20 changed)"""
+        full = make_sales_frame()
+        base_path = tmp_path / "base.csv"
+        full.iloc[:150].to_csv(base_path, index=False)
+
+        delta = full.iloc[100:].copy()
+        delta.loc[delta.index[:20], "amount"] += 1000.0
+        delta["revenue"] = delta["amount"].where(~delta["is_cancelled"], 0.0)
+        delta_path = tmp_path / "delta.csv"
+        delta.to_csv(delta_path, index=False)
+        return base_path, delta_path, delta
+
+    def test_upsert_replaces_and_inserts(self, delta_setup):
+        """Existing orders are replaced and new ones added"""
+        base_path, delta_path, delta = delta_setup
+        dl = DataLayer(csv_path=str(base_path), db_path=":memory:")
+        version = dl.data_version
+
+        result = dl.append_file(str(delta_path))
+        assert result == {"rows_in_file": 100, "inserted": 100, "replaced": 50, "skipped": 0, "total_rows": 200}
+        assert dl.data_version == version + 1
+        total = dl.execute_query("SELECT SUM(amount) AS a FROM sales")["a"].iloc[0]
+        expected = make_sales_frame()["amount"].iloc[:100].sum() + delta["amount"].sum()
+        assert total == pytest.approx(expected)
+
+    def test_append_skips_existing_keys(self, delta_setup):
+        """Append mode keeps the stored version of orders already present"""
+        base_path, delta_path, _ = delta_setup
+        dl = DataLayer(csv_path=str(base_path), db_path=":memory:")
+
+        result = dl.append_file(str(delta_path), mode="append")
+        assert (result["inserted"], result["skipped"]) == (50, 50)
+        total = dl.execute_query("SELECT SUM(amount) AS a FROM sales")["a"].iloc[0]
+        assert total == pytest.approx(make_sales_frame()["amount"].sum())
+
+    def test_profile_follows_loads_and_appends(self, delta_setup, tmp_path):
+        """The data layer's profile is the loaded source's, widened by appends and dropped on reload"""
+        from agents.validation_agent import ValidationAgent
+        base_path, delta_path, _ = delta_setup
+        DataProfile.of(make_sales_frame().iloc[:150]).save(str(profile_path(str(base_path))))
+        dl = DataLayer(csv_path=str(base_path), db_path=":memory:")
+        agent = ValidationAgent(data_layer=dl)
+        assert dl.data_profile.rows == 150
+
+        september = pd.DataFrame({"month": [9], "orders": [10]})
+        assert any("month" in w for w in agent._comprehensive_validation(september).warnings)
+        dl.append_file(str(delta_path))
+        assert dl.data_profile["month"].max == 9
+        assert agent._comprehensive_validation(september).warnings == []
+
+        # A source without a profile (or with a stale one) has no range check
+        dl.load_file(str(delta_path))
+        assert dl.data_profile is None and agent.data_profile is None
+        DataProfile.of(make_sales_frame().iloc[:10]).save(str(profile_path(str(delta_path))))
+        dl.load_file(str(delta_path))
+        assert dl.data_profile is None
+
+    def test_appended_profile_survives_restart(self, delta_setup, tmp_path):
+        """A restart uses the profile widened by the append, and a reload goes back to the source's"""
+        base_path, delta_path, _ = delta_setup
+        db_path = str(tmp_path / "catalog.duckdb")
+        DataProfile.of(make_sales_frame().iloc[:150]).save(str(profile_path(str(base_path))))
+        dl = DataLayer(csv_path=str(base_path), db_path=db_path)
+        dl.append_file(str(delta_path))
+        dl.close()
+
+        dl = DataLayer(csv_path=str(base_path), db_path=db_path)
+        assert dl.data_profile["month"].max == 9
+        dl.load_file(str(base_path))
+        dl.close()
+
+        dl = DataLayer(csv_path=str(base_path), db_path=db_path)
+        assert dl.data_profile.rows == 150 and dl.data_profile["month"].max < 9
+        dl.close()
+
+    def test_rollup_updated_incrementally(self, delta_setup):
+        """The incrementally maintained rollup equals a full rebuild"""
+        base_path, delta_path, _ = delta_setup
+        dl = DataLayer(csv_path=str(base_path), db_path=":memory:")
+        dl.append_file(str(delta_path))
+        assert dl.rollup.data_version == dl.data_version
+
+        order = ", ".join(dl.rollup.dimensions)
+        incremental = dl.conn.execute(f"SELECT * FROM _rollup_sales ORDER BY {order}").fetchdf()
+        dl.rollup.build(dl.conn, dl.schema_info["column_name"].tolist(), dl.data_version)
+        rebuilt = dl.conn.execute(f"SELECT * FROM _rollup_sales ORDER BY {order}").fetchdf()
+        pd.testing.assert_frame_equal(incremental, rebuilt, check_exact=False)
+
+
+@pytest.fixture
+def raw_sales_dir(tmp_path):
+    """Write small raw Amazon/International reports with the usual mess in them"""
+    n = 300
+    dates = pd.date_range("2022-03-31", periods=n, freq="D")
+    amazon = pd.DataFrame({
+        "index": range(n),
+        "Order ID": [f"405-{i % 250}" for i in range(n)],  # 50 duplicate orders
+        "Date": [d.strftime("%Y-%m-%d" if i % 40 == 0 else "%m-%d-%y") for i, d in enumerate(dates)],
+        "Status": [None if i % 31 == 0 else [" Cancelled", "Shipped", "Returned", "Pending"][i % 4]
+                   for i in range(n)],
+        "Sales Channel ": "Amazon.in",
+        "SKU": [f"SKU-{i % 17}" for i in range(n)],
+        "Category": [None if i % 23 == 0 else ["Set ", "kurta", "Top"][i % 3] for i in range(n)],
+        "Qty": [i % 4 for i in range(n)],
+        "Amount": [None if i % 19 == 0 else -5.0 if i % 97 == 0 else round(50 + i * 4.37, 2) for i in range(n)],
+        "ship-city": [["MUMBAI", " PUNE", None][i % 3] for i in range(n)],
+        "ship-state": [None if i % 13 == 0 else "MAHARASHTRA" for i in range(n)],
+        "ship-postal-code": [None if i % 11 == 0 else 400001.0 for i in range(n)],
+        "promotion-ids": [None if i % 2 else "PLCC" for i in range(n)],
+        "B2B": [i % 7 == 0 for i in range(n)],
+        "Unnamed: 22": None,
+    })
+    international = pd.DataFrame({
+        "index": range(20),
+        "DATE": ["DATE" if i == 3 else f"06-{i + 1:02d}-21" for i in range(20)],  # repeated header row
+        "CUSTOMER": "VISHA DEVI",
+        "SKU": [f"MEN{i}" for i in range(20)],
+        "PCS": ["PCS" if i == 3 else str(1 + i % 3) for i in range(20)],
+        "RATE": "616.56",
+        "GROSS AMT": [str(100 + i) for i in range(20)],
+    })
+    amazon.to_csv(tmp_path / "Amazon Sale Report.csv", index=False)
+    international.to_csv(tmp_path / "International sale Report.csv", index=False)
+    return tmp_path
+
+
+class TestDictionaryEncoding:
+    """Test ENUM storage and categorical query results"""
+
+    def test_enum_columns_give_categorical_results(self, sales_csv):
+        """Low-cardinality columns are ENUMs and come back as compact categoricals"""
+        dl = DataLayer(csv_path=str(sales_csv), db_path=":memory:")
+        types = dict(zip(dl.schema_info["column_name"], dl.schema_info["column_type"]))
+        assert types["status"].startswith("ENUM(") and types["sku"] == "VARCHAR"
+        assert "- status: VARCHAR" in dl.get_schema_context()
+
+        result = dl.execute_query(
+            "SELECT state, COUNT(*) AS n FROM sales WHERE status LIKE 'Ship%' AND state = 'MAHARASHTRA' GROUP BY state"
+        )
+        assert isinstance(result["state"].dtype, pd.CategoricalDtype)
+        assert list(result["state"].cat.categories) == ["MAHARASHTRA"]
+        assert result["n"].iloc[0] == 50
+
+    def test_append_widens_enums(self, tmp_path):
+        """A delta with values new to an ENUM is inserted, indexes and rollup included"""
+        full = make_sales_frame()
+        base_path, delta_path = tmp_path / "base.csv", tmp_path / "delta.csv"
+        full.iloc[:150].to_csv(base_path, index=False)
+        delta = full.iloc[150:].copy()
+        delta["status"] = "Returned"
+        delta.to_csv(delta_path, index=False)
+
+        dl = DataLayer(csv_path=str(base_path), db_path=":memory:")
+        assert dl.append_file(str(delta_path))["inserted"] == 50
+
+        query = "SELECT status, COUNT(*) AS n FROM sales GROUP BY status ORDER BY status"
+        counts = dl.execute_query(query)
+        assert counts.set_index("status")["n"].to_dict()["Returned"] == 50
+        assert list(counts["status"]) == sorted(counts["status"])
+        assert dl.rollup.data_version == dl.data_version and dl.get_rollup_stats()["rewrites"] == 1
+        indexes = dl.conn.execute("SELECT index_name FROM duckdb_indexes() WHERE table_name = 'sales'").fetchall()
+        assert ("idx_status",) in indexes
+
+
+class TestIngestionEngines:
+    """Test the DuckDB ingestion engine against the pandas one"""
+
+    @staticmethod
+    def _outputs(data_dir):
+        pandas_df = DataIngestionPipeline(str(data_dir), engine="pandas")._transform_with_pandas()
+        duckdb_df = SQLIngestionEngine(str(data_dir)).run()
+        return pandas_df.to_csv(index=False), duckdb_df.to_csv(index=False)
+
+    @pytest.mark.filterwarnings("ignore::UserWarning")
+    def test_output_byte_identical(self, raw_sales_dir):
+        """Both engines write the same processed CSV"""
+        pandas_csv, duckdb_csv = self._outputs(raw_sales_dir)
+        assert duckdb_csv == pandas_csv
+
+    @pytest.mark.filterwarnings("ignore::UserWarning")
+    def test_date_fallback_and_single_source(self, raw_sales_dir):
+        """Unparseable dates take the flexible path; the international file is optional"""
+        (raw_sales_dir / "International sale Report.csv").unlink()
+        path = raw_sales_dir / "Amazon Sale Report.csv"
+        raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+        raw.loc[[5, 9], "Date"] = ["", "not a date"]
+        raw.to_csv(path, index=False)
+
+        pandas_csv, duckdb_csv = self._outputs(raw_sales_dir)
+        assert duckdb_csv == pandas_csv
+        assert "Amazon India" in duckdb_csv and "International" not in duckdb_csv
+
+    @pytest.mark.filterwarnings("ignore::UserWarning")
+    def test_profiles_match(self, raw_sales_dir):
+        """Both engines build the same data profile and count the same outliers"""
+        path = raw_sales_dir / "Amazon Sale Report.csv"
+        raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+        raw.loc[[10, 20], "Amount"] = ["250000", "900000"]
+        raw.to_csv(path, index=False)
+
+        pipelines = {}
+        for engine in ("pandas", "duckdb"):
+            pipeline = DataIngestionPipeline(str(raw_sales_dir), engine=engine)
+            df = pipeline._transform_with_pandas() if engine == "pandas" else pipeline._transform_with_duckdb()
+            pipelines[engine] = (pipeline, df)
+        (pandas_run, pandas_df), (duckdb_run, _) = pipelines["pandas"], pipelines["duckdb"]
+
+        assert duckdb_run.stats["outliers"] == pandas_run.stats["outliers"] > 0
+        assert duckdb_run.profile.rows == pandas_run.profile.rows == len(pandas_df)
+        assert set(duckdb_run.profile.columns) == set(pandas_run.profile.columns) == set(pandas_df.columns)
+        for col in pandas_df.columns:
+            expected, actual = pandas_run.profile[col], duckdb_run.profile[col]
+            assert (actual.kind, actual.count, actual.nulls) == (expected.kind, expected.count, expected.nulls), col
+            assert (actual.min, actual.max) == (expected.min, expected.max), col
+            assert actual.distinct == pytest.approx(expected.distinct), col
+            if expected.digest is not None:
+                assert actual.sum == pytest.approx(expected.sum), col
+                for q in (0.01, 0.5, 0.99):
+                    assert actual.quantile(q) == pytest.approx(expected.quantile(q)), col
+
+    @pytest.mark.filterwarnings("ignore::UserWarning")
+    def test_streaming_matches_batch(self, raw_sales_dir, tmp_path):
+        """Chunked ingestion writes the same rows as the in-memory pipeline"""
+        pipeline = DataIngestionPipeline(str(raw_sales_dir), storage_mode="table")
+        batch = pipeline._transform_with_pandas().reset_index(drop=True)
+        stats = pipeline.ingest_streaming(chunk_rows=64, output_dir=str(tmp_path / "out"))
+
+        streamed = pd.read_parquet(stats["parquet_path"])
+        assert stats["chunks"] > 5
+        assert stats["duplicates"] == stats["rows_read"] - len(batch)
+        assert list(streamed.columns) == list(batch.columns)
+        pd.testing.assert_frame_equal(streamed.astype(str), batch.astype(str))
+
+    def test_seen_keys_match_drop_duplicates(self):
+        """The on-disk key set drops what drop_duplicates would across chunks"""
+        df = pd.DataFrame({
+            "order_id": ["A", "B", None, "A", "C", np.nan, "B", "D", "C", None],
+            "amount": range(10),
+        })
+        for frame, subset in ((df, "order_id"), (df[["amount"]] % 4, None)):
+            with SeenKeys() as seen:
+                kept = pd.concat([seen.drop_seen(frame.iloc[i:i + 3]) for i in range(0, len(frame), 3)])
+            pd.testing.assert_frame_equal(kept, frame.drop_duplicates(subset=subset))
+
+    def test_parallel_matches_sequential(self, raw_sales_dir):
+        """Sharded process-pool ingestion gives the same frame as the sequential run"""
+        sequential = DataIngestionPipeline(str(raw_sales_dir), workers=1)._transform_with_pandas()
+        pipeline = DataIngestionPipeline(str(raw_sales_dir), workers=2)
+        pipeline.shard_bytes = 2048
+        amazon_path = raw_sales_dir / "Amazon Sale Report.csv"
+        assert len(pipeline._shard_ranges(amazon_path, pipeline.shard_bytes)) > 1
+
+        parallel = pipeline._transform_with_pandas()
+        assert parallel.to_csv(index=False) == sequential.to_csv(index=False)
+
+
+class TestIncrementalIngestion:
+    """Test manifest-driven ingestion of changed sources and partitions"""
+
+    def test_only_changed_sources_and_partitions_are_redone(self, raw_sales_dir, tmp_path, monkeypatch):
+        """Unchanged files are not re-read and only partitions whose rows changed are rewritten"""
+        from config import settings
+        monkeypatch.setattr(settings, "ingestion_cache_dir", str(tmp_path / "cache"))
+        monkeypatch.setattr(settings, "partitioned_data_path", str(tmp_path / "parts"))
+        parts = tmp_path / "parts"
+
+        def run():
+            pipeline = DataIngestionPipeline(str(raw_sales_dir), storage_mode="partitioned", incremental=True)
+            df = pipeline._transform_with_pandas()
+            pipeline._write_changed_partitions(df)
+            pipeline.manifest.save()
+            return df, pipeline.stats
+
+        first, stats = run()
+        assert stats["sources_reprocessed"] == ["amazon", "international"]
+        partitions = stats["partitions_written"]
+
+        second, stats = run()
+        assert stats["sources_skipped"] == ["amazon", "international"]
+        assert stats["partitions_written"] == 0
+        assert second.to_csv(index=False) == first.to_csv(index=False)
+
+        # One international order changes: one source and one partition are redone
+        intl_path = raw_sales_dir / "International sale Report.csv"
+        intl = pd.read_csv(intl_path, dtype=str)
+        intl.loc[0, "GROSS AMT"] = "999"
+        intl.to_csv(intl_path, index=False)
+        amazon_files = {p: p.stat().st_mtime_ns for p in parts.rglob("*.parquet") if "year=2022" in str(p)}
+
+        third, stats = run()
+        assert stats["sources_reprocessed"] == ["international"]
+        assert (stats["partitions_written"], stats["partitions_unchanged"]) == (1, partitions - 1)
+        assert {p: p.stat().st_mtime_ns for p in parts.rglob("*.parquet") if "year=2022" in str(p)} == amazon_files
+
+        full = DataIngestionPipeline(str(raw_sales_dir), incremental=False)._transform_with_pandas()
+        assert third.to_csv(index=False) == full.to_csv(index=False)
+        stored = duckdb.connect().execute(f"SELECT COUNT(*), SUM(amount) FROM {dataset_scan(str(parts))}").fetchone()
+        assert stored[0] == len(full) and stored[1] == pytest.approx(full["amount"].sum())
+
+
+class TestDateParser:
+    """Memoized unique-value date parsing"""
+
+    def test_matches_column_parsing(self):
+        """Format chain, flexible fallback and default fill match pd.to_datetime on the column"""
+        parser = DateParser()
+        chain = pd.Series(["04-30-22", "2022-04-01", "04-30-22", "15-04-2022"], index=[3, 5, 7, 9])
+        parsed = parser.parse(chain)
+        assert list(parsed.index) == [3, 5, 7, 9]
+        assert list(parsed.dt.strftime("%Y-%m-%d")) == ["2022-04-30", "2022-04-01", "2022-04-30", "2022-04-15"]
+
+        # A missing value sends the whole column to flexible parsing, then the default
+        messy = pd.Series(["04-30-22", None, "04-29-22"])
+        expected = pd.to_datetime(messy, errors="coerce").fillna(pd.Timestamp("2022-01-01"))
+        pd.testing.assert_series_equal(parser.parse(messy), expected)
+
+    def test_remembers_values_and_formats_per_source(self):
+        """Distinct strings are parsed once and matched formats are tried first next time"""
+        parser = DateParser()
+        parser.parse(pd.Series(["2022-04-01", "04-30-22"] * 50), source="amazon")
+        assert parser._source_formats["amazon"] == ["%m-%d-%y", "%Y-%m-%d"]
+        assert len(parser._memo["amazon"]) == 2
+
+        parsed = parser.parse(pd.Series(["04-30-22", "05-01-22"]), source="amazon")
+        assert list(parsed.dt.day) == [30, 1]
+        assert len(parser._memo["amazon"]) == 3
+        assert "international" not in parser._memo
+
+    def test_memo_overflow_starts_over(self):
+        """Crossing max_memo clears the memo without losing values of the current column"""
+        parser = DateParser()
+        parser.max_memo = 3
+        parser.parse(pd.Series(["04-28-22", "04-29-22"]))
+
+        parsed = parser.parse(pd.Series(["04-28-22", "04-29-22", "04-30-22", "05-01-22"]))
+        assert list(parsed.dt.strftime("%m-%d")) == ["04-28", "04-29", "04-30", "05-01"]
+        assert set(parser._memo["default"]) == {"04-30-22", "05-01-22"}
+
+
+class TestIngestionProfiling:
+    """Per-stage metrics and run reports of the ingestion pipeline"""
+
+    def test_run_report_and_comparison(self, raw_sales_dir, tmp_path, monkeypatch):
+        """Every stage is timed with its row counts, and the next run is compared to the last"""
+        from config import settings
+        reports = tmp_path / "reports"
+        monkeypatch.setattr(settings, "ingestion_report_dir", str(reports))
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+
+        first = DataIngestionPipeline(str(raw_sales_dir), storage_mode="table", workers=1)
+        df = first.ingest_all_data()
+        report = first.run_report
+        assert [s["stage"] for s in report["stages"]] == [
+            "load", "process", "merge", "quality_checks", "feature_engineering", "save"
+        ]
+        assert report["stages"][-1]["rows_out"] == report["rows_out"] == len(df)
+        assert all(s["wall_s"] > 0 and s["rss_peak_mb"] for s in report["stages"])
+        assert load_latest_report(str(reports))["run_id"] == report["run_id"]
+
+        second = DataIngestionPipeline(str(raw_sales_dir), storage_mode="table", workers=1)
+        second.ingest_all_data()
+        table = compare_reports(second.run_report, report)
+        assert "feature_engineering" in table and "%" in table
+        history = pd.read_parquet(reports / "stages.parquet")
+        assert history["run_id"].nunique() == 2 and len(history) == 12
+
+    def test_process_peak_rss_per_platform(self, monkeypatch):
+        """ru_maxrss is read as kilobytes on Linux and bytes on macOS; absent on Windows"""
+        from types import SimpleNamespace
+        from utils import ingestion_profiler
+        usage = SimpleNamespace(ru_maxrss=512 * 1024)
+        fake = SimpleNamespace(RUSAGE_SELF=0, getrusage=lambda who: usage)
+        monkeypatch.setattr(ingestion_profiler, "resource", fake)
+
+        monkeypatch.setattr(ingestion_profiler.sys, "platform", "linux")
+        assert ingestion_profiler.process_peak_rss_mb() == 512
+        monkeypatch.setattr(ingestion_profiler.sys, "platform", "darwin")
+        assert ingestion_profiler.process_peak_rss_mb() == 0.5
+        monkeypatch.setattr(ingestion_profiler, "resource", None)
+        assert ingestion_profiler.process_peak_rss_mb() is None
+
+
+class TestSyntheticData:
+    """Vectorized generator of processed-schema data"""
+
+    def test_partitioned_output_matches_pipeline_schema(self, raw_sales_dir, tmp_path):
+        """Generated datasets have the pipeline's columns and types and do not depend on worker count"""
+        from data.generate_data import generate_partitioned
+
+        processed = DataIngestionPipeline(str(raw_sales_dir), workers=1)._transform_with_pandas()
+        write_partitioned(pa.Table.from_pandas(processed, preserve_index=False), str(tmp_path / "pipeline"))
+        one = generate_partitioned(20_000, str(tmp_path / "one"), workers=1, end="2021-06-30", rows_per_file=3000)
+        two = generate_partitioned(20_000, str(tmp_path / "two"), workers=2, end="2021-06-30", rows_per_file=3000)
+
+        conn = duckdb.connect()
+        describe = lambda root: {
+            row[0]: row[1] for row in conn.execute(f"DESCRIBE SELECT * FROM {dataset_scan(root)}").fetchall()
+        }
+        # The fixture has a subset of the Kaggle columns, and its unparseable date
+        # leaves nulls that widen year/month/quarter
+        expected = describe(str(tmp_path / "pipeline"))
+        generated = describe(one)
+        assert set(expected) <= set(generated)
+        assert all(generated[c] == t for c, t in expected.items() if c not in ("year", "month", "quarter"))
+        query = "SELECT COUNT(*), COUNT(DISTINCT order_id), COUNT(DISTINCT month), SUM(revenue) FROM {}"
+        stats = conn.execute(query.format(dataset_scan(one))).fetchone()
+        assert stats[:3] == (20_000, 20_000, 6)
+        assert conn.execute(query.format(dataset_scan(two))).fetchone() == stats
+
+        dl = DataLayer(csv_path=one, db_path=":memory:")
+        top = dl.execute_query("SELECT state, COUNT(*) AS n FROM sales GROUP BY state ORDER BY n DESC LIMIT 1")
+        assert top["state"].iloc[0] == "MAHARASHTRA"
+
+
+class TestDataProfile:
+    """Mergeable quality sketches of the processed data"""
+
+    def test_merged_chunks_match_whole_frame(self, tmp_path):
+        """Chunk profiles merge to the whole frame's counts, ranges, quantiles and distinct counts"""
+        rng = np.random.default_rng(7)
+        n = 60_000
+        df = pd.DataFrame({
+            "amount": rng.gamma(2.0, 350.0, n),
+            "sku": pd.Series(rng.integers(0, 3000, n)).map("SKU-{}".format),
+            "date": pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"),
+        })
+        df.loc[::9, "amount"] = np.nan
+
+        whole = DataProfile.of(df, chunk_rows=n)
+        merged = DataProfile()
+        for start in range(0, n, 7_000):
+            chunk = df.iloc[start:start + 7_000].copy()
+            if start % 2:
+                chunk["sku"] = chunk["sku"].astype("category")  # text hashes alike in any dtype
+            merged.merge(DataProfile.of(chunk))
+
+        amount = df["amount"].dropna()
+        assert merged.rows == n and merged["amount"].nulls == df["amount"].isna().sum()
+        assert (merged["amount"].min, merged["amount"].max) == (amount.min(), amount.max())
+        assert merged["date"].max == df["date"].max()
+        for q in (0.5, 0.99):
+            assert merged["amount"].quantile(q) == pytest.approx(amount.quantile(q), rel=0.02)
+        assert (merged["sku"].hll.registers == whole["sku"].hll.registers).all()
+        assert merged["sku"].distinct == pytest.approx(df["sku"].nunique(), rel=0.05)
+
+        merged.save(str(tmp_path / "p.json"))
+        loaded = DataProfile.load(str(tmp_path / "p.json"))
+        assert loaded["amount"].quantile(0.99) == merged["amount"].quantile(0.99)
+        assert loaded["date"].min == merged["date"].min and loaded["sku"].distinct == merged["sku"].distinct
+
+    def test_streaming_and_batch_save_the_same_profile(self, raw_sales_dir, tmp_path):
+        """Both ingestion modes persist a profile of every output column next to the data"""
+        batch = DataIngestionPipeline(str(raw_sales_dir), workers=1)
+        df = batch._transform_with_pandas()
+        batch._save_profile(str(tmp_path / "processed_sales_data.csv"))
+
+        stats = DataIngestionPipeline(str(raw_sales_dir)).ingest_streaming(chunk_rows=7, output_dir=str(tmp_path / "s"))
+        streamed = DataProfile.load(profile_path(stats["csv_path"]))
+        saved = DataProfile.load(str(tmp_path / "processed_sales_data.profile.json"))
+        assert set(saved.columns) == set(df.columns) == set(streamed.columns)
+        assert saved.rows == streamed.rows == len(df)
+        for col in ("amount", "state", "sku"):
+            assert saved[col].nulls == streamed[col].nulls
+            assert saved[col].distinct == pytest.approx(streamed[col].distinct)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,221 @@
+"""
+Arrow-native query results
+Helpers that let agents inspect a pyarrow.Table without converting it to pandas
+"""
+from typing import Any, Dict, List, Optional
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+    pa = None
+    pc = None
+
+
+def is_arrow_table(obj: Any) -> bool:
+    """Check whether an object is a pyarrow.Table"""
+    return ARROW_AVAILABLE and isinstance(obj, pa.Table)
+
+
+def numeric_columns(table: "pa.Table") -> List[str]:
+    """Names of numeric columns (matches pandas select_dtypes(include=['number']) plus DECIMAL sums)"""
+    return [
+        field.name for field in table.schema
+        if pa.types.is_integer(field.type)
+        or pa.types.is_floating(field.type)
+        or pa.types.is_decimal(field.type)
+    ]
+
+
+def categorical_columns(table: "pa.Table") -> List[str]:
+    """Names of string and dictionary-encoded columns"""
+    return [
+        field.name for field in table.schema
+        if pa.types.is_string(field.type)
+        or pa.types.is_large_string(field.type)
+        or pa.types.is_dictionary(field.type)
+    ]
+
+
+def total_null_count(table: "pa.Table") -> int:
+    """Number of null cells across all columns"""
+    return sum(column.null_count for column in table.columns)
+
+
+def as_float(column: "pa.ChunkedArray") -> "pa.ChunkedArray":
+    """Cast a numeric column to float64 so every compute kernel accepts it"""
+    if pa.types.is_floating(column.type):
+        return column
+    return pc.cast(column, pa.float64())
+
+
+def column_summary(column: "pa.ChunkedArray") -> Dict[str, Optional[float]]:
+    """
+    Summarize a numeric column in Arrow
+
+    Args:
+        column: Numeric Arrow column
+
+    Returns:
+        Dict with count, sum, mean, min, max and std (sample, like pandas); None when empty
+    """
+    values = as_float(column)
+    count = len(values) - values.null_count
+    if count == 0:
+        return {"count": 0, "sum": None, "mean": None, "min": None, "max": None, "std": None}
+
+    min_max = pc.min_max(values).as_py()
+    std = pc.stddev(values, ddof=1).as_py() if count > 1 else None
+    return {
+        "count": count,
+        "sum": pc.sum(values).as_py(),
+        "mean": pc.mean(values).as_py(),
+        "min": min_max["min"],
+        "max": min_max["max"],
+        "std": std
+    }
+
+
+def count_where(mask: "pa.ChunkedArray") -> int:
+    """Count true values in a boolean mask, treating nulls as false"""
+    return int(pc.sum(pc.fill_null(mask, False)).as_py() or 0)
+
+
+def duplicate_row_count(table: "pa.Table") -> int:
+    """Number of rows that repeat an earlier row"""
+    if table.num_rows == 0 or table.num_columns == 0:
+        return 0
+    try:
+        distinct = table.group_by(table.column_names).aggregate([])
+    except Exception:
+        # Some column types cannot be grouped on; treat them as duplicate-free
+        return 0
+    return table.num_rows - distinct.num_rows
+
+
+class ResultColumns:
+    """
+    Column statistics of a query result, whether a DataFrame or a pyarrow.Table
+
+    Checks written against this accessor run unchanged on both formats: Arrow
+    results are inspected with compute kernels and never converted to pandas.
+    """
+
+    def __init__(self, result: Any):
+        self.result = result
+        self.is_arrow = is_arrow_table(result)
+
+    @property
+    def num_rows(self) -> int:
+        return self.result.num_rows if self.is_arrow else len(self.result)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.result.column_names if self.is_arrow else self.result.columns)
+
+    @property
+    def empty(self) -> bool:
+        return self.num_rows == 0 or not self.names
+
+    def numeric(self) -> List[str]:
+        """Names of numeric columns"""
+        if self.is_arrow:
+            return numeric_columns(self.result)
+        return list(self.result.select_dtypes(include=['number']).columns)
+
+    def null_counts(self) -> Dict[str, int]:
+        """Null cells per column"""
+        if self.is_arrow:
+            return {name: self.result[name].null_count for name in self.result.column_names}
+        return {name: int(count) for name, count in self.result.isnull().sum().items()}
+
+    def summary(self, col: str) -> Dict[str, Optional[float]]:
+        """count, sum, mean, min, max and std of a numeric column (see column_summary)"""
+        if self.is_arrow:
+            return column_summary(self.result[col])
+        values = self.result[col].dropna().astype(float)
+        if len(values) == 0:
+            return {"count": 0, "sum": None, "mean": None, "min": None, "max": None, "std": None}
+        return {
+            "count": len(values),
+            "sum": float(values.sum()),
+            "mean": float(values.mean()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "std": float(values.std()) if len(values) > 1 else None
+        }
+
+    def quantiles(self, col: str, q: List[float]) -> List[float]:
+        """Linearly interpolated quantiles of a numeric column"""
+        if self.is_arrow:
+            return pc.quantile(as_float(self.result[col]), q=q).to_pylist()
+        return [float(v) for v in self.result[col].astype(float).quantile(q)]
+
+    def count_outside(self, col: str, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """Rows whose value is below low or above high (nulls never count)"""
+        if self.is_arrow:
+            values = as_float(self.result[col])
+            masks = ([pc.less(values, low)] if low is not None else []) + \
+                    ([pc.greater(values, high)] if high is not None else [])
+            return sum(count_where(mask) for mask in masks)
+        values = self.result[col].astype(float)
+        count = 0
+        if low is not None:
+            count += int((values < low).sum())
+        if high is not None:
+            count += int((values > high).sum())
+        return count
+
+    def duplicate_count(self) -> int:
+        """Rows that repeat an earlier row"""
+        if self.is_arrow:
+            return duplicate_row_count(self.result)
+        try:
+            return int(self.result.duplicated().sum())
+        except TypeError:
+            # Unhashable values (lists, dicts); treated as duplicate-free like Arrow
+            return 0
+
+
+def head_records(table: "pa.Table", n: int) -> List[Dict[str, Any]]:
+    """First n rows as records, converting only those rows"""
+    return table.slice(0, n).to_pylist()
+
+
+def to_pandas(result: Any) -> pd.DataFrame:
+    """Convert an Arrow result to pandas; DataFrames pass through unchanged"""
+    if is_arrow_table(result):
+        return result.to_pandas()
+    return result
+
+
+class ArrowQueryResult(dict):
+    """
+    Query result carrying a pyarrow.Table under 'table'
+
+    The 'dataframe' entry is converted from the table on first access and then
+    reused, so only consumers that really need pandas (the UI) pay for it.
+    """
+
+    def _materialize(self):
+        if not dict.__contains__(self, "dataframe"):
+            dict.__setitem__(self, "dataframe", to_pandas(dict.get(self, "table")))
+        return dict.__getitem__(self, "dataframe")
+
+    def __getitem__(self, key):
+        if key == "dataframe":
+            return self._materialize()
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        if key == "dataframe":
+            return self._materialize() if dict.get(self, "table") is not None else default
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        if key == "dataframe":
+            return dict.get(self, "table") is not None
+        return super().__contains__(key)
@@ -0,0 +1,183 @@
+"""
+Persistent source catalog for the DuckDB data layer
+Fingerprints source files so a restart can reuse an on-disk database
+instead of re-reading the CSV
+"""
+import hashlib
+import os
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the 'sales' table or its derived objects changes,
+# so databases written by older code are rebuilt instead of reused
+CATALOG_VERSION = 1
+
+# Size of the head and tail blocks hashed into the fingerprint
+FINGERPRINT_BLOCK_SIZE = 1024 * 1024
+
+CATALOG_TABLE = "_catalog"
+
+
+@dataclass
+class SourceFingerprint:
+    """Cheap identity of a source file: stat info plus a hash of its head and tail blocks"""
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    catalog_version: int = CATALOG_VERSION
+
+    def matches(self, other: Optional["SourceFingerprint"]) -> bool:
+        """Check whether two fingerprints describe the same source contents"""
+        if other is None:
+            return False
+        return (
+            self.path == other.path
+            and self.size == other.size
+            and self.mtime_ns == other.mtime_ns
+            and self.content_hash == other.content_hash
+            and self.catalog_version == other.catalog_version
+        )
+
+
+def compute_fingerprint(file_path: str, block_size: int = FINGERPRINT_BLOCK_SIZE) -> SourceFingerprint:
+    """
+    Fingerprint a source file without reading it end to end
+
+    Directories (partitioned datasets) are fingerprinted by their file listing.
+
+    Args:
+        file_path: Path to the source file or dataset directory
+        block_size: Bytes hashed from the start and from the end of the file
+
+    Returns:
+        SourceFingerprint for the file
+    """
+    path = str(Path(file_path).resolve())
+    if os.path.isdir(path):
+        return _fingerprint_directory(path)
+    stat = os.stat(path)
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        digest.update(f.read(block_size))
+        if stat.st_size > block_size:
+            f.seek(max(stat.st_size - block_size, block_size))
+            digest.update(f.read(block_size))
+
+    return SourceFingerprint(
+        path=path,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        content_hash=digest.hexdigest()
+    )
+
+
+def _fingerprint_directory(path: str) -> SourceFingerprint:
+    """Fingerprint a dataset directory by the names, sizes and mtimes of its files"""
+    digest = hashlib.sha256()
+    total_size, latest_mtime = 0, 0
+    for file in sorted(p for p in Path(path).rglob("*") if p.is_file()):
+        stat = file.stat()
+        total_size += stat.st_size
+        latest_mtime = max(latest_mtime, stat.st_mtime_ns)
+        digest.update(f"{file.relative_to(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+
+    return SourceFingerprint(
+        path=path,
+        size=total_size,
+        mtime_ns=latest_mtime,
+        content_hash=digest.hexdigest()
+    )
+
+
+class SourceCatalog:
+    """Records which source file the persisted 'sales' table was built from"""
+
+    def __init__(self, conn):
+        """
+        Initialize catalog
+
+        Args:
+            conn: Open DuckDB connection holding the catalog table
+        """
+        self.conn = conn
+        self._ensure_table()
+
+    def _ensure_table(self):
+        """Create the catalog table if it does not exist yet"""
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+                table_name VARCHAR PRIMARY KEY,
+                path VARCHAR,
+                size BIGINT,
+                mtime_ns BIGINT,
+                content_hash VARCHAR,
+                catalog_version INTEGER,
+                row_count BIGINT,
+                loaded_at TIMESTAMP
+            )
+        """)
+
+    def get(self, table_name: str = "sales") -> Optional[SourceFingerprint]:
+        """Get the fingerprint recorded for a table, if any"""
+        row = self.conn.execute(f"""
+            SELECT path, size, mtime_ns, content_hash, catalog_version
+            FROM {CATALOG_TABLE}
+            WHERE table_name = ?
+        """, [table_name]).fetchone()
+
+        if row is None:
+            return None
+        return SourceFingerprint(
+            path=row[0],
+            size=row[1],
+            mtime_ns=row[2],
+            content_hash=row[3],
+            catalog_version=row[4]
+        )
+
+    def record(self, fingerprint: SourceFingerprint, row_count: int, table_name: str = "sales"):
+        """Record the fingerprint of the source a table was just built from"""
+        fields = asdict(fingerprint)
+        self.conn.execute(f"""
+            INSERT OR REPLACE INTO {CATALOG_TABLE}
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            table_name,
+            fields["path"],
+            fields["size"],
+            fields["mtime_ns"],
+            fields["content_hash"],
+            fields["catalog_version"],
+            row_count,
+            datetime.now()
+        ])
+
+    def forget(self, table_name: str = "sales"):
+        """Drop the catalog entry for a table"""
+        self.conn.execute(f"DELETE FROM {CATALOG_TABLE} WHERE table_name = ?", [table_name])
+
+    def is_current(self, source_path: str, table_name: str = "sales") -> bool:
+        """
+        Check whether a table was built from the current contents of a source file
+
+        Args:
+            source_path: Path to the source file
+            table_name: Table to check
+
+        Returns:
+            True if the recorded fingerprint matches the file on disk
+        """
+        if not os.path.exists(source_path):
+            return False
+        try:
+            return compute_fingerprint(source_path).matches(self.get(table_name))
+        except Exception as e:
+            logger.warning(f"⚠️  Could not fingerprint {source_path}: {e}")
+            return False
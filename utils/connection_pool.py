@@ -0,0 +1,150 @@
+"""
+Cursor pool for the shared DuckDB connection
+Lets concurrent Streamlit sessions and agents query one database without
+sharing a single connection handle
+"""
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of recent wait times kept for percentile metrics
+WAIT_SAMPLE_SIZE = 1000
+
+
+class PoolTimeoutError(TimeoutError):
+    """Raised when no cursor becomes free within the checkout timeout"""
+
+
+class CursorPool:
+    """
+    Bounded pool of DuckDB cursors with checkout/checkin semantics
+
+    Each cursor from conn.cursor() is its own connection to the same database,
+    so queries on different cursors run in parallel inside DuckDB. Cursors are
+    created lazily up to max_size; callers beyond that wait for a checkin.
+    """
+
+    def __init__(self, conn, max_size: int = 4, timeout: float = 30.0):
+        """
+        Initialize pool
+
+        Args:
+            conn: Parent DuckDB connection the cursors are created from
+            max_size: Maximum number of cursors in use at once
+            timeout: Seconds a checkout waits for a free cursor
+        """
+        self.conn = conn
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+
+        # Wait-time metrics
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def checkout(self, timeout: Optional[float] = None):
+        """
+        Take a cursor from the pool, waiting if all are in use
+
+        Args:
+            timeout: Seconds to wait (defaults to the pool timeout)
+
+        Returns:
+            A DuckDB cursor; hand it back with checkin()
+        """
+        if self._closed:
+            raise RuntimeError("Cursor pool is closed")
+
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeoutError(
+                f"No database cursor free after {timeout:.1f}s ({self.max_size} in use)"
+            )
+        waited = time.perf_counter() - start
+
+        try:
+            cursor = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                cursor = self.conn.cursor()
+            except Exception:
+                self._slots.release()
+                raise
+            with self._lock:
+                self._created += 1
+
+        with self._lock:
+            self._in_use += 1
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self._waits.append(waited)
+        return cursor
+
+    def checkin(self, cursor):
+        """Return a cursor to the pool"""
+        with self._lock:
+            self._in_use -= 1
+        if self._closed:
+            self._close_cursor(cursor)
+        else:
+            self._idle.put(cursor)
+        self._slots.release()
+
+    @contextmanager
+    def cursor(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Context manager that checks a cursor out and always checks it back in"""
+        cur = self.checkout(timeout)
+        try:
+            yield cur
+        finally:
+            self.checkin(cur)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool size, usage and checkout wait-time metrics (seconds)"""
+        with self._lock:
+            waits = sorted(self._waits)
+            p95 = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+            return {
+                "max_size": self.max_size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+                "p95_wait": p95,
+                "max_wait": self.max_wait
+            }
+
+    def close(self):
+        """Close idle cursors; cursors still checked out are closed on checkin"""
+        self._closed = True
+        while True:
+            try:
+                self._close_cursor(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
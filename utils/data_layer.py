@@ -6,9 +6,21 @@ import duckdb
 import pandas as pd
 from typing import Optional, List, Dict, Any
 import os
+import copy
 import logging
+import threading
 from pathlib import Path
 from config import settings
+from utils.catalog import SourceCatalog, compute_fingerprint
+from utils.dictionary_encoding import display_type, encode_enums, encode_result, enum_columns, widen_enums
+from utils.connection_pool import CursorPool
+from utils.data_profile import DataProfile, profile_path
+from utils.rollup import RollupCube
+from utils.partitioned_store import dataset_scan, is_partitioned_dataset
+from utils.external_sources import csv_scan, parquet_scan
+from utils.query_timeout import QueryTimeoutError, QueryWatchdog
+from utils.query_cache import QueryResultCache, canonicalize_sql
+from utils.streaming import StreamingResult
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +44,9 @@ class DataLayer:
         
         if csv_path:
             self.csv_path = csv_path
+        elif settings.storage_mode == "partitioned" and is_partitioned_dataset(settings.partitioned_data_path):
+            # Query the year/month-partitioned Parquet dataset in place
+            self.csv_path = settings.partitioned_data_path
         elif default_csv.exists():
             self.csv_path = str(default_csv)
         else:
@@ -43,27 +58,54 @@ class DataLayer:
         
         self.db_path = db_path or settings.duckdb_path
         self.conn = None
+        self.pool = None
+        self.catalog = None
         self.schema_info = None
+        # Profile of the loaded data (from ingestion); None when it is unknown
+        self.data_profile: Optional[DataProfile] = None
+        
+        # Loads go through self.conn one at a time; queries use pooled cursors
+        self._write_lock = threading.RLock()
+        
+        # Bumped on every load so derived caches know when they are stale
+        self.data_version = 0
+        self._summary_cache = None
+        self._summary_version = -1
+        self.query_cache = QueryResultCache(max_bytes=settings.query_cache_max_bytes)
+        self.rollup = RollupCube()
+        self.watchdog = QueryWatchdog()
         self._initialize_database()
     
     def _initialize_database(self):
         """Initialize DuckDB connection and load data with error handling"""
         try:
-            # Use in-memory database to avoid file conflicts on Streamlit Cloud
+            # In-memory mode is still available for Streamlit Cloud via DUCKDB_PATH=:memory:
             if self.db_path == ":memory:" or not self.db_path:
                 self.conn = duckdb.connect(":memory:")
                 logger.info("📂 Connected to in-memory DuckDB")
             else:
-                self.conn = duckdb.connect(self.db_path)
-                logger.info(f"📂 Connected to DuckDB: {self.db_path}")
+                self.conn = self._connect_persistent(self.db_path)
+            
+            self._apply_resource_limits()
+            self.pool = CursorPool(
+                self.conn,
+                max_size=settings.db_pool_size,
+                timeout=settings.db_pool_timeout
+            )
+            self.catalog = SourceCatalog(self.conn)
             
-            # Check if table already exists (for cached connections)
+            # Reuse the persisted table when it was built from the current source
             try:
-                existing = self.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
-                if existing > 0:
-                    logger.info(f"Using existing table with {existing:,} records")
-                    self.schema_info = self._get_schema()
-                    return
+                if self._sales_exists():
+                    source_exists = os.path.exists(self.csv_path)
+                    if not source_exists or self.catalog.is_current(self.csv_path):
+                        # No COUNT(*) here: on a view that would scan the source files
+                        logger.info("Using existing 'sales' from the catalog")
+                        self.schema_info = self._get_schema()
+                        self._prepare_rollup(reuse=True)
+                        self._restore_profile()
+                        return
+                    logger.info("🔄 Source changed since the catalog was built, rebuilding")
             except:
                 pass  # Table doesn't exist, continue loading
             
@@ -79,6 +121,46 @@ class DataLayer:
             print(f"❌ Initialization failed: {e}")
             # Don't raise - allow app to continue with limited functionality
     
+    def _apply_resource_limits(self):
+        """Cap DuckDB memory and threads and set where larger-than-memory work spills"""
+        limits = []
+        if settings.duckdb_memory_limit:
+            limits.append(("memory_limit", settings.duckdb_memory_limit))
+        if settings.duckdb_threads > 0:
+            limits.append(("threads", settings.duckdb_threads))
+        if settings.duckdb_temp_directory:
+            Path(settings.duckdb_temp_directory).mkdir(parents=True, exist_ok=True)
+            limits.append(("temp_directory", settings.duckdb_temp_directory))
+        
+        # These are database-wide, so pooled cursors inherit them
+        for name, value in limits:
+            try:
+                if isinstance(value, int):
+                    self.conn.execute(f"SET {name} = {value}")
+                else:
+                    self.conn.execute(f"SET {name} = '{str(value).replace(chr(39), chr(39) * 2)}'")
+            except Exception as e:
+                logger.warning(f"⚠️  Could not set DuckDB {name}={value}: {e}")
+    
+    def _sales_exists(self) -> bool:
+        """Check whether the catalog holds a 'sales' table or view"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'sales'"
+        ).fetchone()[0] > 0
+    
+    def _connect_persistent(self, db_path: str):
+        """Open an on-disk DuckDB catalog, falling back to memory if it is locked"""
+        try:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = duckdb.connect(db_path)
+            logger.info(f"📂 Connected to DuckDB: {db_path}")
+            return conn
+        except Exception as e:
+            # Another process may hold the write lock on the catalog file
+            logger.warning(f"⚠️  Could not open {db_path} ({e}), using in-memory DuckDB")
+            self.db_path = ":memory:"
+            return duckdb.connect(":memory:")
+    
     def _create_indexes(self):
         """Create indexes on key columns"""
         try:
@@ -102,6 +184,15 @@ class DataLayer:
         except Exception as e:
             logger.warning(f"⚠️  Could not create all indexes: {e}")
     
+    def _encode_categoricals(self):
+        """Store the low-cardinality text columns as ENUMs (before indexing: indexed columns can't change type)"""
+        if not settings.enable_dictionary_encoding:
+            return
+        try:
+            encode_enums(self.conn, "sales")
+        except Exception as e:
+            logger.warning(f"⚠️  Could not dictionary-encode columns: {e}")
+    
     def _fallback_load(self):
         """Fallback method to load data using pandas"""
         try:
@@ -130,17 +221,44 @@ class DataLayer:
     
     def load_file(self, file_path: str):
         """Load a file (CSV, Excel, or JSON) into DuckDB"""
+        with self._write_lock:
+            return self._load_file(file_path)
+    
+    def _load_file(self, file_path: str):
+        """Replace the sales table with the contents of a file"""
         try:
             file_ext = Path(file_path).suffix.lower()
             logger.info(f"📊 Loading {file_ext} data from {file_path}...")
             
             # Check if table already exists, drop if we are loading new data
+            # ('sales' is a view over a partitioned dataset, a table otherwise)
+            for kind in ("VIEW", "TABLE"):
+                try:
+                    self.conn.execute(f"DROP {kind} IF EXISTS sales")
+                except:
+                    pass
             try:
-                self.conn.execute("DROP TABLE IF EXISTS sales")
+                if self.catalog is not None:
+                    self.catalog.forget()
             except:
                 pass
+            self.data_profile = None
+            self._save_table_profile()
+            # Also drops the rollup of the old data
+            self._bump_data_version()
 
-            if file_ext == '.csv':
+            is_view = False
+            if is_partitioned_dataset(file_path):
+                # Partition filters on year/month are pushed down to the file listing
+                dataset = str(Path(file_path).resolve())
+                self.conn.execute(f"CREATE VIEW sales AS SELECT * FROM {dataset_scan(dataset)}")
+                is_view = True
+            elif settings.load_mode == "view" and file_ext in ('.csv', '.parquet'):
+                # Zero-load: query the file in place, memory stays under DuckDB's buffer manager
+                scan = csv_scan(self.conn, file_path) if file_ext == '.csv' else parquet_scan(file_path)
+                self.conn.execute(f"CREATE VIEW sales AS SELECT * FROM {scan}")
+                is_view = True
+            elif file_ext == '.csv':
                 self.conn.execute(f"""
                     CREATE TABLE sales AS 
                     SELECT * FROM read_csv_auto('{file_path}', 
@@ -159,8 +277,10 @@ class DataLayer:
             else:
                 raise ValueError(f"Unsupported file format: {file_ext}")
 
-            # Create indexes for better performance
-            self._create_indexes()
+            # Create indexes for better performance (views are pruned by partition instead)
+            if not is_view:
+                self._encode_categoricals()
+                self._create_indexes()
             
             # Store schema info
             self.schema_info = self._get_schema()
@@ -169,12 +289,257 @@ class DataLayer:
             row_count = self.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
             logger.info(f"Loaded {row_count:,} records into DuckDB")
             print(f"Loaded {row_count:,} records into DuckDB")
+            
+            # Remember which source this table came from so restarts can skip the reload
+            self._record_source(file_path, row_count)
+            
+            # Pre-aggregate the common dimensions so chat queries avoid full scans
+            self._prepare_rollup()
+            self._load_profile(file_path, row_count)
             return True
         except Exception as e:
             logger.error(f"❌ Error loading file {file_path}: {e}")
             print(f"❌ Error loading file {file_path}: {e}")
             return False
 
+    def append_file(self, file_path: str, key: str = "order_id", mode: str = "upsert") -> Dict[str, int]:
+        """
+        Add a delta file to the sales table without re-reading its history
+        
+        In 'upsert' mode rows whose key appears in the file are replaced by the
+        file's rows; in 'append' mode rows with an existing key are skipped.
+        The rollup is updated from the delta alone and the data version bumped.
+        
+        Args:
+            file_path: Path to the delta file (CSV, Parquet, Excel or JSON)
+            key: Column identifying an order
+            mode: 'upsert' or 'append'
+            
+        Returns:
+            Dict with rows_in_file, inserted, replaced, skipped and total_rows
+        """
+        if mode not in ("upsert", "append"):
+            raise ValueError(f"Unknown append mode: {mode}")
+        
+        with self._write_lock:
+            if not self._sales_exists():
+                # Nothing to append to yet
+                loaded = self.load_file(file_path)
+                total = self.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] if loaded else 0
+                return {"rows_in_file": total, "inserted": total, "replaced": 0, "skipped": 0, "total_rows": total}
+            
+            kind = self.conn.execute(
+                "SELECT table_type FROM information_schema.tables WHERE table_name = 'sales'"
+            ).fetchone()[0]
+            if kind == "VIEW":
+                raise ValueError("Incremental loads need LOAD_MODE=copy; 'sales' is a view over its source files")
+            if key not in self.schema_info['column_name'].tolist():
+                raise ValueError(f"Key column '{key}' is not in the sales table")
+            
+            logger.info(f"📊 Applying {mode} of {file_path} on {key}...")
+            rollup_current = self.rollup.ready and self.rollup.data_version == self.data_version
+            try:
+                self._stage_delta(file_path)
+                # New status/city/... values are added to the ENUMs before the transaction:
+                # DuckDB cannot alter an indexed table inside a transaction
+                widen_enums(self.conn, "_delta", ["sales"] + ([self.rollup.name] if rollup_current else []))
+            except Exception as e:
+                logger.error(f"❌ Error staging {file_path}: {e}")
+                print(f"❌ Error staging {file_path}: {e}")
+                raise
+            
+            self.conn.begin()
+            try:
+                rows_in_file = self.conn.execute("SELECT COUNT(*) FROM _delta").fetchone()[0]
+                replaced = skipped = 0
+                
+                if mode == "upsert":
+                    self.conn.execute(f"""
+                        CREATE OR REPLACE TEMP TABLE _replaced AS
+                        SELECT * FROM sales WHERE {key} IN (SELECT {key} FROM _delta)
+                    """)
+                    replaced = self.conn.execute("SELECT COUNT(*) FROM _replaced").fetchone()[0]
+                    self.conn.execute(f"DELETE FROM sales WHERE {key} IN (SELECT {key} FROM _delta)")
+                else:
+                    self.conn.execute(f"DELETE FROM _delta WHERE {key} IN (SELECT {key} FROM sales)")
+                    skipped = rows_in_file - self.conn.execute("SELECT COUNT(*) FROM _delta").fetchone()[0]
+                
+                self.conn.execute("INSERT INTO sales BY NAME SELECT * FROM _delta")
+                inserted = rows_in_file - skipped
+                
+                if rollup_current:
+                    self.rollup.apply_changes(
+                        self.conn, inserted="_delta", removed="_replaced" if mode == "upsert" else None
+                    )
+                else:
+                    # A rollup not maintained here must not survive into the next start
+                    self.rollup.drop(self.conn)
+                profile = self._profile_with_delta()
+                self.conn.execute("DROP TABLE IF EXISTS _delta")
+                self.conn.execute("DROP TABLE IF EXISTS _replaced")
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                logger.error(f"❌ Error applying {file_path}: {e}")
+                print(f"❌ Error applying {file_path}: {e}")
+                raise
+            
+            self.data_profile = profile
+            self._save_table_profile()
+            self._bump_data_version(rollup_current=rollup_current)
+            total = self.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+        
+        print(f"Applied {file_path}: {inserted:,} inserted, {replaced:,} replaced, {skipped:,} skipped")
+        return {
+            "rows_in_file": rows_in_file,
+            "inserted": inserted,
+            "replaced": replaced,
+            "skipped": skipped,
+            "total_rows": total
+        }
+    
+    def _profile_with_delta(self) -> Optional[DataProfile]:
+        """
+        Current profile merged with the profile of the inserted rows in _delta
+        
+        Rows replaced by an upsert stay in the sketches; that only widens the
+        ranges and distinct counts, so it never adds validation warnings.
+        """
+        if self.data_profile is None:
+            return None
+        try:
+            delta = DataProfile.of(self.conn.execute("SELECT * FROM _delta").fetchdf())
+            # A new object, so validators reading the current profile never see a half-merged one
+            return copy.deepcopy(self.data_profile).merge(delta)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not update the data profile, dropping it: {e}")
+            return None
+    
+    def _load_profile(self, file_path: str, row_count: Optional[int] = None):
+        """
+        Adopt the profile ingestion saved next to the source, if it describes it
+        
+        Args:
+            file_path: Source file or partitioned dataset directory
+            row_count: Rows loaded from it; a profile of a different row count is stale
+        """
+        profile = DataProfile.load(str(profile_path(file_path)))
+        if profile is not None and row_count is not None and profile.rows != row_count:
+            logger.info(f"Ignoring data profile of {profile.rows:,} rows; the source has {row_count:,}")
+            profile = None
+        self.data_profile = profile
+    
+    def _restore_profile(self):
+        """Profile of a 'sales' reused from the catalog: the one saved after its last append, else the source's"""
+        saved = self._table_profile_path()
+        if saved is not None and saved.exists():
+            self.data_profile = DataProfile.load(str(saved))
+            return
+        # Counting a table is free; a view would scan its source files
+        kind = self.conn.execute(
+            "SELECT table_type FROM information_schema.tables WHERE table_name = 'sales'"
+        ).fetchone()[0]
+        row_count = None if kind == "VIEW" else self.conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+        self._load_profile(self.csv_path, row_count)
+    
+    def _table_profile_path(self) -> Optional[Path]:
+        """Where the profile of an appended-to 'sales' is kept: next to the on-disk catalog"""
+        if not self.db_path or self.db_path == ":memory:":
+            return None
+        return Path(self.db_path).with_name(Path(self.db_path).name + ".profile.json")
+    
+    def _save_table_profile(self):
+        """
+        Persist the current profile for restarts once it no longer is the source's
+        
+        Appends change 'sales' but not its source file, so the profile saved by
+        ingestion no longer describes the table; without a current profile the
+        saved one is removed and a restart falls back to the source's.
+        """
+        path = self._table_profile_path()
+        if path is None:
+            return
+        try:
+            if self.data_profile is None:
+                path.unlink(missing_ok=True)
+            else:
+                self.data_profile.save(str(path))
+        except OSError as e:
+            logger.warning(f"⚠️  Could not update the saved data profile {path}: {e}")
+    
+    def _stage_delta(self, file_path: str):
+        """Read a delta file into TEMP table _delta, cast to the sales table's schema"""
+        file_ext = Path(file_path).suffix.lower()
+        escaped = str(file_path).replace("'", "''")
+        if file_ext == '.csv':
+            source = f"read_csv_auto('{escaped}', ignore_errors=true, null_padding=true)"
+        elif file_ext == '.parquet':
+            source = f"read_parquet('{escaped}')"
+        elif file_ext in ['.xlsx', '.xls', '.json']:
+            df = pd.read_excel(file_path) if file_ext != '.json' else pd.read_json(file_path)
+            self.conn.register("_delta_df", df)
+            source = "_delta_df"
+        else:
+            raise ValueError(f"Unsupported file format: {file_ext}")
+        
+        # ENUM columns are staged as VARCHAR so values new to the ENUM survive the cast
+        enums = enum_columns(self.conn, "sales")
+        columns = ", ".join(
+            f'CAST("{col}" AS VARCHAR) AS "{col}"' if col in enums else f'"{col}"'
+            for col in self.schema_info['column_name']
+        )
+        self.conn.execute(f"CREATE OR REPLACE TEMP TABLE _delta AS SELECT {columns} FROM sales LIMIT 0")
+        self.conn.execute(f"INSERT INTO _delta BY NAME SELECT * FROM {source}")
+    
+    def _bump_data_version(self, rollup_current: bool = False):
+        """
+        Mark the sales table as changed so cached results are recomputed
+        
+        Args:
+            rollup_current: The rollup was already brought up to date with the change
+        """
+        with self._write_lock:
+            self.data_version += 1
+            self._summary_cache = None
+            self.query_cache.invalidate()
+            if rollup_current:
+                self.rollup.data_version = self.data_version
+            else:
+                self.rollup.clear(self.conn)
+    
+    def _prepare_rollup(self, reuse: bool = False):
+        """Build the rollup cube for the current data, or attach the persisted one"""
+        if not settings.enable_rollup or self.schema_info is None or len(self.schema_info) == 0:
+            return
+        with self._write_lock:
+            source = self._rollup_source()
+            if reuse and self.rollup.attach(self.conn, self.data_version, source):
+                logger.info(f"Using existing rollup with {self.rollup.row_count:,} rows")
+                return
+            self.rollup.build(self.conn, self.schema_info['column_name'].tolist(), self.data_version, source)
+    
+    def _rollup_source(self) -> Optional[str]:
+        """Identity of the recorded source of 'sales', stored with the rollup built from it"""
+        try:
+            fingerprint = self.catalog.get() if self.catalog is not None else None
+        except Exception:
+            return None
+        if fingerprint is None:
+            return None
+        return "|".join(str(v) for v in (
+            fingerprint.path, fingerprint.size, fingerprint.mtime_ns,
+            fingerprint.content_hash, fingerprint.catalog_version
+        ))
+    
+    def _record_source(self, file_path: str, row_count: int):
+        """Record the fingerprint of the file the 'sales' table was built from"""
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.record(compute_fingerprint(file_path), row_count)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not record source fingerprint: {e}")
+    
     def _get_schema(self) -> pd.DataFrame:
         """Get current table schema"""
         try:
@@ -186,19 +551,166 @@ class DataLayer:
         """
         Execute SQL query and return results as DataFrame
         
+        Read-only queries are served from the result cache when an equivalent
+        query (same SQL up to whitespace, casing and alias names) already ran
+        against the current data version.
+        
         Args:
             query: SQL query string
             
         Returns:
             DataFrame with query results
         """
+        return self._execute(query, "pandas")
+    
+    def execute_arrow(self, query: str) -> "pa.Table":
+        """
+        Execute SQL query and return results as a pyarrow.Table
+        
+        Skips the pandas conversion entirely; results are cached like execute_query.
+        
+        Args:
+            query: SQL query string
+            
+        Returns:
+            pyarrow.Table with query results
+        """
+        return self._execute(query, "arrow")
+    
+    def execute_streaming(self, query: str, batch_size: Optional[int] = None) -> StreamingResult:
+        """
+        Get a lazy handle to a query result without fetching any rows
+        
+        Args:
+            query: SELECT query string
+            batch_size: Rows per record batch (defaults to settings.stream_batch_size)
+            
+        Returns:
+            StreamingResult exposing row_count, head(), iter_batches() and to_parquet();
+            each of its queries and batch fetches is interrupted after
+            QUERY_TIMEOUT_SECONDS, Parquet exports are not
+        """
+        return StreamingResult(
+            self.conn, query,
+            batch_size=batch_size or settings.stream_batch_size,
+            pool=self.pool,
+            watchdog=self.watchdog,
+            timeout=settings.query_timeout_seconds
+        )
+    
+    def execute_bounded(self, query: str, max_rows: int, result_format: str = "pandas"):
+        """
+        Execute a query, materializing it only if it has at most max_rows rows
+        
+        At most max_rows + 1 rows are ever fetched; larger results come back as a
+        streaming handle instead.
+        
+        Args:
+            query: SELECT query string
+            max_rows: Largest result that is materialized
+            result_format: 'pandas' or 'arrow' for the materialized result
+            
+        Returns:
+            (result, None) for small results, (None, StreamingResult) for large ones
+        """
+        words = query.strip().split(None, 1)
+        if not words or words[0].lower() not in ("select", "with", "from"):
+            # Only plain queries can be wrapped in a bounding subquery
+            return self._execute(query, result_format), None
+        
+        query = query.strip().rstrip(";")
+        result = self._execute(query, result_format, limit=max_rows + 1)
+        if len(result) <= max_rows:
+            return result, None
+        return None, self.execute_streaming(query)
+    
+    def _execute(self, query: str, result_format: str, limit: Optional[int] = None):
+        """
+        Run a query through the result cache in the requested format
+        
+        Args:
+            query: SQL query string
+            result_format: 'pandas' or 'arrow'
+            limit: Optional row bound applied around the query
+        """
+        canonical = canonicalize_sql(self._bounded(query, limit), reserved=self._reserved_identifiers())
+        
+        version = self.data_version
+        cached = self.query_cache.get(canonical, version, result_format)
+        if cached is not None:
+            return cached
+        
         try:
-            result = self.conn.execute(query).fetchdf()
-            return result
+            with self.pool.cursor() as cursor, \
+                    self.watchdog.watch(cursor, settings.query_timeout_seconds) as deadline:
+                try:
+                    sql, from_rollup = query, False
+                    if self.rollup.data_version == version:
+                        sql, from_rollup = self.rollup.navigate(cursor, query)
+                    try:
+                        cursor.execute(self._bounded(sql, limit))
+                    except Exception:
+                        if not from_rollup or deadline.expired:
+                            raise
+                        # The rollup is only a shortcut; the fact table is always correct
+                        cursor.execute(self._bounded(query, limit))
+                    if result_format == "arrow":
+                        result = cursor.fetch_arrow_table()
+                    elif settings.enable_dictionary_encoding:
+                        result = encode_result(cursor.fetchdf())
+                    else:
+                        result = cursor.fetchdf()
+                except Exception as e:
+                    if deadline.expired:
+                        raise QueryTimeoutError(deadline.timeout) from e
+                    raise
         except Exception as e:
             print(f"❌ Query execution error: {e}")
             raise
-            
+        
+        if canonical.cacheable:
+            self.query_cache.put(canonical, version, result, result_format)
+        elif not self._is_read_only(query):
+            # Statements that may modify data make every cached result suspect
+            self._bump_data_version()
+            self._prepare_rollup()
+        return result
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counts of the query result cache"""
+        return self.query_cache.get_stats()
+    
+    @staticmethod
+    def _bounded(query: str, limit: Optional[int]) -> str:
+        """Wrap a query so it returns at most limit rows"""
+        if limit is None:
+            return query
+        return f"SELECT * FROM ({query}) AS _bounded LIMIT {limit}"
+    
+    def get_rollup_stats(self) -> Dict[str, Any]:
+        """Get rollup size and how many queries it answered"""
+        return self.rollup.get_stats()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get cursor pool usage, checkout wait times and query timeouts"""
+        if self.pool is None:
+            return {}
+        return {**self.pool.get_stats(), "query_timeouts": self.watchdog.timeouts}
+    
+    def _reserved_identifiers(self) -> List[str]:
+        """Names that must never be treated as query aliases"""
+        names = ["sales"]
+        if self.schema_info is not None and len(self.schema_info) > 0:
+            names.extend(self.schema_info['column_name'].tolist())
+        return names
+    
+    @staticmethod
+    def _is_read_only(query: str) -> bool:
+        """Check whether a statement only reads data"""
+        words = query.strip().split(None, 1)
+        first = words[0].lower() if words else ""
+        return first in ("select", "with", "from", "describe", "show", "explain", "summarize", "pragma")
+    
     def get_raw_data(self, limit: int = 500) -> pd.DataFrame:
         """
         Get raw sample data from the database
@@ -210,113 +722,142 @@ class DataLayer:
             DataFrame with raw records
         """
         try:
-            return self.conn.execute(f"SELECT * FROM sales LIMIT {limit}").fetchdf()
+            with self.pool.cursor() as cursor:
+                return cursor.execute(f"SELECT * FROM sales LIMIT {limit}").fetchdf()
         except Exception as e:
             logger.error(f"Error getting raw data: {e}")
             return pd.DataFrame()
     
     def get_summary_stats(self) -> Dict[str, Any]:
-        """Get summary statistics of the real Amazon sales dataset"""
+        """
+        Get summary statistics of the real Amazon sales dataset
+        
+        All breakdowns come from a single GROUPING SETS scan, and the result is
+        cached until the data version changes, so dashboard reruns never touch
+        the sales table.
+        """
+        if self._summary_cache is not None and self._summary_version == self.data_version:
+            return self._summary_cache
+        
         try:
-            stats = {}
-            
-            # Overall stats
-            overall = self.conn.execute("""
-                SELECT 
-                    COUNT(*) as total_orders,
-                    SUM(revenue) as total_revenue,
-                    SUM(estimated_profit) as total_profit,
-                    AVG(amount) as avg_order_value,
-                    MIN(date) as start_date,
-                    MAX(date) as end_date,
-                    SUM(CASE WHEN is_cancelled THEN 1 ELSE 0 END) as cancelled_orders
-                FROM sales
-            """).fetchone()
-            
-            stats["overall"] = {
-                "total_orders": overall[0],
-                "total_revenue": round(overall[1] or 0, 2),
-                "total_profit": round(overall[2] or 0, 2),
-                "avg_order_value": round(overall[3] or 0, 2),
-                "date_range": f"{overall[4]} to {overall[5]}",
-                "cancelled_orders": overall[6]
-            }
-            
-            # By state
-            states = self.conn.execute("""
-                SELECT 
-                    state,
-                    SUM(revenue) as revenue,
-                    COUNT(*) as orders
-                FROM sales
-                WHERE state IS NOT NULL
-                GROUP BY state
-                ORDER BY revenue DESC
-                LIMIT 10
-            """).fetchdf()
-            stats["top_states"] = states.to_dict('records')
-            
-            # By category
-            categories = self.conn.execute("""
-                SELECT 
-                    category,
-                    SUM(revenue) as revenue,
-                    COUNT(*) as orders
-                FROM sales
-                WHERE category IS NOT NULL
-                GROUP BY category
-                ORDER BY revenue DESC
-            """).fetchdf()
-            stats["by_category"] = categories.to_dict('records')
-            
-            # Monthly trends
-            monthly = self.conn.execute("""
-                SELECT 
-                    year,
-                    month,
-                    SUM(revenue) as revenue,
-                    SUM(estimated_profit) as profit,
-                    COUNT(*) as orders
-                FROM sales
-                GROUP BY year, month
-                ORDER BY year, month
-            """).fetchdf()
-            stats["monthly_trend"] = monthly.to_dict('records')
-            
-            # By status
-            status_df = self.conn.execute("""
-                SELECT 
-                    status,
-                    COUNT(*) as orders
-                FROM sales
-                WHERE status IS NOT NULL
-                GROUP BY status
-                ORDER BY orders DESC
-            """).fetchdf()
-            stats["by_status"] = status_df.to_dict('records')
-            
-            # By fulfillment (B2B vs B2C)
-            fulfillment_df = self.conn.execute("""
-                SELECT 
-                    CASE WHEN is_b2b THEN 'B2B' ELSE 'B2C' END as method,
-                    SUM(revenue) as revenue
-                FROM sales
-                GROUP BY method
-            """).fetchdf()
-            stats["by_fulfillment"] = fulfillment_df.to_dict('records')
-            
+            version = self.data_version
+            # The rollup is a TEMP table, so it must be built and read on one cursor
+            with self.pool.cursor() as cursor:
+                stats = self._compute_summary_stats(cursor)
+            if version == self.data_version:
+                self._summary_cache = stats
+                self._summary_version = version
             return stats
             
         except Exception as e:
             logger.error(f"❌ Error getting summary stats: {e}")
             return {}
     
+    def _compute_summary_stats(self, cursor) -> Dict[str, Any]:
+        """Build every summary breakdown from one pass over the sales table"""
+        # One scan produces all breakdowns; the slices below only read this small rollup
+        cursor.execute("""
+            CREATE OR REPLACE TEMP TABLE _summary_rollup AS
+            SELECT 
+                CASE 
+                    WHEN GROUPING(state) = 0 THEN 'state'
+                    WHEN GROUPING(category) = 0 THEN 'category'
+                    WHEN GROUPING(year) = 0 THEN 'month'
+                    WHEN GROUPING(status) = 0 THEN 'status'
+                    WHEN GROUPING(is_b2b) = 0 THEN 'fulfillment'
+                    ELSE 'overall'
+                END as grouping_set,
+                state,
+                category,
+                year,
+                month,
+                status,
+                is_b2b,
+                COUNT(*) as orders,
+                SUM(revenue) as revenue,
+                SUM(estimated_profit) as profit,
+                AVG(amount) as avg_order_value,
+                MIN(date) as start_date,
+                MAX(date) as end_date,
+                SUM(CASE WHEN is_cancelled THEN 1 ELSE 0 END) as cancelled_orders
+            FROM sales
+            GROUP BY GROUPING SETS ((), (state), (category), (year, month), (status), (is_b2b))
+        """)
+        
+        stats = {}
+        
+        # Overall stats
+        overall = cursor.execute("""
+            SELECT orders, revenue, profit, avg_order_value, start_date, end_date, cancelled_orders
+            FROM _summary_rollup
+            WHERE grouping_set = 'overall'
+        """).fetchone()
+        
+        stats["overall"] = {
+            "total_orders": overall[0],
+            "total_revenue": round(overall[1] or 0, 2),
+            "total_profit": round(overall[2] or 0, 2),
+            "avg_order_value": round(overall[3] or 0, 2),
+            "date_range": f"{overall[4]} to {overall[5]}",
+            "cancelled_orders": overall[6]
+        }
+        
+        # By state
+        states = cursor.execute("""
+            SELECT state, revenue, orders
+            FROM _summary_rollup
+            WHERE grouping_set = 'state' AND state IS NOT NULL
+            ORDER BY revenue DESC
+            LIMIT 10
+        """).fetchdf()
+        stats["top_states"] = states.to_dict('records')
+        
+        # By category
+        categories = cursor.execute("""
+            SELECT category, revenue, orders
+            FROM _summary_rollup
+            WHERE grouping_set = 'category' AND category IS NOT NULL
+            ORDER BY revenue DESC
+        """).fetchdf()
+        stats["by_category"] = categories.to_dict('records')
+        
+        # Monthly trends
+        monthly = cursor.execute("""
+            SELECT year, month, revenue, profit, orders
+            FROM _summary_rollup
+            WHERE grouping_set = 'month'
+            ORDER BY year, month
+        """).fetchdf()
+        stats["monthly_trend"] = monthly.to_dict('records')
+        
+        # By status
+        status_df = cursor.execute("""
+            SELECT status, orders
+            FROM _summary_rollup
+            WHERE grouping_set = 'status' AND status IS NOT NULL
+            ORDER BY orders DESC
+        """).fetchdf()
+        stats["by_status"] = status_df.to_dict('records')
+        
+        # By fulfillment (B2B vs B2C); NULL flags count as B2C as before
+        fulfillment_df = cursor.execute("""
+            SELECT 
+                CASE WHEN is_b2b THEN 'B2B' ELSE 'B2C' END as method,
+                SUM(revenue) as revenue
+            FROM _summary_rollup
+            WHERE grouping_set = 'fulfillment'
+            GROUP BY method
+        """).fetchdf()
+        stats["by_fulfillment"] = fulfillment_df.to_dict('records')
+        
+        return stats
+    
     def get_schema_context(self) -> str:
         """Get schema context for LLM with real Amazon sales data structure"""
         if self.schema_info is not None and len(self.schema_info) > 0:
             schema_str = "Database: 'sales' table\nColumns:\n"
             for _, row in self.schema_info.iterrows():
-                schema_str += f"- {row['column_name']}: {row['column_type']}\n"
+                schema_str += f"- {row['column_name']}: {display_type(row['column_type'])}\n"
             return schema_str
         
         # Fallback schema documentation for Amazon sales data
@@ -379,6 +920,8 @@ Common query patterns:
     
     def close(self):
         """Close database connection"""
+        if self.pool:
+            self.pool.close()
         if self.conn:
             self.conn.close()
     
@@ -391,11 +934,14 @@ Common query patterns:
 
 # Singleton instance
 _data_layer_instance = None
+_data_layer_lock = threading.Lock()
 
 
 def get_data_layer() -> DataLayer:
-    """Get singleton instance of DataLayer"""
+    """Get singleton instance of DataLayer (shared by every session; queries use pooled cursors)"""
     global _data_layer_instance
     if _data_layer_instance is None:
-        _data_layer_instance = DataLayer()
+        with _data_layer_lock:
+            if _data_layer_instance is None:
+                _data_layer_instance = DataLayer()
     return _data_layer_instance
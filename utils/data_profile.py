@@ -0,0 +1,386 @@
+"""
+Mergeable data-quality profile of the processed sales data
+Per-column row/null counts, min/max, sums, t-digest quantiles and HyperLogLog
+distinct counts. Profiles of chunks or partitions merge into the profile of
+the whole dataset, which is saved next to the data so quality checks and the
+validator can use it without rescanning.
+"""
+import base64
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+PROFILE_VERSION = 1
+
+# t-digest compression: about DIGEST_COMPRESSION / 2 centroids per column
+DIGEST_COMPRESSION = 200
+
+# HyperLogLog registers = 2 ** HLL_PRECISION (about 1.6% distinct-count error at 12)
+HLL_PRECISION = 12
+
+# Rows profiled at a time when a whole frame is profiled
+PROFILE_CHUNK_ROWS = 1_000_000
+
+# Columns that are group-by keys, never aggregated, so result values must lie in the data's range
+RANGE_COLUMNS = ("date", "year", "month", "quarter")
+
+
+class TDigest:
+    """Merging t-digest: sorted centroids, fine at the tails and coarse in the middle"""
+
+    def __init__(self, means: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None,
+                 compression: int = DIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0) if means is None else np.asarray(means, dtype=np.float64)
+        self.weights = np.empty(0) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: np.ndarray) -> "TDigest":
+        """Add values (NaN-free)"""
+        values, counts = np.unique(np.asarray(values, dtype=np.float64), return_counts=True)
+        return self._compress(np.concatenate([self.means, values]),
+                              np.concatenate([self.weights, counts.astype(np.float64)]))
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Add the centroids of another digest"""
+        return self._compress(np.concatenate([self.means, other.means]),
+                              np.concatenate([self.weights, other.weights]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> "TDigest":
+        """Merge neighbouring centroids that fall in the same unit of the k1 scale function"""
+        if len(means) == 0:
+            self.means, self.weights = means, weights
+            return self
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        mid = (np.cumsum(weights) - weights / 2) / weights.sum()
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * mid - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        return self
+
+    def quantile(self, q: float, lo: float, hi: float) -> Optional[float]:
+        """Value at quantile q, interpolated between centroids (lo/hi are the exact min/max)"""
+        if len(self.means) == 0:
+            return None
+        mid = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(q, np.r_[0.0, mid, 1.0], np.r_[lo, self.means, hi]))
+
+    def cdf(self, x: float, lo: float, hi: float) -> float:
+        """Fraction of values at or below x"""
+        if len(self.means) == 0:
+            return 0.0
+        mid = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(x, np.r_[lo, self.means, hi], np.r_[0.0, mid, 1.0]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"compression": self.compression, "means": self.means.tolist(), "weights": self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "TDigest":
+        return cls(state["means"], state["weights"], state["compression"])
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit hashes; merging takes the register-wise max"""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def update_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        """Add 64-bit hashes of values"""
+        if len(hashes) == 0:
+            return self
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = (hashes & np.uint64((1 << bits) - 1)).astype(np.float64)
+        # Position of the leftmost 1 bit of the remaining bits (frexp is exact below 2**53)
+        rank = np.where(rest > 0, bits - (np.frexp(rest)[1] - 1), bits + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        """Estimated number of distinct values"""
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # Linear counting for small cardinalities
+        return float(estimate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers.tobytes()).decode()}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        registers = np.frombuffer(base64.b64decode(state["registers"]), dtype=np.uint8).copy()
+        return cls(state["precision"], registers)
+
+
+@dataclass
+class ColumnProfile:
+    """Mergeable summary of one column"""
+    kind: str  # 'numeric', 'datetime', 'bool' or 'text'
+    count: int = 0
+    nulls: int = 0
+    min: Any = None
+    max: Any = None
+    sum: Optional[float] = None
+    digest: Optional[TDigest] = None
+    hll: Optional[HyperLogLog] = None
+
+    @classmethod
+    def of(cls, series: pd.Series, conn=None) -> "ColumnProfile":
+        """Profile one chunk of a column (conn: DuckDB connection for hashing text, reused across columns)"""
+        values = series.dropna()
+        profile = cls(kind=_kind(series.dtype), count=len(series), nulls=len(series) - len(values))
+        if profile.kind == "numeric":
+            numbers = values.to_numpy(dtype=np.float64)
+            profile.sum = float(numbers.sum())
+            profile.digest = TDigest().update(numbers)
+        if profile.kind != "bool":
+            profile.hll = HyperLogLog().update_hashes(_hashes(values, profile.kind, conn))
+        if len(values) and profile.kind in ("numeric", "datetime"):
+            profile.min, profile.max = _scalar(values.min()), _scalar(values.max())
+        return profile
+
+    def merge(self, other: "ColumnProfile") -> "ColumnProfile":
+        """Combine with the profile of another chunk of the same column"""
+        self.count += other.count
+        self.nulls += other.nulls
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        if other.sum is not None:
+            self.sum = (self.sum or 0.0) + other.sum
+        if other.digest is not None:
+            self.digest = other.digest if self.digest is None else self.digest.merge(other.digest)
+        if other.hll is not None:
+            self.hll = other.hll if self.hll is None else self.hll.merge(other.hll)
+        return self
+
+    @property
+    def null_ratio(self) -> float:
+        return self.nulls / self.count if self.count else 0.0
+
+    @property
+    def distinct(self) -> Optional[float]:
+        return self.hll.count() if self.hll is not None else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.digest.quantile(q, self.min, self.max) if self.digest is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = {"kind": self.kind, "count": self.count, "nulls": self.nulls,
+                 "min": _jsonable(self.min), "max": _jsonable(self.max), "sum": self.sum}
+        if self.digest is not None:
+            state["digest"] = self.digest.to_dict()
+        if self.hll is not None:
+            state["hll"] = self.hll.to_dict()
+        return state
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "ColumnProfile":
+        convert = pd.Timestamp if state["kind"] == "datetime" else (lambda v: v)
+        return cls(
+            kind=state["kind"], count=state["count"], nulls=state["nulls"],
+            min=None if state["min"] is None else convert(state["min"]),
+            max=None if state["max"] is None else convert(state["max"]),
+            sum=state.get("sum"),
+            digest=TDigest.from_dict(state["digest"]) if "digest" in state else None,
+            hll=HyperLogLog.from_dict(state["hll"]) if "hll" in state else None,
+        )
+
+
+class DataProfile:
+    """Column profiles of a dataset, built chunk by chunk"""
+
+    def __init__(self, columns: Optional[Dict[str, ColumnProfile]] = None, rows: int = 0):
+        self.columns = columns or {}
+        self.rows = rows
+
+    @classmethod
+    def of(cls, df: pd.DataFrame, chunk_rows: int = PROFILE_CHUNK_ROWS) -> "DataProfile":
+        """Profile a frame chunk by chunk (memory bounded by the chunk, not the frame)"""
+        profile = cls()
+        for start in range(0, len(df), chunk_rows):
+            profile.update(df.iloc[start:start + chunk_rows])
+        return profile
+
+    def update(self, chunk: pd.DataFrame) -> "DataProfile":
+        """Add one chunk of rows"""
+        return self.merge(DataProfile(_profile_columns(chunk, chunk.columns), len(chunk)))
+
+    def add_columns(self, df: pd.DataFrame, chunk_rows: int = PROFILE_CHUNK_ROWS) -> "DataProfile":
+        """Profile the columns of the same rows that are not profiled yet (derived features)"""
+        new = [col for col in df.columns if col not in self.columns]
+        for start in range(0, len(df), chunk_rows):
+            for col, column in _profile_columns(df.iloc[start:start + chunk_rows], new).items():
+                self.columns[col] = self.columns[col].merge(column) if col in self.columns else column
+        return self
+
+    def merge(self, other: "DataProfile") -> "DataProfile":
+        """Add the profile of other rows (a chunk, a partition or a worker's share)"""
+        for col, column in other.columns.items():
+            self.columns[col] = self.columns[col].merge(column) if col in self.columns else column
+        self.rows += other.rows
+        return self
+
+    def __getitem__(self, col: str) -> ColumnProfile:
+        return self.columns[col]
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.columns
+
+    def outliers(self, col: str, q: float = 0.99, factor: float = 3.0) -> int:
+        """Estimated rows of a column above factor times its q quantile"""
+        column = self.columns.get(col)
+        threshold = column.quantile(q) if column is not None else None
+        if threshold is None:
+            return 0
+        if column.max <= threshold * factor:
+            return 0
+        above = 1.0 - column.digest.cdf(threshold * factor, column.min, column.max)
+        return max(1, int(round(above * column.digest.count)))
+
+    def save(self, path: str):
+        """Write the profile as JSON atomically"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        state = {
+            "version": PROFILE_VERSION,
+            "rows": self.rows,
+            "columns": {col: column.to_dict() for col, column in self.columns.items()},
+        }
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DataProfile"]:
+        """Read a saved profile (None if missing, unreadable or from an older version)"""
+        try:
+            state = json.loads(Path(path).read_text())
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != PROFILE_VERSION:
+            return None
+        return cls({col: ColumnProfile.from_dict(c) for col, c in state["columns"].items()}, state["rows"])
+
+
+def profile_path(data_path: str) -> Path:
+    """Where the profile of a data file or partitioned dataset directory is kept"""
+    path = Path(data_path)
+    if path.is_dir() or not path.suffix:
+        return path / "_profile.json"
+    return path.with_name(path.stem + ".profile.json")
+
+
+def range_warnings(profile: DataProfile, df: pd.DataFrame) -> List[str]:
+    """
+    Result values the underlying data cannot have produced
+
+    Group-by keys (dates, year, month, quarter) must lie within the data's
+    range, and text columns cannot have more distinct values than the data.
+
+    Args:
+        profile: Profile of the queried dataset
+        df: Query result (DataFrame or pyarrow.Table)
+
+    Returns:
+        Warning messages
+    """
+    if isinstance(df, pa.Table):
+        df = df.select([c for c in df.column_names if c in profile.columns]).to_pandas()
+    warnings = []
+    for col in df.columns:
+        column = profile.columns.get(col)
+        if column is None or len(df) == 0:
+            continue
+        values = df[col].dropna()
+        if column.kind == "datetime":
+            values = pd.to_datetime(values, errors="coerce").dropna()
+        if col in RANGE_COLUMNS and column.min is not None and len(values):
+            try:
+                low, high = values.min(), values.max()
+                if low < column.min or high > column.max:
+                    warnings.append(f"{col} values outside the data's range {column.min} to {column.max}")
+            except TypeError:
+                continue
+        elif column.kind == "text" and column.hll is not None:
+            distinct = values.nunique()
+            if distinct > column.distinct * 1.1 + 1:
+                warnings.append(f"{col} has {distinct} distinct values, the data about {column.distinct:.0f}")
+    return warnings
+
+
+def _kind(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "text"
+
+
+def _profile_columns(chunk: pd.DataFrame, columns: List[str]) -> Dict[str, ColumnProfile]:
+    """Profiles of some columns of a chunk, sharing one DuckDB connection"""
+    conn = duckdb.connect(":memory:")
+    try:
+        return {col: ColumnProfile.of(chunk[col], conn) for col in columns}
+    finally:
+        conn.close()
+
+
+def _hashes(values: pd.Series, kind: str, conn=None) -> np.ndarray:
+    """
+    64-bit hashes of non-null values for the distinct-count sketch
+
+    Text is hashed by DuckDB (pandas hashes Python strings one at a time), so
+    str, object and categorical chunks of a column hash alike. Categoricals
+    only hash the categories present: duplicates do not change a HyperLogLog.
+    """
+    if kind != "text":
+        return pd.util.hash_pandas_object(values, index=False).to_numpy()
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = pd.Series(values.cat.categories[np.unique(values.cat.codes.to_numpy())])
+    try:
+        text = pa.array(values, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        text = pa.array(values.astype(str), type=pa.string())
+    cursor = conn.cursor() if conn is not None else duckdb.connect(":memory:")
+    try:
+        cursor.register("_values", pa.table({"v": text}))
+        return cursor.execute("SELECT hash(v) AS h FROM _values").fetchnumpy()["h"]
+    finally:
+        cursor.close()
+
+
+def _scalar(value: Any) -> Any:
+    """NumPy scalars as plain Python values (timestamps stay Timestamps)"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _jsonable(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, pd.Timestamp) else value
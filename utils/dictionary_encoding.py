@@ -0,0 +1,209 @@
+"""
+Dictionary encoding of the low-cardinality text columns
+The columns are pandas categoricals through ingestion and DuckDB ENUMs in the
+sales table, so query results come back dictionary-encoded instead of as one
+Python string per row
+"""
+import logging
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+logger = logging.getLogger(__name__)
+
+# Text columns with a small, mostly fixed vocabulary
+CATEGORICAL_COLUMNS = [
+    "status", "category", "state", "city", "fulfilment", "service_level",
+    "size", "courier_status", "data_source"
+]
+
+# Columns with more distinct values than this stay VARCHAR
+MAX_ENUM_VALUES = 100_000
+
+
+def to_categorical(df: pd.DataFrame, columns: Iterable[str] = CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """
+    Convert the low-cardinality text columns of a frame to pandas categoricals
+
+    Categories are sorted and ordered, like DuckDB ENUM results, so sorting
+    and group-by output match the plain string columns.
+
+    Args:
+        df: Frame to convert in place
+        columns: Candidate columns; missing ones are skipped
+
+    Returns:
+        The same frame
+    """
+    for col in columns:
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            if not (series.cat.ordered and categories.is_monotonic_increasing):
+                df[col] = series.cat.reorder_categories(categories.sort_values(), ordered=True)
+        elif series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            df[col] = series.astype("category").cat.as_ordered()
+    return df
+
+
+def encode_result(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dictionary-encode a query result frame
+
+    ENUM columns arrive as categoricals carrying the whole vocabulary; they keep
+    only the categories present. Columns named like CATEGORICAL_COLUMNS that
+    arrive as text (from a view or a cast) are encoded too, so results look the
+    same whatever 'sales' is backed by.
+
+    Args:
+        df: Result of fetchdf()
+
+    Returns:
+        The same frame
+    """
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return to_categorical(df)
+
+
+def dictionary_encode(table: "pa.Table", columns: Iterable[str] = CATEGORICAL_COLUMNS) -> "pa.Table":
+    """Dictionary-encode the string columns of an Arrow table (to_pandas then builds categoricals)"""
+    for col in columns:
+        if col not in table.column_names:
+            continue
+        i = table.schema.get_field_index(col)
+        type_ = table.schema.field(i).type
+        if pa.types.is_string(type_) or pa.types.is_large_string(type_):
+            table = table.set_column(i, col, pc.dictionary_encode(table[col]))
+    return table
+
+
+def enum_type(values: Iterable[str]) -> str:
+    """SQL for an ENUM of the values, sorted so ENUM ordering matches VARCHAR ordering"""
+    literals = ", ".join("'" + str(v).replace("'", "''") + "'" for v in sorted(set(values)))
+    return f"ENUM({literals})"
+
+
+def display_type(column_type: str) -> str:
+    """Column type as shown to the LLM: ENUMs behave like VARCHAR in queries"""
+    return "VARCHAR" if column_type.startswith("ENUM") else column_type
+
+
+def enum_columns(conn, table: str) -> Dict[str, List[str]]:
+    """
+    ENUM columns of a table and their vocabularies
+
+    Args:
+        conn: DuckDB connection or cursor
+        table: Table name
+
+    Returns:
+        Dict of column name to ENUM values
+    """
+    names = [
+        row[0] for row in conn.execute(
+            "SELECT column_name FROM duckdb_columns() WHERE table_name = ? AND data_type LIKE 'ENUM(%'",
+            [table]
+        ).fetchall()
+    ]
+    if not names:
+        return {}
+    # enum_range only needs a value of the type, so max() over an empty table works too
+    ranges = conn.execute(
+        "SELECT " + ", ".join(f'enum_range(max("{n}"))' for n in names) + f" FROM {table}"
+    ).fetchone()
+    return dict(zip(names, ranges))
+
+
+def encode_enums(conn, table: str = "sales",
+                 columns: Iterable[str] = CATEGORICAL_COLUMNS) -> List[str]:
+    """
+    Convert the VARCHAR columns of a table to ENUMs of their distinct values
+
+    Run this before indexes are created: DuckDB cannot alter an indexed table.
+
+    Args:
+        conn: DuckDB connection
+        table: Table to convert
+        columns: Candidate columns; missing and non-VARCHAR ones are skipped
+
+    Returns:
+        Columns converted
+    """
+    varchar = {
+        row[0] for row in conn.execute(
+            "SELECT column_name FROM duckdb_columns() WHERE table_name = ? AND data_type = 'VARCHAR'",
+            [table]
+        ).fetchall()
+    }
+    encoded = []
+    for col in columns:
+        if col not in varchar:
+            continue
+        values = [row[0] for row in conn.execute(
+            f'SELECT DISTINCT "{col}" FROM {table} WHERE "{col}" IS NOT NULL LIMIT {MAX_ENUM_VALUES + 1}'
+        ).fetchall()]
+        if not values or len(values) > MAX_ENUM_VALUES:
+            continue
+        conn.execute(f'ALTER TABLE {table} ALTER "{col}" TYPE {enum_type(values)}')
+        encoded.append(col)
+    if encoded:
+        logger.info(f"🗜️  Dictionary-encoded {len(encoded)} columns of {table} as ENUMs")
+    return encoded
+
+
+def widen_enums(conn, source: str, tables: Iterable[str]) -> List[str]:
+    """
+    Add values of a staging table that the ENUM columns of target tables lack
+
+    ENUMs are immutable, so a column that needs new values is altered to a
+    larger ENUM. DuckDB cannot alter a table that has indexes, so they are
+    dropped and re-created around the change.
+
+    Args:
+        conn: DuckDB connection
+        source: Table about to be inserted (its columns may be VARCHAR)
+        tables: Tables whose ENUM columns must accept the source's values
+
+    Returns:
+        Columns widened
+    """
+    source_columns = {row[0] for row in conn.execute(f"DESCRIBE {source}").fetchall()}
+    widened = set()
+    for table in tables:
+        changes = {}
+        for col, values in enum_columns(conn, table).items():
+            if col not in source_columns:
+                continue
+            known = set(values)
+            new = [row[0] for row in conn.execute(
+                f'SELECT DISTINCT CAST("{col}" AS VARCHAR) FROM {source} WHERE "{col}" IS NOT NULL'
+            ).fetchall() if row[0] not in known]
+            if new:
+                changes[col] = list(values) + new
+        if not changes:
+            continue
+        
+        indexes = conn.execute(
+            "SELECT index_name, sql FROM duckdb_indexes() WHERE table_name = ?", [table]
+        ).fetchall()
+        for name, _ in indexes:
+            conn.execute(f'DROP INDEX "{name}"')
+        for col, values in changes.items():
+            conn.execute(f'ALTER TABLE {table} ALTER "{col}" TYPE {enum_type(values)}')
+        for _, sql in indexes:
+            conn.execute(sql)
+        widened.update(changes)
+    if widened:
+        logger.info(f"🗜️  Added new values to ENUM columns {sorted(widened)}")
+    return sorted(widened)
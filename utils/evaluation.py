@@ -8,6 +8,7 @@ from datetime import datetime
 import re
 import json
 import pandas as pd
+from utils.arrow_results import column_summary, is_arrow_table, numeric_columns
 
 
 @dataclass
@@ -133,13 +134,13 @@ class QueryEvaluator:
         Evaluate query result against expectations
         
         Args:
-            df: Query result DataFrame
+            df: Query result DataFrame or pyarrow.Table
             test_case: Test case with expectations
             
         Returns:
             Evaluation result with score and details
         """
-        if df is None or df.empty:
+        if df is None or len(df) == 0:
             if test_case.min_rows == 0:
                 return {"score": 1.0, "message": "Empty result is acceptable"}
             return {"score": 0.0, "message": "Expected results but got empty"}
@@ -154,7 +155,8 @@ class QueryEvaluator:
         
         # Check for expected columns (flexible matching)
         found_columns = 0
-        df_columns_lower = [c.lower() for c in df.columns]
+        columns = df.column_names if is_arrow_table(df) else list(df.columns)
+        df_columns_lower = [c.lower() for c in columns]
         
         for expected_col in test_case.expected_columns:
             for actual_col in df_columns_lower:
@@ -171,7 +173,7 @@ class QueryEvaluator:
         return {
             "score": score,
             "row_count": len(df),
-            "columns": list(df.columns),
+            "columns": columns,
             "column_score": column_score,
             "issues": issues
         }
@@ -188,7 +190,7 @@ class FaithfulnessEvaluator:
         Args:
             response: Generated response text
             facts: Extracted facts from data
-            source_data: Source DataFrame
+            source_data: Source DataFrame or pyarrow.Table
             
         Returns:
             Faithfulness evaluation result
@@ -199,12 +201,15 @@ class FaithfulnessEvaluator:
         # Extract claims from response
         claims = self._extract_claims(response)
         
+        # Aggregate the source once instead of once per claim
+        source_values = self._source_aggregates(source_data) if claims else []
+        
         # Verify each claim
         verified = 0
         unverified = []
         
         for claim in claims:
-            if self._verify_claim(claim, facts, source_data):
+            if self._verify_claim(claim, facts, source_values):
                 verified += 1
             else:
                 unverified.append(claim)
@@ -252,8 +257,25 @@ class FaithfulnessEvaluator:
         
         return claims
     
+    def _source_aggregates(self, source_data: Any) -> List[float]:
+        """Sum, mean, max and min of every numeric column in the source data"""
+        if source_data is None:
+            return []
+        
+        values = []
+        if is_arrow_table(source_data):
+            for col in numeric_columns(source_data):
+                stats = column_summary(source_data[col])
+                values.extend(v for v in (stats["sum"], stats["mean"], stats["max"], stats["min"]) if v is not None)
+            return values
+        
+        for col in source_data.select_dtypes(include=['number']).columns:
+            values.extend([source_data[col].sum(), source_data[col].mean(),
+                           source_data[col].max(), source_data[col].min()])
+        return values
+    
     def _verify_claim(self, claim: Dict, facts: List[Dict], 
-                      source_data: pd.DataFrame) -> bool:
+                      source_values: List[float]) -> bool:
         """Verify a single claim against facts and source data"""
         
         if claim["type"] == "number":
@@ -266,13 +288,10 @@ class FaithfulnessEvaluator:
                     if abs(fact["value"] - target) / max(target, 1) < 0.05:  # 5% tolerance
                         return True
             
-            # Check source data
-            for col in source_data.select_dtypes(include=['number']).columns:
-                values = [source_data[col].sum(), source_data[col].mean(), 
-                         source_data[col].max(), source_data[col].min()]
-                for v in values:
-                    if abs(v - target) / max(target, 1) < 0.05:
-                        return True
+            # Check source data aggregates
+            for v in source_values:
+                if abs(v - target) / max(target, 1) < 0.05:
+                    return True
         
         elif claim["type"] == "ranking":
             # Verify ranking claims
@@ -0,0 +1,59 @@
+"""
+External (zero-load) sources for the DuckDB data layer
+Builds table expressions that read CSV/Parquet files in place, so 'sales' can
+be a view instead of a copy of the data
+"""
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(value: str) -> str:
+    """Quote a string literal for DuckDB SQL"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def csv_scan(conn, file_path: str) -> str:
+    """
+    Build a read_csv expression with the schema sniffed once, up front
+
+    Every query on a view re-reads the file; pinning the dialect and column
+    types here keeps DuckDB from re-sniffing a sample of the file each time.
+
+    Args:
+        conn: DuckDB connection used for sniffing
+        file_path: Path to the CSV file
+
+    Returns:
+        Table expression for use in FROM
+    """
+    path = str(Path(file_path).resolve())
+    row = conn.execute(
+        "SELECT Delimiter, HasHeader, Columns, DateFormat, TimestampFormat FROM sniff_csv(?)",
+        [path]
+    ).fetchone()
+    delimiter, has_header, columns, date_format, timestamp_format = row
+
+    column_spec = ", ".join(f"{_quote(c['name'])}: {_quote(c['type'])}" for c in columns)
+    options = [
+        _quote(path),
+        "auto_detect=false",
+        f"header={'true' if has_header else 'false'}",
+        f"delim={_quote(delimiter)}",
+        f"columns={{{column_spec}}}",
+        "ignore_errors=true",
+        "null_padding=true",
+    ]
+    if date_format:
+        options.append(f"dateformat={_quote(date_format)}")
+    if timestamp_format:
+        options.append(f"timestampformat={_quote(timestamp_format)}")
+
+    logger.info(f"📐 Cached CSV schema for {Path(path).name}: {len(columns)} columns")
+    return f"read_csv({', '.join(options)})"
+
+
+def parquet_scan(file_path: str) -> str:
+    """Build a read_parquet expression; the schema comes from the file footer"""
+    return f"read_parquet({_quote(Path(file_path).resolve())})"
@@ -6,6 +6,13 @@ from typing import Dict, List, Any, Optional, Tuple
 import re
 import pandas as pd
 from dataclasses import dataclass
+from utils.arrow_results import (
+    categorical_columns,
+    column_summary,
+    is_arrow_table,
+    numeric_columns,
+    pc
+)
 
 
 @dataclass
@@ -21,17 +28,26 @@ class VerifiedFact:
 class FactExtractor:
     """Extracts verifiable facts from query results"""
     
-    def extract_facts(self, df: pd.DataFrame, query_intent: Any) -> List[Dict[str, Any]]:
+    def extract_facts(self, df: pd.DataFrame, query_intent: Any,
+                      column_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """
         Extract verifiable facts from DataFrame
         
         Args:
-            df: Query result DataFrame
+            df: Query result DataFrame or pyarrow.Table
             query_intent: The query intent with context
+            column_stats: Full-result numeric statistics when df is only a preview
+                          of a streamed result
             
         Returns:
             List of extractable facts with their sources
         """
+        if column_stats is not None:
+            return self._extract_streamed_facts(column_stats)
+        
+        if is_arrow_table(df):
+            return self._extract_arrow_facts(df)
+        
         if df is None or df.empty:
             return [{"type": "empty", "claim": "No data found", "verified": True}]
         
@@ -57,6 +73,153 @@ class FactExtractor:
         
         return facts
     
+    def _extract_arrow_facts(self, table) -> List[Dict[str, Any]]:
+        """Extract the same facts as extract_facts from an Arrow table, one pass per column"""
+        if table.num_rows == 0:
+            return [{"type": "empty", "claim": "No data found", "verified": True}]
+        
+        facts = []
+        numeric_cols = numeric_columns(table)
+        categorical_cols = categorical_columns(table)
+        stats = {col: column_summary(table[col]) for col in numeric_cols}
+        
+        # Extract numeric aggregates
+        for col in numeric_cols:
+            col_stats = stats[col]
+            if col_stats["count"] == 0:
+                continue
+            if col_stats["count"] == 1:
+                value = col_stats["sum"]
+                facts.append({
+                    "type": "single_value",
+                    "column": col,
+                    "value": float(value),
+                    "claim": f"{col} is {value:,.2f}",
+                    "verified": True
+                })
+            else:
+                for fact_type, key, label in [("sum", "sum", "Total"), ("average", "mean", "Average"),
+                                              ("max", "max", "Maximum"), ("min", "min", "Minimum")]:
+                    facts.append({
+                        "type": fact_type,
+                        "column": col,
+                        "value": float(col_stats[key]),
+                        "claim": f"{label} {col} is {col_stats[key]:,.2f}",
+                        "verified": True
+                    })
+        
+        # Extract categorical facts
+        for col in categorical_cols:
+            unique_values = pc.unique(table[col].drop_null()).to_pylist()
+            facts.append({
+                "type": "unique_count",
+                "column": col,
+                "value": len(unique_values),
+                "claim": f"There are {len(unique_values)} unique {col} values",
+                "verified": True
+            })
+            if len(unique_values) <= 10:
+                facts.append({
+                    "type": "categories",
+                    "column": col,
+                    "value": unique_values,
+                    "claim": f"{col} includes: {', '.join(map(str, unique_values[:5]))}",
+                    "verified": True
+                })
+        
+        # Extract ranking facts if multiple rows
+        if table.num_rows > 1 and categorical_cols:
+            id_values = table[categorical_cols[0]]
+            for col in numeric_cols:
+                col_stats = stats[col]
+                if col_stats["count"] == 0:
+                    continue
+                for fact_type, key, word in [("ranking_top", "max", "highest"), ("ranking_bottom", "min", "lowest")]:
+                    idx = self._arrow_index_of(table[col], col_stats[key])
+                    if idx is None:
+                        continue
+                    identifier = id_values[idx].as_py()
+                    facts.append({
+                        "type": fact_type,
+                        "column": col,
+                        "identifier": str(identifier),
+                        "value": float(col_stats[key]),
+                        "claim": f"{identifier} has the {word} {col} at {col_stats[key]:,.2f}",
+                        "verified": True
+                    })
+        
+        # Extract comparison facts
+        if table.num_rows >= 2:
+            for col in numeric_cols:
+                col_stats = stats[col]
+                if col_stats["count"] < 2:
+                    continue
+                max_val, min_val = col_stats["max"], col_stats["min"]
+                if min_val > 0:
+                    ratio = max_val / min_val
+                    facts.append({
+                        "type": "ratio",
+                        "column": col,
+                        "value": float(ratio),
+                        "claim": f"The highest {col} is {ratio:.1f}x the lowest",
+                        "verified": True
+                    })
+                difference = max_val - min_val
+                facts.append({
+                    "type": "difference",
+                    "column": col,
+                    "value": float(difference),
+                    "claim": f"The range of {col} is {difference:,.2f}",
+                    "verified": True
+                })
+        
+        return facts
+    
+    def _extract_streamed_facts(self, column_stats: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract aggregate facts for a streamed result from its full-result statistics
+        
+        Row-level facts (rankings, distinct values) are skipped because only a
+        preview of the rows is available.
+        """
+        facts = []
+        for col, stats in column_stats.items():
+            if not stats.get("count"):
+                continue
+            for fact_type, key, label in [("sum", "sum", "Total"), ("average", "mean", "Average"),
+                                          ("max", "max", "Maximum"), ("min", "min", "Minimum")]:
+                facts.append({
+                    "type": fact_type,
+                    "column": col,
+                    "value": float(stats[key]),
+                    "claim": f"{label} {col} is {stats[key]:,.2f}",
+                    "verified": True
+                })
+            if stats["count"] >= 2:
+                if stats["min"] > 0:
+                    ratio = stats["max"] / stats["min"]
+                    facts.append({
+                        "type": "ratio",
+                        "column": col,
+                        "value": float(ratio),
+                        "claim": f"The highest {col} is {ratio:.1f}x the lowest",
+                        "verified": True
+                    })
+                facts.append({
+                    "type": "difference",
+                    "column": col,
+                    "value": float(stats["max"] - stats["min"]),
+                    "claim": f"The range of {col} is {stats['max'] - stats['min']:,.2f}",
+                    "verified": True
+                })
+        return facts
+    
+    @staticmethod
+    def _arrow_index_of(column, value) -> Optional[int]:
+        """Row position of the first occurrence of value in a numeric column"""
+        idx = pc.index(pc.cast(column, "float64"), float(value)).as_py()
+        return idx if idx is not None and idx >= 0 else None
+    
     def _extract_numeric_facts(self, df: pd.DataFrame, col: str) -> List[Dict]:
         """Extract facts about numeric columns"""
         facts = []
@@ -114,7 +277,13 @@ class FactExtractor:
         """Extract facts about categorical columns"""
         facts = []
         
-        unique_values = df[col].dropna().unique()
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Distinct codes (small ints) instead of hashing every value
+            codes = pd.unique(series.cat.codes.to_numpy())
+            unique_values = series.cat.categories.take(codes[codes >= 0]).to_numpy()
+        else:
+            unique_values = series.dropna().unique()
         
         facts.append({
             "type": "unique_count",
@@ -0,0 +1,162 @@
+"""
+Ingestion manifest
+Records each raw source as it was last processed (fingerprint, row count,
+schema, output partitions) next to a cache of its processed rows, plus a
+digest of every output partition, so a run reprocesses only changed sources
+and rewrites only changed partitions
+"""
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.catalog import SourceFingerprint, compute_fingerprint
+from utils.partitioned_store import NULL_PARTITION, PARTITION_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Bump when source processing changes, so cached frames from older code are rebuilt
+MANIFEST_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass
+class SourceEntry:
+    """What a source file looked like when it was processed, and where its rows went"""
+    fingerprint: Dict[str, Any]
+    row_count: int
+    schema: Dict[str, str]
+    artifact: str
+    partitions: List[str] = field(default_factory=list)
+
+
+class IngestionManifest:
+    """Per-source processing state and per-partition digests of the last run"""
+
+    def __init__(self, cache_dir: str):
+        """
+        Load the manifest kept in cache_dir (empty if missing or from older code)
+
+        Args:
+            cache_dir: Directory holding manifest.json and the processed frames
+        """
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / MANIFEST_FILE
+        self.sources: Dict[str, SourceEntry] = {}
+        self.partitions: Dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return
+        if state.get("version") != MANIFEST_VERSION:
+            logger.info("🔄 Ingestion manifest is from an older version, reprocessing every source")
+            return
+        self.sources = {name: SourceEntry(**entry) for name, entry in state.get("sources", {}).items()}
+        self.partitions = state.get("partitions", {})
+
+    def save(self):
+        """Write the manifest atomically (a crash leaves the previous one in place)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        state = {
+            "version": MANIFEST_VERSION,
+            "sources": {name: asdict(entry) for name, entry in self.sources.items()},
+            "partitions": self.partitions,
+        }
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
+
+    def cached(self, source: str, path: Path) -> Tuple[Optional[pd.DataFrame], SourceFingerprint]:
+        """
+        Processed rows of a source, if the file is unchanged since they were cached
+
+        Args:
+            source: Source name
+            path: Raw file of the source
+
+        Returns:
+            (processed frame or None when the source must be reprocessed, current fingerprint)
+        """
+        fingerprint = compute_fingerprint(str(path))
+        entry = self.sources.get(source)
+        if entry is None or not fingerprint.matches(SourceFingerprint(**entry.fingerprint)):
+            return None, fingerprint
+        try:
+            return pd.read_parquet(entry.artifact), fingerprint
+        except Exception as e:
+            logger.warning(f"⚠️  Cached {source} rows unreadable ({e}), reprocessing")
+            return None, fingerprint
+
+    def record(self, source: str, fingerprint: SourceFingerprint, raw: pd.DataFrame,
+               processed: Optional[pd.DataFrame], partition_cols: Tuple[str, ...] = PARTITION_COLUMNS):
+        """
+        Cache the processed rows of a source and describe the raw file they came from
+
+        Args:
+            source: Source name
+            fingerprint: Fingerprint of the raw file
+            raw: Raw frame as read (for its row count and schema)
+            processed: Processed frame (None for sources used as-is)
+            partition_cols: Columns naming the output partitions
+        """
+        frame = processed if processed is not None else raw
+        artifact = self.cache_dir / f"{source}.parquet"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            frame.to_parquet(artifact, index=False)
+        except Exception as e:
+            # Still processed correctly; it will just be reprocessed next run
+            logger.warning(f"⚠️  Could not cache {source} rows: {e}")
+            self.sources.pop(source, None)
+            return
+
+        partitions = []
+        if all(c in frame.columns for c in partition_cols):
+            keys = frame[list(partition_cols)].drop_duplicates().itertuples(index=False)
+            partitions = sorted(
+                "/".join(f"{c}={NULL_PARTITION if pd.isna(v) else v}" for c, v in zip(partition_cols, key))
+                for key in keys
+            )
+        self.sources[source] = SourceEntry(
+            fingerprint=asdict(fingerprint),
+            row_count=len(raw),
+            schema={col: str(dtype) for col, dtype in raw.dtypes.items()},
+            artifact=str(artifact),
+            partitions=partitions,
+        )
+
+    def forget(self, source: str):
+        """Drop a source whose file disappeared"""
+        entry = self.sources.pop(source, None)
+        if entry is not None:
+            Path(entry.artifact).unlink(missing_ok=True)
+
+    def schema_changes(self, source: str, raw: pd.DataFrame) -> Tuple[List[str], List[str]]:
+        """Columns added to and removed from a source since it was last processed"""
+        entry = self.sources.get(source)
+        if entry is None:
+            return [], []
+        before, now = list(entry.schema), list(raw.columns)
+        return [c for c in now if c not in before], [c for c in before if c not in now]
+
+    def diff_partitions(self, digests: Dict[str, str]) -> Tuple[List[str], List[str]]:
+        """
+        Partitions whose contents changed since the last run, and partitions that are gone
+
+        Args:
+            digests: Current partition digests (from partition_digests)
+
+        Returns:
+            (changed or new partition paths, removed partition paths)
+        """
+        changed = sorted(key for key, digest in digests.items() if self.partitions.get(key) != digest)
+        removed = sorted(key for key in self.partitions if key not in digests)
+        return changed, removed
@@ -0,0 +1,268 @@
+"""
+Per-stage instrumentation of the ingestion pipeline
+Records wall and CPU time, rows in and out, throughput and memory peaks of each
+stage, and writes them as a JSON/Parquet run report that the next run is
+compared against
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# History of every stage of every run, next to the per-run JSON files
+HISTORY_FILE = "stages.parquet"
+
+# Relative change in a stage's wall time that the comparison flags
+REGRESSION_THRESHOLD = 0.2
+
+
+@dataclass
+class StageMetrics:
+    """Measurements of one pipeline stage"""
+    stage: str
+    status: str = "ok"
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    rows_per_s: Optional[float] = None
+    rss_start_mb: Optional[float] = None
+    rss_peak_mb: Optional[float] = None
+    traced_peak_mb: Optional[float] = None
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident memory of this process right now (None where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _RSSSampler:
+    """
+    Polls RSS on a daemon thread to find a stage's peak
+
+    VmHWM only holds the peak of the whole process, and resetting it would
+    disturb anyone else measuring the process.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+class StageProfiler:
+    """Collects StageMetrics for the stages of one pipeline run"""
+
+    def __init__(self, trace_memory: bool = False, sample_interval: float = 0.01):
+        """
+        Initialize profiler
+
+        Args:
+            trace_memory: Also record the tracemalloc peak of Python/NumPy allocations
+                          (precise, but slows allocation-heavy stages down)
+            sample_interval: Seconds between RSS samples
+        """
+        self.trace_memory = trace_memory
+        self.sample_interval = sample_interval
+        self.stages: List[StageMetrics] = []
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[StageMetrics]:
+        """
+        Measure the block as one stage; set rows_out on the yielded metrics
+
+        Args:
+            name: Stage name
+            rows_in: Rows entering the stage, if known up front
+
+        Yields:
+            StageMetrics recorded when the block exits (status 'failed' on an exception)
+        """
+        metrics = StageMetrics(stage=name, rows_in=rows_in, rss_start_mb=current_rss_mb())
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            with _RSSSampler(self.sample_interval) as sampler:
+                yield metrics
+        except BaseException:
+            metrics.status = "failed"
+            raise
+        finally:
+            metrics.wall_s = time.perf_counter() - wall
+            metrics.cpu_s = time.process_time() - cpu
+            metrics.rss_peak_mb = sampler.peak
+            if self.trace_memory:
+                metrics.traced_peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                if started_tracing:
+                    tracemalloc.stop()
+            rows = metrics.rows_in if metrics.rows_in is not None else metrics.rows_out
+            if rows is not None and metrics.wall_s > 0:
+                metrics.rows_per_s = rows / metrics.wall_s
+            self.stages.append(metrics)
+            logger.info(f"   ⏱️  {name}: {metrics.wall_s:.2f}s wall, {metrics.cpu_s:.2f}s CPU"
+                        + (f", {metrics.rows_per_s:,.0f} rows/s" if metrics.rows_per_s else "")
+                        + (f", peak RSS {metrics.rss_peak_mb:,.0f} MB" if metrics.rss_peak_mb else ""))
+
+    def report(self, status: str = "ok", **metadata: Any) -> Dict[str, Any]:
+        """
+        Summarize the run
+
+        Args:
+            status: 'ok' or 'failed'
+            **metadata: Extra fields (engine, storage mode, ...)
+
+        Returns:
+            JSON-serializable run report
+        """
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "status": status,
+            "wall_s": sum(s.wall_s for s in self.stages),
+            "cpu_s": sum(s.cpu_s for s in self.stages),
+            "process_peak_rss_mb": process_peak_rss_mb(),
+            **metadata,
+            "stages": [asdict(s) for s in self.stages],
+        }
+
+
+def process_peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process in MB (None where the platform can't tell)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_run_report(report: Dict[str, Any], report_dir: str) -> Path:
+    """
+    Write a run report as JSON and append its stages to the Parquet history
+
+    Args:
+        report: Output of StageProfiler.report()
+        report_dir: Directory of the reports
+
+    Returns:
+        Path of the JSON report
+    """
+    root = Path(report_dir)
+    root.mkdir(parents=True, exist_ok=True)
+    started = report["started_at"].replace(":", "").replace("-", "")
+    path = root / f"run_{started}_{report['run_id']}.json"
+    path.write_text(json.dumps(report, indent=2))
+
+    run_fields = {k: v for k, v in report.items() if k != "stages" and not isinstance(v, (dict, list))}
+    stages = pd.DataFrame([{**run_fields, **stage} for stage in report["stages"]])
+    history = root / HISTORY_FILE
+    try:
+        if history.exists():
+            stages = pd.concat([pd.read_parquet(history), stages], ignore_index=True)
+        stages.to_parquet(history, index=False)
+    except Exception as e:
+        logger.warning(f"⚠️  Could not update run history {history}: {e}")
+    logger.info(f"   📝 Run report: {path}")
+    return path
+
+
+def load_latest_report(report_dir: str, status: Optional[str] = "ok") -> Optional[Dict[str, Any]]:
+    """
+    Most recent run report in a directory
+
+    Args:
+        report_dir: Directory of the reports
+        status: Only consider runs with this status (None for any)
+
+    Returns:
+        The report, or None if there is none
+    """
+    for path in sorted(Path(report_dir).glob("run_*.json"), reverse=True):
+        try:
+            report = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if status is None or report.get("status") == status:
+            return report
+    return None
+
+
+def compare_reports(current: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> str:
+    """
+    Stage-by-stage comparison of two runs as a printable table
+
+    Args:
+        current: Report of this run
+        previous: Report of an earlier run (None prints this run alone)
+
+    Returns:
+        Table with wall time, its change, throughput and peak RSS per stage
+    """
+    before = {s["stage"]: s for s in (previous or {}).get("stages", [])}
+    lines = [f"{'stage':<22}{'wall_s':>9}{'prev_s':>9}{'change':>9}{'rows/s':>13}{'peak_MB':>10}"]
+    stages = current["stages"] + [{"stage": "total", "wall_s": current["wall_s"]}]
+    if previous is not None:
+        before["total"] = {"wall_s": previous["wall_s"]}
+
+    for stage in stages:
+        prev = before.get(stage["stage"], {}).get("wall_s")
+        change, flag = "", ""
+        if prev:
+            ratio = stage["wall_s"] / prev - 1
+            change = f"{ratio:+.0%}"
+            flag = "  ⚠️ slower" if ratio > REGRESSION_THRESHOLD else ""
+        rows = f"{stage['rows_per_s']:,.0f}" if stage.get("rows_per_s") else ""
+        peak = f"{stage['rss_peak_mb']:,.0f}" if stage.get("rss_peak_mb") else ""
+        prev_s = f"{prev:.2f}" if prev is not None else ""
+        lines.append(f"{stage['stage']:<22}{stage['wall_s']:>9.2f}{prev_s:>9}{change:>9}{rows:>13}{peak:>10}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,428 @@
+"""
+Persistent cache of LLM responses
+SQLite file keyed by provider, model, sampling parameters and a hash of the
+messages, looked up first exactly and then with whitespace/Unicode-normalized
+message text, so repeated questions skip the provider across restarts
+"""
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessageChunk, BaseMessage, message_chunk_to_message, message_to_dict, messages_from_dict
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    exact_key TEXT PRIMARY KEY,
+    normalized_key TEXT NOT NULL,
+    provider TEXT,
+    model TEXT,
+    response TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    latency_s REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS llm_responses_normalized ON llm_responses (normalized_key);
+CREATE INDEX IF NOT EXISTS llm_responses_last_access ON llm_responses (last_access);
+"""
+
+
+def _content_text(content: Any) -> str:
+    """Message content as one string (multi-part content is serialized)"""
+    return content if isinstance(content, str) else json.dumps(content, sort_keys=True, default=str)
+
+
+def normalize_text(text: str) -> str:
+    """Fold Unicode compatibility forms and collapse whitespace runs"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def message_keys(scope: Dict[str, Any], messages: Sequence[BaseMessage]) -> Tuple[str, str]:
+    """
+    Exact and normalized cache keys of a request
+
+    Args:
+        scope: Provider, model and sampling parameters the response depends on
+        messages: Chat messages sent to the model
+
+    Returns:
+        (exact key, normalized key), both SHA-256 hex digests
+    """
+    scope_json = json.dumps(scope, sort_keys=True, default=str)
+    exact = [(m.type, _content_text(m.content)) for m in messages]
+    normalized = [(m.type, normalize_text(text)) for m, (_, text) in zip(messages, exact)]
+
+    def digest(payload) -> str:
+        return hashlib.sha256(json.dumps([scope_json, payload]).encode()).hexdigest()
+    return digest(exact), digest(normalized)
+
+
+class LLMResponseCache:
+    """
+    Thread-safe SQLite cache of chat results with TTL and LRU size eviction
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize cache
+
+        Args:
+            path: SQLite file (created if missing; ':memory:' keeps it in process)
+            ttl_seconds: Age after which entries expire (0 keeps them)
+            max_entries: Entries kept before the least recently used are evicted
+            max_bytes: Total size of stored responses kept before evicting
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.seconds_saved = 0.0
+        self._purge_expired()
+
+    def get(self, exact_key: str, normalized_key: str) -> Optional[Tuple[ChatResult, str]]:
+        """
+        Look up a response, exactly first and then by normalized messages
+
+        Args:
+            exact_key: Key of the messages as sent
+            normalized_key: Key of the normalized messages
+
+        Returns:
+            (cached ChatResult, 'exact' or 'normalized'), or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row, kind = self._conn.execute(
+                "SELECT exact_key, response, latency_s, created_at FROM llm_responses WHERE exact_key = ?",
+                (exact_key,)
+            ).fetchone(), "exact"
+            if row is None:
+                row, kind = self._conn.execute(
+                    "SELECT exact_key, response, latency_s, created_at FROM llm_responses "
+                    "WHERE normalized_key = ? ORDER BY last_access DESC LIMIT 1",
+                    (normalized_key,)
+                ).fetchone(), "normalized"
+
+            if row is not None and self._expired(row[3], now):
+                self._conn.execute("DELETE FROM llm_responses WHERE exact_key = ?", (row[0],))
+                self.expirations += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_responses SET last_access = ?, hits = hits + 1 WHERE exact_key = ?", (now, row[0])
+            )
+            if kind == "exact":
+                self.exact_hits += 1
+            else:
+                self.normalized_hits += 1
+            self.seconds_saved += row[2]
+
+        return self._deserialize(row[1]), kind
+
+    def put(self, exact_key: str, normalized_key: str, result: ChatResult, latency_s: float,
+            provider: str = "", model: str = ""):
+        """Store a response, evicting least recently used entries beyond the size limits"""
+        payload = self._serialize(result)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (exact_key, normalized_key, provider, model, payload, len(payload), latency_s, now, now)
+            )
+            self._evict()
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters of this process and the stored totals"""
+        with self._lock:
+            entries, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses"
+            ).fetchone()
+            hits = self.exact_hits + self.normalized_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "exact_hits": self.exact_hits,
+                "normalized_hits": self.normalized_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": entries,
+                "bytes": stored,
+                "max_bytes": self.max_bytes,
+                "seconds_saved": self.seconds_saved,
+                "hit_rate": hits / lookups if lookups else 0.0
+            }
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _purge_expired(self):
+        """Delete entries past their TTL"""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self.expirations += max(cursor.rowcount, 0)
+
+    def _evict(self):
+        """Delete least recently used entries until both limits hold (caller holds the lock)"""
+        entries, stored = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses"
+        ).fetchone()
+        if entries <= self.max_entries and stored <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT exact_key, size_bytes FROM llm_responses ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if entries <= self.max_entries and stored <= self.max_bytes:
+                break
+            doomed.append((key,))
+            entries -= 1
+            stored -= size
+        self._conn.executemany("DELETE FROM llm_responses WHERE exact_key = ?", doomed)
+        self.evictions += len(doomed)
+
+    @staticmethod
+    def _serialize(result: ChatResult) -> str:
+        return json.dumps({
+            "generations": [
+                {"message": message_to_dict(g.message), "generation_info": g.generation_info}
+                for g in result.generations
+            ],
+            "llm_output": result.llm_output,
+        }, default=str)
+
+    @staticmethod
+    def _deserialize(payload: str) -> ChatResult:
+        data = json.loads(payload)
+        generations = [
+            ChatGeneration(message=messages_from_dict([g["message"]])[0], generation_info=g["generation_info"])
+            for g in data["generations"]
+        ]
+        return ChatResult(generations=generations, llm_output=data["llm_output"])
+
+
+class CachedChatModel(BaseChatModel):
+    """
+    Chat model that answers repeated requests from an LLMResponseCache and
+    forwards the rest to the wrapped model
+    """
+
+    llm: Any = None
+    response_cache: Any = None
+    provider: str = ""
+    model_name: str = ""
+    temperature: float = 0.0
+    max_tokens: Optional[int] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {
+            "provider": self.provider,
+            "model_name": self.model_name,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+
+    def _keys(self, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Tuple[str, str]:
+        scope = {**self._identifying_params, "stop": stop, "kwargs": kwargs}
+        return message_keys(scope, messages)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Return a cached response or generate and store one"""
+        keys = self._keys(messages, stop, kwargs)
+        cached = self.response_cache.get(*keys)
+        if cached is not None:
+            return self._mark_hit(*cached)
+
+        started = time.perf_counter()
+        result = self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._store(keys, result, time.perf_counter() - started)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Async variant of _generate (the cache lookup itself is a local SQLite read)"""
+        keys = self._keys(messages, stop, kwargs)
+        cached = self.response_cache.get(*keys)
+        if cached is not None:
+            return self._mark_hit(*cached)
+
+        started = time.perf_counter()
+        result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._store(keys, result, time.perf_counter() - started)
+        return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Replay a cached response as one chunk, or stream the wrapped model and cache the full text"""
+        keys = self._keys(messages, stop, kwargs)
+        cached = self.response_cache.get(*keys)
+        if cached is not None:
+            yield self._as_chunk(self._mark_hit(*cached))
+            return
+
+        started = time.perf_counter()
+        if type(self.llm)._stream is BaseChatModel._stream:
+            # The wrapped model cannot stream; hand over its whole answer at once
+            result = self.llm._generate(messages, stop=stop, **kwargs)
+            self._store(keys, result, time.perf_counter() - started)
+            yield self._as_chunk(result)
+            return
+
+        # The caller reports tokens to run_manager; passing it on would report them twice
+        merged = None
+        for chunk in self.llm._stream(messages, stop=stop, **kwargs):
+            merged = chunk if merged is None else merged + chunk
+            yield chunk
+        # Only a stream read to the end is cached
+        if merged is not None:
+            message = message_chunk_to_message(merged.message)
+            self._store(keys, ChatResult(generations=[ChatGeneration(message=message)]),
+                        time.perf_counter() - started)
+
+    @staticmethod
+    def _as_chunk(result: ChatResult) -> ChatGenerationChunk:
+        generation = result.generations[0]
+        return ChatGenerationChunk(message=AIMessageChunk(content=generation.message.content),
+                                   generation_info=generation.generation_info)
+
+    def _store(self, keys: Tuple[str, str], result: ChatResult, latency_s: float):
+        """Cache a result unless it is empty; a failing cache never fails the request"""
+        if not result.generations or not any(_content_text(g.message.content) for g in result.generations):
+            return
+        try:
+            self.response_cache.put(*keys, result, latency_s, provider=self.provider, model=self.model_name)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️  Could not cache LLM response: {e}")
+
+    @staticmethod
+    def _mark_hit(result: ChatResult, kind: str) -> ChatResult:
+        for generation in result.generations:
+            generation.generation_info = {**(generation.generation_info or {}), "cache_hit": kind}
+        return result
+
+
+_caches: Dict[Tuple[str, float, int, int], LLMResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Shared response cache configured in settings
+
+    Returns:
+        The process-wide LLMResponseCache, or None when LLM_CACHE_PATH is empty
+        or the file cannot be opened
+    """
+    from config import settings
+
+    if not settings.llm_cache_path:
+        return None
+    key = (settings.llm_cache_path, settings.llm_cache_ttl_seconds,
+           settings.llm_cache_max_entries, settings.llm_cache_max_bytes)
+    with _caches_lock:
+        if key not in _caches:
+            try:
+                _caches[key] = LLMResponseCache(
+                    settings.llm_cache_path,
+                    ttl_seconds=settings.llm_cache_ttl_seconds,
+                    max_entries=settings.llm_cache_max_entries,
+                    max_bytes=settings.llm_cache_max_bytes
+                )
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"⚠️  LLM response cache disabled ({settings.llm_cache_path}): {e}")
+                return None
+        return _caches[key]
+
+
+def with_response_cache(llm: BaseChatModel, provider: str, model: str, temperature: float,
+                        max_tokens: Optional[int] = None) -> BaseChatModel:
+    """
+    Wrap a chat model in the shared response cache when caching applies
+
+    Args:
+        llm: Chat model to wrap
+        provider: Provider name (part of the cache key)
+        model: Model name (part of the cache key)
+        temperature: Sampling temperature; above LLM_CACHE_MAX_TEMPERATURE the model is not wrapped
+        max_tokens: Output token limit (part of the cache key)
+
+    Returns:
+        CachedChatModel around llm, or llm itself when caching is off
+    """
+    from config import settings
+
+    if temperature > settings.llm_cache_max_temperature:
+        return llm
+    cache = get_llm_cache()
+    if cache is None:
+        return llm
+    return CachedChatModel(llm=llm, response_cache=cache, provider=provider, model_name=model,
+                           temperature=temperature, max_tokens=max_tokens)
@@ -1,11 +1,14 @@
 """
 LLM utilities for agent system
 """
-from typing import Optional, List, Any, Iterator
+import hashlib
+import threading
+import time
+from typing import Optional, List, Any, Callable, Dict, Iterator
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import BaseMessage
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.outputs import ChatResult, ChatGeneration
+from langchain_core.outputs import ChatResult, ChatGeneration, ChatGenerationChunk
 from langchain_core.callbacks import CallbackManagerForLLMRun
 
 # Try to import Google Gemini, but make it optional
@@ -17,6 +20,16 @@ except ImportError:
     ChatGoogleGenerativeAI = None
 
 from config import settings, get_secret
+from utils.llm_cache import with_response_cache
+from utils.model_health import ERROR, RATE_LIMIT, UNAVAILABLE, get_model_health
+
+
+# Chat models shared by every agent, keyed by provider, model, temperature,
+# options and a hash of the credentials they were built with
+_llm_registry: Dict[tuple, Any] = {}
+# Compiled chains keyed by (chain name, id of their LLM)
+_chain_registry: Dict[tuple, tuple] = {}
+_registry_lock = threading.Lock()
 
 
 # Fallback models for Gemini (in order of preference)
@@ -33,6 +46,8 @@ class GeminiFallbackLLM(BaseChatModel):
     """
     A wrapper LLM that automatically falls back to alternative Gemini models
     when rate limits (429) or other errors occur.
+    Models are tried healthiest first (see utils.model_health), so a model
+    that was just rate limited is skipped until its cooldown has passed.
     Inherits from BaseChatModel for full LangChain compatibility.
     """
     
@@ -40,8 +55,9 @@ class GeminiFallbackLLM(BaseChatModel):
     temperature: float = 0.1
     max_output_tokens: int = 2000
     api_key: str = ""
-    current_model: str = ""
-    _llm: Any = None
+    current_model: str = ""  # Model that answered the last call
+    _llms: Any = None
+    _llms_lock: Any = None
     
     class Config:
         arbitrary_types_allowed = True
@@ -54,7 +70,9 @@ class GeminiFallbackLLM(BaseChatModel):
         self.max_output_tokens = max_output_tokens
         self.api_key = api_key
         self.current_model = primary_model
-        self._create_llm(primary_model)
+        self._llms = {}
+        self._llms_lock = threading.Lock()
+        self._get_llm(primary_model)
     
     @property
     def _llm_type(self) -> str:
@@ -68,23 +86,22 @@ class GeminiFallbackLLM(BaseChatModel):
             "temperature": self.temperature,
         }
     
-    def _create_llm(self, model: str):
-        """Create a new LLM instance with the specified model."""
-        self._llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=self.temperature,
-            max_output_tokens=self.max_output_tokens,
-            google_api_key=self.api_key
-        )
-        self.current_model = model
+    def _get_llm(self, model: str):
+        """LLM instance of a model, created once and shared by all threads."""
+        with self._llms_lock:
+            if model not in self._llms:
+                self._llms[model] = ChatGoogleGenerativeAI(
+                    model=model,
+                    temperature=self.temperature,
+                    max_output_tokens=self.max_output_tokens,
+                    google_api_key=self.api_key
+                )
+            return self._llms[model]
     
-    def _get_fallback_models(self) -> List[str]:
-        """Get list of fallback models to try (excluding current model)."""
-        models = []
-        for m in GEMINI_FALLBACK_MODELS:
-            if m != self.current_model and m not in models:
-                models.append(m)
-        return models
+    def _models_to_try(self) -> List[str]:
+        """Primary and fallback models, healthiest first."""
+        models = [self.primary_model] + [m for m in GEMINI_FALLBACK_MODELS if m != self.primary_model]
+        return [key.split(":", 1)[1] for key in get_model_health().candidates([f"google:{m}" for m in models])]
     
     def _generate(
         self,
@@ -100,60 +117,107 @@ class GeminiFallbackLLM(BaseChatModel):
         except:
             has_streamlit = False
         
-        def should_fallback(error_str: str) -> bool:
-            """Check if error warrants trying a fallback model."""
-            error_lower = error_str.lower()
-            return (
-                "429" in error_str or 
-                "404" in error_str or
-                "quota" in error_lower or 
-                "rate" in error_lower or
-                "not found" in error_lower or
-                "not supported" in error_lower
-            )
-        
-        # Try primary model first
-        try:
-            return self._llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
-        except Exception as e:
-            error_str = str(e)
-            # Check if it's a rate limit error (429), quota exceeded, or model not found (404)
-            if should_fallback(error_str):
+        health = get_model_health()
+        last_error = None
+        for model in self._models_to_try():
+            if not health.acquire(f"google:{model}"):
+                continue  # Another caller is probing it
+            if model != self.primary_model and has_streamlit:
+                st.info(f"🔄 Trying fallback model: {model}")
+            
+            started = time.perf_counter()
+            try:
+                result = self._get_llm(model)._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                error_str = str(e)
+                kind = _gemini_failure_kind(error_str)
+                health.record_failure(f"google:{model}", kind or ERROR, error=error_str)
+                if kind is None:
+                    raise
+                last_error = error_str
                 if has_streamlit:
-                    st.warning(f"⚠️ Error with {self.current_model}, trying fallback models...")
-                
-                # Try fallback models
-                for fallback_model in self._get_fallback_models():
-                    try:
-                        if has_streamlit:
-                            st.info(f"🔄 Trying fallback model: {fallback_model}")
-                        self._create_llm(fallback_model)
-                        result = self._llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
-                        if has_streamlit:
-                            st.success(f"✅ Successfully used fallback model: {fallback_model}")
-                        return result
-                    except Exception as fallback_error:
-                        fallback_error_str = str(fallback_error)
-                        if should_fallback(fallback_error_str):
-                            if has_streamlit:
-                                st.warning(f"⚠️ {fallback_model} also failed, trying next...")
-                            continue
-                        else:
-                            raise fallback_error
-                
-                raise Exception(f"All Gemini models exhausted. Original error: {error_str}")
+                    st.warning(f"⚠️ Error with {model}, trying fallback models...")
+                continue
             else:
-                raise e
+                health.record_success(f"google:{model}", time.perf_counter() - started)
+            finally:
+                health.release(f"google:{model}")
+            
+            self.current_model = model
+            if model != self.primary_model and has_streamlit:
+                st.success(f"✅ Successfully used fallback model: {model}")
+            return result
+        
+        raise Exception(f"All Gemini models exhausted. Last error: {last_error}")
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        Stream the response, falling back like _generate until the first chunk arrives.
+        Errors after the first chunk are raised (the streamed text cannot be taken back).
+        """
+        health = get_model_health()
+        last_error = None
+        for model in self._models_to_try():
+            if not health.acquire(f"google:{model}"):
+                continue
+            started = time.perf_counter()
+            emitted = False
+            try:
+                # The caller reports tokens to run_manager; passing it on would report them twice
+                for chunk in self._get_llm(model)._stream(messages, stop=stop, **kwargs):
+                    emitted = True
+                    yield chunk
+            except Exception as e:
+                error_str = str(e)
+                kind = _gemini_failure_kind(error_str)
+                health.record_failure(f"google:{model}", kind or ERROR, error=error_str)
+                if kind is None or emitted:
+                    raise
+                last_error = error_str
+                continue
+            else:
+                health.record_success(f"google:{model}", time.perf_counter() - started)
+            finally:
+                health.release(f"google:{model}")
+            
+            self.current_model = model
+            return
+        
+        raise Exception(f"All Gemini models exhausted. Last error: {last_error}")
+
 
+def _gemini_failure_kind(error_str: str) -> Optional[str]:
+    """Check if error warrants trying a fallback model, and what it says about the model."""
+    error_lower = error_str.lower()
+    if "404" in error_str or "not found" in error_lower or "not supported" in error_lower:
+        return UNAVAILABLE
+    if "429" in error_str or "quota" in error_lower or "rate" in error_lower:
+        return RATE_LIMIT
+    return None
 
-def get_llm(temperature: Optional[float] = None, model: Optional[str] = None, use_fallback: bool = True):
+
+def get_llm(temperature: Optional[float] = None, model: Optional[str] = None, use_fallback: bool = True,
+            use_cache: bool = True):
     """
-    Get LLM instance based on configuration
+    Get the shared LLM instance for the configuration
+    
+    Instances are built once per provider, model, temperature and credentials
+    and then shared by every agent, so rebuilding agents (e.g. after a data
+    upload) constructs no new clients. A key entered at runtime is part of the
+    registry key, so it takes effect on the next call.
     
     Args:
         temperature: Model temperature (0.0 to 1.0)
         model: Model name (optional override)
         use_fallback: Whether to use fallback mechanism for Gemini (default: True)
+        use_cache: Answer repeated prompts from the persistent response cache
+                   (only at temperatures up to LLM_CACHE_MAX_TEMPERATURE)
         
     Returns:
         LLM instance
@@ -162,33 +226,58 @@ def get_llm(temperature: Optional[float] = None, model: Optional[str] = None, us
     
     # Get provider dynamically (supports Streamlit secrets)
     provider = get_secret("LLM_PROVIDER", settings.llm_provider)
+    connection = _resolve_connection(provider, model)
+    credentials = hashlib.sha256(f"{connection['api_key']}|{connection['base_url']}".encode()).hexdigest()
+    key = (provider, connection["model"], temp, use_fallback, use_cache, credentials)
     
-    if provider == "openai":
-        from openai import OpenAI
-        
-        model_name = model or get_secret("OPENAI_MODEL", settings.openai_model)
-        base_url = get_secret("OPENAI_BASE_URL", settings.openai_base_url)
-        api_key = get_secret("OPENAI_API_KEY", settings.openai_api_key)
+    with _registry_lock:
+        llm = _llm_registry.get(key)
+        if llm is None:
+            llm = _create_llm(provider, connection, temp, use_fallback)
+            if use_cache:
+                llm = with_response_cache(llm, provider, connection["model"], temp, settings.max_tokens)
+            _llm_registry[key] = llm
+        return llm
+
+
+def get_chain(name: str, llm: Any, build: Callable[[Any], Any]) -> Any:
+    """
+    Get a compiled chain (prompt | llm | parser) shared across agent instances
+    
+    Args:
+        name: Chain name
+        llm: LLM the chain runs on (from get_llm)
+        build: Function building the chain around that LLM, called once per LLM
         
-        # For OpenRouter, use custom wrapper that properly sets headers
-        if base_url and 'openrouter' in base_url:
-            from utils.openrouter_llm import OpenRouterLLM
-            
-            return OpenRouterLLM(
-                model=model_name,
-                temperature=temp,
-                max_tokens=settings.max_tokens,
-                api_key=api_key,
-                base_url=base_url
-            )
-        else:
-            return ChatOpenAI(
-                model=model_name,
-                temperature=temp,
-                max_tokens=settings.max_tokens,
-                api_key=api_key,
-                base_url=base_url if base_url else None
-            )
+    Returns:
+        The compiled runnable
+    """
+    key = (name, id(llm))
+    with _registry_lock:
+        entry = _chain_registry.get(key)
+        # The LLM registry keeps every llm alive, so an id is never reused; the
+        # identity check covers LLMs created outside it
+        if entry is None or entry[0] is not llm:
+            entry = (llm, build(llm))
+            _chain_registry[key] = entry
+        return entry[1]
+
+
+def clear_llm_registry():
+    """Drop the shared LLM instances and compiled chains"""
+    with _registry_lock:
+        _llm_registry.clear()
+        _chain_registry.clear()
+
+
+def _resolve_connection(provider: str, model: Optional[str]) -> Dict[str, Optional[str]]:
+    """Model name, API key and base URL of the provider from settings and secrets"""
+    if provider == "openai":
+        return {
+            "model": model or get_secret("OPENAI_MODEL", settings.openai_model),
+            "api_key": get_secret("OPENAI_API_KEY", settings.openai_api_key),
+            "base_url": get_secret("OPENAI_BASE_URL", settings.openai_base_url),
+        }
     elif provider == "google":
         if not GEMINI_AVAILABLE:
             raise ImportError(
@@ -196,13 +285,39 @@ def get_llm(temperature: Optional[float] = None, model: Optional[str] = None, us
             )
         # Get API key dynamically from Streamlit secrets or environment
         api_key = get_secret("GOOGLE_API_KEY")
-        model_name = model or get_secret("GEMINI_MODEL", settings.gemini_model)
         
         if not api_key:
             raise ValueError(
                 "Google API key not found. Set GOOGLE_API_KEY in environment or Streamlit secrets."
             )
+        return {
+            "model": model or get_secret("GEMINI_MODEL", settings.gemini_model),
+            "api_key": api_key,
+            "base_url": None,
+        }
+    elif provider == "groq":
+        api_key = get_secret("GROQ_API_KEY", settings.groq_api_key)
         
+        if not api_key:
+            raise ValueError(
+                "Groq API key not found. Set GROQ_API_KEY in environment or Streamlit secrets."
+            )
+        return {
+            "model": model or get_secret("GROQ_MODEL", settings.groq_model),
+            "api_key": api_key,
+            "base_url": "https://api.groq.com/openai/v1",
+        }
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+
+
+def _create_llm(provider: str, connection: Dict[str, Optional[str]], temp: float, use_fallback: bool):
+    """Create the provider's chat model"""
+    model_name = connection["model"]
+    api_key = connection["api_key"]
+    base_url = connection["base_url"]
+    
+    if provider == "google":
         # Use fallback wrapper for automatic model switching on rate limits
         if use_fallback:
             return GeminiFallbackLLM(
@@ -211,31 +326,33 @@ def get_llm(temperature: Optional[float] = None, model: Optional[str] = None, us
                 max_output_tokens=settings.max_tokens,
                 api_key=api_key
             )
-        else:
-            return ChatGoogleGenerativeAI(
-                model=model_name,
-                temperature=temp,
-                max_output_tokens=settings.max_tokens,
-                google_api_key=api_key
-            )
-    elif provider == "groq":
-        model_name = model or get_secret("GROQ_MODEL", settings.groq_model)
-        api_key = get_secret("GROQ_API_KEY", settings.groq_api_key)
+        return ChatGoogleGenerativeAI(
+            model=model_name,
+            temperature=temp,
+            max_output_tokens=settings.max_tokens,
+            google_api_key=api_key
+        )
+    
+    # For OpenRouter, use custom wrapper that properly sets headers
+    if provider == "openai" and base_url and 'openrouter' in base_url:
+        from utils.openrouter_llm import OpenRouterLLM
         
-        if not api_key:
-            raise ValueError(
-                "Groq API key not found. Set GROQ_API_KEY in environment or Streamlit secrets."
-            )
-            
-        return ChatOpenAI(
+        return OpenRouterLLM(
             model=model_name,
             temperature=temp,
             max_tokens=settings.max_tokens,
             api_key=api_key,
-            base_url="https://api.groq.com/openai/v1"
+            base_url=base_url
         )
-    else:
-        raise ValueError(f"Unsupported LLM provider: {provider}")
+    
+    # OpenAI and Groq (OpenAI-compatible endpoint)
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temp,
+        max_tokens=settings.max_tokens,
+        api_key=api_key,
+        base_url=base_url if base_url else None
+    )
 
 
 def create_prompt_template(role: str, instructions: str) -> str:
@@ -0,0 +1,267 @@
+"""
+Health of the LLM models behind the fallback chains
+Thread-safe registry of per-model outcomes (rolling error rate, latency EWMA)
+with a circuit breaker per model: rate-limited or failing models are skipped
+for a cooldown, then re-admitted through a single half-open probe call
+"""
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Failure kinds: a 429/quota error opens the breaker at once; a missing or
+# unsupported model opens it for the maximum cooldown; other errors count
+# toward the error rate
+RATE_LIMIT = "rate_limit"
+UNAVAILABLE = "unavailable"
+ERROR = "error"
+
+
+@dataclass
+class _ModelHealth:
+    """Breaker state and recent outcomes of one model"""
+    state: str = CLOSED
+    outcomes: Deque[Tuple[float, bool]] = field(default_factory=lambda: deque(maxlen=200))
+    consecutive_failures: int = 0
+    opens: int = 0  # Consecutive times opened without a success; doubles the cooldown
+    open_until: float = 0.0
+    probe_claimed_at: Optional[float] = None
+    latency_ewma: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    last_error: str = ""
+
+
+class ModelHealthRegistry:
+    """
+    Per-model circuit breakers and routing order for fallback chains
+    """
+
+    def __init__(self, cooldown_seconds: float = 30.0, max_cooldown_seconds: float = 600.0,
+                 window_seconds: float = 300.0, error_rate_threshold: float = 0.5,
+                 min_calls: int = 4, consecutive_failures: int = 3, latency_alpha: float = 0.3,
+                 slow_factor: float = 3.0, probe_timeout: float = 60.0):
+        """
+        Initialize registry
+
+        Args:
+            cooldown_seconds: First cooldown of an opened breaker (doubles per re-open)
+            max_cooldown_seconds: Longest cooldown
+            window_seconds: Age of the outcomes the error rate is computed over
+            error_rate_threshold: Error rate in the window that opens the breaker
+            min_calls: Calls in the window before the error rate counts
+            consecutive_failures: Failures in a row that open the breaker
+            latency_alpha: Weight of the newest call in the latency EWMA
+            slow_factor: Models slower than this multiple of the fastest healthy
+                         model are tried after the others
+            probe_timeout: Seconds after which an unreported half-open probe can be reclaimed
+        """
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.window_seconds = window_seconds
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.consecutive_failures = consecutive_failures
+        self.latency_alpha = latency_alpha
+        self.slow_factor = slow_factor
+        self.probe_timeout = probe_timeout
+        self._models: Dict[str, _ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, models: Sequence[str]) -> List[str]:
+        """
+        Models to try for one call, healthiest first
+
+        Closed models keep their configured order, except that degraded (high
+        error rate) and slow models move behind the others. A model whose
+        cooldown has passed is listed in its configured position while no probe
+        of it is in flight; the caller claims the probe with acquire() when it
+        actually sends the request. Open models are left out. When every model
+        is open, all are returned by how soon their cooldown ends, so a call is
+        never refused outright.
+
+        Args:
+            models: Model names in order of preference
+
+        Returns:
+            Models in the order to try them
+        """
+        now = time.time()
+        with self._lock:
+            known = [self._models[m] for m in models if m in self._models]
+            latencies = [h.latency_ewma for h in known
+                         if h.state == CLOSED and h.latency_ewma is not None]
+            fastest = min(latencies) if latencies else None
+
+            ranked = []
+            for priority, model in enumerate(models):
+                health = self._models.setdefault(model, _ModelHealth())
+                if health.state == OPEN and now >= health.open_until:
+                    health.state = HALF_OPEN
+                    health.probe_claimed_at = None
+                if health.state == OPEN:
+                    continue
+                if health.state == HALF_OPEN:
+                    if self._probe_in_flight(health, now):
+                        continue
+                    ranked.append((0, priority, model))
+                    continue
+
+                degraded = (self._windowed_calls(health, now) >= self.min_calls
+                            and self._error_rate(health, now) >= self.error_rate_threshold / 2)
+                slow = (fastest is not None and health.latency_ewma is not None
+                        and health.latency_ewma > fastest * self.slow_factor)
+                ranked.append((1 if degraded or slow else 0, priority, model))
+
+            if not ranked:
+                return sorted(models, key=lambda m: self._models[m].open_until)
+            return [model for _, _, model in sorted(ranked)]
+
+    def acquire(self, model: str) -> bool:
+        """
+        Claim a model for a request about to be sent
+
+        A half-open model admits one probe at a time: the claim is held until
+        record_success(), record_failure() or release().
+
+        Returns:
+            False if another caller's probe of the model is in flight
+        """
+        now = time.time()
+        with self._lock:
+            health = self._models.setdefault(model, _ModelHealth())
+            if health.state == OPEN and now >= health.open_until:
+                health.state = HALF_OPEN
+                health.probe_claimed_at = None
+            if health.state != HALF_OPEN:
+                return True
+            if self._probe_in_flight(health, now):
+                return False
+            health.probe_claimed_at = now
+            return True
+
+    def release(self, model: str):
+        """Give up a probe claim whose request ended without a verdict on the model"""
+        with self._lock:
+            health = self._models.get(model)
+            if health is not None and health.state == HALF_OPEN:
+                health.probe_claimed_at = None
+
+    def record_success(self, model: str, latency_s: float):
+        """Close the model's breaker and fold the call's latency into its EWMA"""
+        with self._lock:
+            health = self._models.setdefault(model, _ModelHealth())
+            if health.state != CLOSED:
+                logger.info(f"✅ Model {model} recovered; circuit closed")
+            health.state = CLOSED
+            health.probe_claimed_at = None
+            health.opens = 0
+            health.consecutive_failures = 0
+            health.successes += 1
+            health.outcomes.append((time.time(), True))
+            health.latency_ewma = latency_s if health.latency_ewma is None else (
+                self.latency_alpha * latency_s + (1 - self.latency_alpha) * health.latency_ewma
+            )
+
+    def record_failure(self, model: str, kind: str = ERROR, retry_after: Optional[float] = None,
+                       error: str = ""):
+        """
+        Count a failed call and open the breaker when warranted
+
+        Args:
+            model: Model name
+            kind: RATE_LIMIT, UNAVAILABLE or ERROR
+            retry_after: Seconds the provider asked to wait (overrides the cooldown)
+            error: Error message kept for get_stats()
+        """
+        now = time.time()
+        with self._lock:
+            health = self._models.setdefault(model, _ModelHealth())
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.outcomes.append((now, False))
+            health.last_error = error[:200]
+
+            if kind == UNAVAILABLE:
+                self._open(model, health, now, self.max_cooldown_seconds)
+            elif kind == RATE_LIMIT or health.state == HALF_OPEN:
+                self._open(model, health, now, retry_after)
+            elif (health.consecutive_failures >= self.consecutive_failures
+                  or (self._windowed_calls(health, now) >= self.min_calls
+                      and self._error_rate(health, now) >= self.error_rate_threshold)):
+                self._open(model, health, now, retry_after)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state, error rate and latency of every model seen so far"""
+        now = time.time()
+        with self._lock:
+            return {
+                model: {
+                    # An open breaker past its cooldown admits a probe on the next call
+                    "state": HALF_OPEN if h.state == OPEN and now >= h.open_until else h.state,
+                    "error_rate": self._error_rate(h, now),
+                    "latency_ewma_s": h.latency_ewma,
+                    "successes": h.successes,
+                    "failures": h.failures,
+                    "reopens_in_s": max(h.open_until - now, 0.0) if h.state == OPEN else 0.0,
+                    "last_error": h.last_error,
+                }
+                for model, h in self._models.items()
+            }
+
+    def reset(self):
+        """Forget every model's history"""
+        with self._lock:
+            self._models.clear()
+
+    def _open(self, model: str, health: _ModelHealth, now: float, retry_after: Optional[float]):
+        """Open the breaker for the (backed-off) cooldown (caller holds the lock)"""
+        health.opens += 1
+        cooldown = min(self.cooldown_seconds * 2 ** (health.opens - 1), self.max_cooldown_seconds)
+        if retry_after is not None:
+            cooldown = min(max(retry_after, 0.0), self.max_cooldown_seconds)
+        health.state = OPEN
+        health.open_until = now + cooldown
+        health.probe_claimed_at = None
+        logger.warning(f"⚠️  Model {model} circuit open for {cooldown:.0f}s ({health.last_error or 'failures'})")
+
+    def _probe_in_flight(self, health: _ModelHealth, now: float) -> bool:
+        claimed = health.probe_claimed_at
+        return claimed is not None and now - claimed < self.probe_timeout
+
+    def _windowed(self, health: _ModelHealth, now: float) -> List[bool]:
+        return [ok for t, ok in health.outcomes if now - t <= self.window_seconds]
+
+    def _windowed_calls(self, health: _ModelHealth, now: float) -> int:
+        return len(self._windowed(health, now))
+
+    def _error_rate(self, health: _ModelHealth, now: float) -> float:
+        recent = self._windowed(health, now)
+        return recent.count(False) / len(recent) if recent else 0.0
+
+
+_registry: Optional[ModelHealthRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_health() -> ModelHealthRegistry:
+    """Process-wide registry shared by every fallback chain (configured in settings)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from config import settings
+            _registry = ModelHealthRegistry(
+                cooldown_seconds=settings.model_cooldown_seconds,
+                max_cooldown_seconds=settings.model_max_cooldown_seconds,
+                window_seconds=settings.model_health_window_seconds,
+                error_rate_threshold=settings.model_error_rate_threshold,
+            )
+        return _registry
@@ -1,11 +1,23 @@
 """
 Custom LangChain-compatible wrapper for OpenRouter API
 """
-from typing import Any, List, Optional
+import asyncio
+import json
+import threading
+import time
+import weakref
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
-from langchain_core.outputs import ChatResult, ChatGeneration
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatResult, ChatGeneration, ChatGenerationChunk
+
+from config import settings
+from utils.model_health import ERROR, RATE_LIMIT, UNAVAILABLE, get_model_health
 
 
 # Free models to try in order of preference
@@ -17,11 +29,93 @@ OPENROUTER_FALLBACK_MODELS = [
     "openchat/openchat-7b:free",
 ]
 
+# Gateway errors are retried on the same model; 429s move on to the next model
+RETRY_STATUSES = (502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Process-wide keep-alive session for OpenRouter requests
+
+    Connections are pooled per host (LLM_HTTP_POOL_SIZE), so repeated calls and
+    model fallbacks reuse an open TCP+TLS connection. Failed connects and
+    gateway errors are retried LLM_HTTP_RETRIES times with backoff.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=settings.llm_http_retries,
+                backoff_factor=0.3,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=None,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.llm_http_pool_size,
+                                  max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Pooled async client of the running event loop
+
+    httpx clients are bound to the loop that opened their connections, so each
+    loop gets its own (dropped with the loop). Failed connects are retried;
+    httpx does not retry on status codes.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(retries=settings.llm_http_retries),
+            limits=httpx.Limits(max_connections=settings.llm_http_pool_size,
+                                max_keepalive_connections=settings.llm_http_pool_size),
+            timeout=settings.llm_http_timeout,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _retry_after(response: Any) -> Optional[float]:
+    """Seconds from a Retry-After header (None when absent or an HTTP date)"""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _sse_deltas(lines: Iterable[str]) -> Iterator[str]:
+    """Text deltas of a streamed chat completion (server-sent event lines)"""
+    for line in lines:
+        # Blank lines separate events; ':' lines are keep-alive comments
+        if not line or line.startswith(":") or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        event = json.loads(data)
+        if "error" in event:
+            raise Exception(f"OpenRouter stream error: {event['error']}")
+        choices = event.get("choices") or []
+        content = (choices[0].get("delta") or {}).get("content") if choices else None
+        if content:
+            yield content
+
 
 class OpenRouterLLM(BaseChatModel):
     """
     Custom ChatModel wrapper for OpenRouter API using direct HTTP requests
-    with automatic fallback to other free models on rate limits
+    with automatic fallback to other free models on rate limits; models are
+    tried healthiest first, skipping those in a rate-limit cooldown
     """
     
     def __init__(self, **kwargs):
@@ -34,8 +128,8 @@ class OpenRouterLLM(BaseChatModel):
         self._api_key = kwargs.get('api_key')
         self._base_url = kwargs.get('base_url', 'https://openrouter.ai/api/v1')
     
-    def _make_request(self, model: str, openai_messages: List[dict], stop: Optional[List[str]] = None) -> requests.Response:
-        """Make a single API request"""
+    def _request_args(self, model: str, openai_messages: List[dict], stop: Optional[List[str]] = None) -> dict:
+        """URL, headers and JSON body of a chat completion request"""
         payload = {
             "model": model,
             "messages": openai_messages,
@@ -45,27 +139,30 @@ class OpenRouterLLM(BaseChatModel):
         if stop:
             payload["stop"] = stop
         
-        return requests.post(
-            f"{self._base_url}/chat/completions",
-            headers={
+        return {
+            "url": f"{self._base_url}/chat/completions",
+            "headers": {
                 "Authorization": f"Bearer {self._api_key}",
                 "HTTP-Referer": "https://retail-insights.streamlit.app",
                 "X-Title": "Retail Insights Assistant",
                 "Content-Type": "application/json"
             },
-            json=payload,
-            timeout=60
-        )
+            "json": payload,
+        }
     
-    def _generate(
-        self,
-        messages: List[BaseMessage],
-        stop: Optional[List[str]] = None,
-        **kwargs: Any,
-    ) -> ChatResult:
-        """Generate chat completion with automatic fallback on rate limits"""
-        
-        # Convert LangChain messages to OpenAI format
+    def _make_request(self, model: str, openai_messages: List[dict], stop: Optional[List[str]] = None) -> requests.Response:
+        """Make a single API request on the pooled session"""
+        return get_http_session().post(**self._request_args(model, openai_messages, stop),
+                                       timeout=settings.llm_http_timeout)
+    
+    async def _amake_request(self, model: str, openai_messages: List[dict],
+                             stop: Optional[List[str]] = None) -> httpx.Response:
+        """Make a single API request on the loop's pooled async client"""
+        return await get_async_http_client().post(**self._request_args(model, openai_messages, stop))
+    
+    @staticmethod
+    def _to_openai_messages(messages: List[BaseMessage]) -> List[dict]:
+        """Convert LangChain messages to OpenAI format"""
         openai_messages = []
         for msg in messages:
             if isinstance(msg, HumanMessage):
@@ -81,51 +178,174 @@ class OpenRouterLLM(BaseChatModel):
                 "role": role,
                 "content": msg.content
             })
+        return openai_messages
+    
+    def _models_to_try(self) -> List[str]:
+        """Primary model and the fallbacks, healthiest first (see utils.model_health)"""
+        models = [self._model_name] + [m for m in OPENROUTER_FALLBACK_MODELS if m != self._model_name]
+        return [key.split(":", 1)[1] for key in get_model_health().candidates([f"openrouter:{m}" for m in models])]
+    
+    @staticmethod
+    def _acquire(model: str) -> bool:
+        """Claim the model right before sending; False while another caller probes it"""
+        return get_model_health().acquire(f"openrouter:{model}")
+    
+    @staticmethod
+    def _release(model: str):
+        """Free a probe claim the outcome did not settle (no-op once it was recorded)"""
+        get_model_health().release(f"openrouter:{model}")
+    
+    @staticmethod
+    def _record_failure(model: str, kind: str, error: str, retry_after: Optional[float] = None):
+        get_model_health().record_failure(f"openrouter:{model}", kind, retry_after=retry_after, error=error)
+    
+    def _handle_response(self, model: str, response: Any,
+                         latency_s: float) -> Tuple[Optional[ChatResult], Optional[str]]:
+        """
+        Turn a requests/httpx response into a result or the error to remember,
+        and record the outcome in the model health registry
+        
+        Returns:
+            (ChatResult, None) on success, (None, error message) to try the next model
+        """
+        if response.status_code == 200:
+            result = response.json()
+            content = result['choices'][0]['message']['content']
+            message = AIMessage(content=content)
+            generation = ChatGeneration(message=message)
+            get_model_health().record_success(f"openrouter:{model}", latency_s)
+            
+            if model != self._model_name:
+                # Log that we used a fallback
+                try:
+                    import streamlit as st
+                    st.info(f"✅ Used fallback model: {model}")
+                except:
+                    pass
+            
+            return ChatResult(generations=[generation]), None
         
-        # Try primary model first
-        models_to_try = [self._model_name] + [m for m in OPENROUTER_FALLBACK_MODELS if m != self._model_name]
+        elif response.status_code == 429:
+            # Rate limited, try next model
+            self._record_failure(model, RATE_LIMIT, f"Rate limited on {model}",
+                                 retry_after=_retry_after(response))
+            try:
+                import streamlit as st
+                st.warning(f"⚠️ {model} rate limited, trying next...")
+            except:
+                pass
+            return None, f"Rate limited on {model}"
+        else:
+            error = f"OpenRouter API error: {response.status_code} - {response.text}"
+            # Other 4xx errors are about the request, not the model's health
+            if response.status_code == 404:
+                self._record_failure(model, UNAVAILABLE, error)
+            elif response.status_code >= 500 or response.status_code == 408:
+                self._record_failure(model, ERROR, error)
+            return None, error
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Generate chat completion with automatic fallback on rate limits"""
+        openai_messages = self._to_openai_messages(messages)
         last_error = None
         
-        for model in models_to_try:
+        for model in self._models_to_try():
+            if not self._acquire(model):
+                continue
+            started = time.perf_counter()
             try:
                 response = self._make_request(model, openai_messages, stop)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result['choices'][0]['message']['content']
-                    message = AIMessage(content=content)
-                    generation = ChatGeneration(message=message)
-                    
-                    if model != self._model_name:
-                        # Log that we used a fallback
-                        try:
-                            import streamlit as st
-                            st.info(f"✅ Used fallback model: {model}")
-                        except:
-                            pass
-                    
-                    return ChatResult(generations=[generation])
-                
-                elif response.status_code == 429:
-                    # Rate limited, try next model
-                    last_error = f"Rate limited on {model}"
-                    try:
-                        import streamlit as st
-                        st.warning(f"⚠️ {model} rate limited, trying next...")
-                    except:
-                        pass
-                    continue
-                else:
-                    last_error = f"OpenRouter API error: {response.status_code} - {response.text}"
-                    continue
-                    
+                result, last_error = self._handle_response(model, response, time.perf_counter() - started)
+                if result is not None:
+                    return result
             except Exception as e:
                 last_error = str(e)
+                self._record_failure(model, ERROR, last_error)
                 continue
+            finally:
+                self._release(model)
         
         # All models failed
         raise Exception(f"All models failed. Last error: {last_error}")
     
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Async chat completion on a pooled httpx client, with the same fallback order"""
+        openai_messages = self._to_openai_messages(messages)
+        last_error = None
+        
+        for model in self._models_to_try():
+            if not self._acquire(model):
+                continue
+            started = time.perf_counter()
+            try:
+                response = await self._amake_request(model, openai_messages, stop)
+                result, last_error = self._handle_response(model, response, time.perf_counter() - started)
+                if result is not None:
+                    return result
+            except Exception as e:
+                last_error = str(e)
+                self._record_failure(model, ERROR, last_error)
+                continue
+            finally:
+                self._release(model)
+        
+        raise Exception(f"All models failed. Last error: {last_error}")
+    
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        Stream the completion token by token
+        
+        Models are tried in the same order as _generate until one starts
+        answering; an error after the first token is raised, since the text
+        already shown cannot be taken back.
+        """
+        openai_messages = self._to_openai_messages(messages)
+        last_error = None
+        
+        for model in self._models_to_try():
+            if not self._acquire(model):
+                continue
+            request = self._request_args(model, openai_messages, stop)
+            request["json"]["stream"] = True
+            started = time.perf_counter()
+            emitted = False
+            try:
+                with get_http_session().post(**request, timeout=settings.llm_http_timeout, stream=True) as response:
+                    if response.status_code != 200:
+                        _, last_error = self._handle_response(model, response, time.perf_counter() - started)
+                        continue
+                    response.encoding = "utf-8"
+                    for delta in _sse_deltas(response.iter_lines(decode_unicode=True)):
+                        emitted = True
+                        yield ChatGenerationChunk(message=AIMessageChunk(content=delta))
+                get_model_health().record_success(f"openrouter:{model}", time.perf_counter() - started)
+                return
+            except Exception as e:
+                last_error = str(e)
+                self._record_failure(model, ERROR, last_error)
+                if emitted:
+                    raise
+                continue
+            finally:
+                self._release(model)
+        
+        raise Exception(f"All models failed. Last error: {last_error}")
+    
     @property
     def _llm_type(self) -> str:
         """Return type of LLM"""
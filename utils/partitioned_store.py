@@ -0,0 +1,199 @@
+"""
+Hive-partitioned Parquet storage for processed sales data
+Writes year=/month= partition directories with sorted row groups so DuckDB
+can skip files and row groups that a query's filters rule out
+"""
+import logging
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+# Directory levels of the dataset (year=2022/month=3/...)
+PARTITION_COLUMNS = ("year", "month")
+
+# Row order inside each partition; row-group min/max stats then prune on these too
+SORT_COLUMNS = ("state", "category", "date")
+
+DEFAULT_ROW_GROUP_SIZE = 122880
+
+# Directory name DuckDB gives a NULL partition value
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def write_partitioned(data: Any, root: str,
+                      partition_cols: Sequence[str] = PARTITION_COLUMNS,
+                      sort_cols: Sequence[str] = SORT_COLUMNS,
+                      row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                      compression: str = "snappy") -> str:
+    """
+    Write processed data as a hive-partitioned Parquet dataset
+
+    Args:
+        data: pandas DataFrame, pyarrow.Table or pyarrow dataset (scanned lazily)
+        root: Dataset directory (replaced if it exists)
+        partition_cols: Columns that become year=/month= directories
+        sort_cols: Columns each partition is sorted by before writing
+        row_group_size: Rows per Parquet row group
+        compression: Parquet compression codec
+
+    Returns:
+        The dataset directory
+    """
+    partition_by, order_by = _layout(data, partition_cols, sort_cols)
+
+    root_path = Path(root)
+    if root_path.exists():
+        shutil.rmtree(root_path)
+    root_path.parent.mkdir(parents=True, exist_ok=True)
+    _copy_partitioned(data, root_path, partition_by, order_by, row_group_size, compression)
+
+    files = sum(1 for _ in root_path.rglob("*.parquet"))
+    logger.info(f"   💾 Saved partitioned Parquet: {root} ({files} files by {', '.join(partition_by)})")
+    return str(root_path)
+
+
+def rewrite_partitions(data: Any, root: str, partitions: Iterable[str], removed: Iterable[str] = (),
+                       partition_cols: Sequence[str] = PARTITION_COLUMNS,
+                       sort_cols: Sequence[str] = SORT_COLUMNS,
+                       row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                       compression: str = "snappy") -> List[str]:
+    """
+    Rewrite some partitions of an existing dataset and leave the others untouched
+
+    The partitions are written to a staging directory next to the dataset and
+    then swapped in one directory at a time.
+
+    Args:
+        data: pandas DataFrame or pyarrow.Table holding the rows of those partitions
+        root: Dataset directory
+        partitions: Partition paths to rewrite ('year=2022/month=4', as in partition_digests)
+        removed: Partition paths to delete
+        partition_cols: Columns that become year=/month= directories
+        sort_cols: Columns each partition is sorted by before writing
+        row_group_size: Rows per Parquet row group
+        compression: Parquet compression codec
+
+    Returns:
+        The partition paths written
+    """
+    root_path = Path(root)
+    for key in removed:
+        _remove_partition(root_path, key)
+
+    keys = sorted(set(partitions))
+    if not keys:
+        return []
+    partition_by, order_by = _layout(data, partition_cols, sort_cols)
+    staging = root_path.parent / f".{root_path.name}.staging"
+    if staging.exists():
+        shutil.rmtree(staging)
+    try:
+        quoted = ", ".join("'" + key.replace("'", "''") + "'" for key in keys)
+        _copy_partitioned(data, staging, partition_by, order_by, row_group_size, compression,
+                          where=f"{_partition_path_sql(partition_by)} IN ({quoted})")
+        written = []
+        for key in keys:
+            _remove_partition(root_path, key)
+            if (staging / key).is_dir():
+                (root_path / key).parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(staging / key), str(root_path / key))
+                written.append(key)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    logger.info(f"   💾 Rewrote {len(written)} partitions of {root}")
+    return written
+
+
+def partition_digests(data: Any, partition_cols: Sequence[str] = PARTITION_COLUMNS) -> Dict[str, str]:
+    """
+    Content digest of every partition the data would be written to
+
+    The digest is the row count plus the sum of row hashes, so it ignores row
+    order. ENUM (categorical) columns are hashed by value, so a vocabulary that
+    grew elsewhere does not change the digest.
+
+    Args:
+        data: pandas DataFrame or pyarrow.Table
+        partition_cols: Columns that become year=/month= directories
+
+    Returns:
+        Dict of partition path ('year=2022/month=4') to digest
+    """
+    partition_by, _ = _layout(data, partition_cols, ())
+    conn = duckdb.connect(":memory:")
+    try:
+        conn.register("_processed", data)
+        enums = [row[0] for row in conn.execute("DESCRIBE _processed").fetchall() if row[1].startswith("ENUM")]
+        replace = ", ".join(f'CAST("{c}" AS VARCHAR) AS "{c}"' for c in enums)
+        rows = conn.execute(f"""
+            SELECT {_partition_path_sql(partition_by)} AS _partition, COUNT(*), SUM(hash(t)::HUGEINT)
+            FROM (SELECT *{f' REPLACE ({replace})' if replace else ''} FROM _processed) t
+            GROUP BY ALL
+        """).fetchall()
+    finally:
+        conn.close()
+    return {key: f"{count}:{digest}" for key, count, digest in rows}
+
+
+def _layout(data: Any, partition_cols: Sequence[str], sort_cols: Sequence[str]):
+    """Partition and sort columns present in the data"""
+    # Arrow tables and datasets have a schema (pa.Table.columns holds arrays, not names)
+    columns = data.schema.names if hasattr(data, "schema") else list(data.columns)
+    partition_by = [c for c in partition_cols if c in columns]
+    if not partition_by:
+        raise ValueError(f"Data has none of the partition columns {list(partition_cols)}")
+    return partition_by, partition_by + [c for c in sort_cols if c in columns]
+
+
+def _partition_path_sql(partition_by: Sequence[str]) -> str:
+    """SQL for the directory of a row's partition, named the way COPY ... PARTITION_BY names it"""
+    levels = [f"'{c}=' || COALESCE(CAST(\"{c}\" AS VARCHAR), '{NULL_PARTITION}')" for c in partition_by]
+    return " || '/' || ".join(levels)
+
+
+def _copy_partitioned(data: Any, root_path: Path, partition_by: Sequence[str], order_by: Sequence[str],
+                      row_group_size: int, compression: str, where: str = "TRUE"):
+    """COPY the (filtered) data into year=/month= directories under root_path"""
+    escaped = str(root_path).replace("'", "''")
+    conn = duckdb.connect(":memory:")
+    try:
+        conn.register("_processed", data)
+        conn.execute(f"""
+            COPY (SELECT * FROM _processed WHERE {where} ORDER BY {', '.join(order_by)})
+            TO '{escaped}' (
+                FORMAT PARQUET,
+                PARTITION_BY ({', '.join(partition_by)}),
+                WRITE_PARTITION_COLUMNS true,
+                ROW_GROUP_SIZE {row_group_size},
+                COMPRESSION '{compression}'
+            )
+        """)
+    finally:
+        conn.close()
+
+
+def _remove_partition(root_path: Path, key: str):
+    """Delete a partition directory and the parent levels it leaves empty"""
+    path = root_path / key
+    shutil.rmtree(path, ignore_errors=True)
+    for parent in path.parents:
+        if parent == root_path or not parent.is_dir() or any(parent.iterdir()):
+            break
+        parent.rmdir()
+
+
+def is_partitioned_dataset(path: str) -> bool:
+    """Check whether a path is a directory of hive-partitioned Parquet files"""
+    root = Path(path)
+    return root.is_dir() and any(root.rglob("*.parquet"))
+
+
+def dataset_scan(root: str) -> str:
+    """DuckDB table expression reading a partitioned dataset with hive partition pruning"""
+    pattern = (Path(root) / "**" / "*.parquet").as_posix().replace("'", "''")
+    return f"read_parquet('{pattern}', hive_partitioning=true)"
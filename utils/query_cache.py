@@ -0,0 +1,265 @@
+"""
+Query result cache for the DuckDB data layer
+LRU cache with a byte budget, keyed by canonicalized SQL plus the data version
+"""
+import re
+import threading
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# String literals, quoted identifiers, words/numbers, and single punctuation characters
+_TOKEN_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|[A-Za-z_][\w$]*|\d+(?:\.\d+)?|\S")
+
+# Literals and quoted identifiers (kept) or -- and /* */ comments (removed)
+_COMMENT_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?(?:\*/|$)", re.DOTALL)
+
+# Functions whose results change between identical calls must never be cached
+_VOLATILE_FUNCTIONS = {
+    "random", "uuid", "gen_random_uuid", "now", "current_date", "current_time",
+    "current_timestamp", "today", "setseed", "nextval"
+}
+
+# Clauses that draw a different random subset of rows on every run
+_VOLATILE_CLAUSES = {"sample", "tablesample"}
+
+# SQL keywords and type names; their casing never affects results
+_KEYWORDS = {
+    "select", "from", "where", "group", "order", "by", "having", "limit", "offset",
+    "join", "inner", "left", "right", "outer", "full", "cross", "on", "using", "and",
+    "or", "not", "in", "is", "null", "like", "ilike", "between", "exists", "any",
+    "case", "when", "then", "else", "end", "as", "union", "all", "with", "over",
+    "partition", "distinct", "asc", "desc", "nulls", "first", "last", "true", "false",
+    "cast", "interval", "filter", "qualify", "window", "rows", "range", "preceding",
+    "following", "unbounded", "current", "row", "try_cast",
+    # DuckDB type names and aliases
+    "varchar", "char", "bpchar", "text", "string", "integer", "int", "int1", "int2",
+    "int4", "int8", "int16", "int32", "int64", "int128", "tinyint", "smallint",
+    "bigint", "hugeint", "utinyint", "usmallint", "uinteger", "ubigint", "uhugeint",
+    "signed", "short", "long", "double", "float", "float4", "float8", "real",
+    "decimal", "numeric", "boolean", "bool", "logical", "date", "time", "timetz",
+    "timestamp", "timestamptz", "datetime", "timestamp_s", "timestamp_ms",
+    "timestamp_ns", "blob", "bytea", "binary", "varbinary", "bit", "bitstring",
+    "json", "enum", "list", "struct", "map"
+}
+
+
+def strip_sql_comments(query: str) -> str:
+    """Replace -- and /* */ comments with a space, leaving string literals intact"""
+    return _COMMENT_PATTERN.sub(lambda m: m.group(0) if m.group(0)[0] in "'\"" else " ", query)
+
+
+@dataclass
+class CanonicalQuery:
+    """A query reduced to a cache key plus the aliases it used"""
+    key: str
+    aliases: List[str] = field(default_factory=list)  # Original alias names, in placeholder order
+    cacheable: bool = True
+
+
+def canonicalize_sql(query: str, reserved: Optional[Iterable[str]] = None) -> CanonicalQuery:
+    """
+    Reduce a SQL query to a form that ignores whitespace, casing and alias names
+
+    Aliases are replaced by positional placeholders, so queries that differ only
+    in how they name their result columns share a key. Identifiers listed in
+    `reserved` (typically the table's column names) are never treated as aliases,
+    which keeps e.g. SUM(revenue) AS revenue distinct from SUM(amount) AS amount.
+
+    Args:
+        query: SQL query string
+        reserved: Identifiers that must keep their meaning (column/table names)
+
+    Returns:
+        CanonicalQuery with the cache key and the alias names it replaced
+    """
+    tokens = _TOKEN_PATTERN.findall(strip_sql_comments(query).strip().rstrip(";"))
+    reserved_lower = {r.lower() for r in (reserved or [])}
+
+    # Keywords and function names are case-insensitive. Other identifiers keep
+    # their casing because DuckDB names un-aliased expression columns after them.
+    normalized = []
+    for i, tok in enumerate(tokens):
+        lower = tok.lower()
+        next_tok = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if tok[0] not in ("'", '"') and (lower in _KEYWORDS or next_tok == "("):
+            normalized.append(lower)
+        else:
+            normalized.append(tok)
+
+    if not normalized or normalized[0] not in ("select", "with", "from"):
+        return CanonicalQuery(key="", cacheable=False)
+
+    if any(tok.lower() in _VOLATILE_FUNCTIONS or tok.lower() in _VOLATILE_CLAUSES for tok in normalized):
+        return CanonicalQuery(key="", cacheable=False)
+
+    # Collect aliases in order of definition. The AS inside CAST(x AS type)
+    # names a type, so parentheses opened by CAST/TRY_CAST are tracked.
+    placeholders: Dict[str, str] = {}
+    aliases: List[str] = []
+    in_cast: List[bool] = []
+    for i, tok in enumerate(normalized[:-1]):
+        if tok == "(":
+            in_cast.append(i > 0 and normalized[i - 1] in ("cast", "try_cast"))
+            continue
+        if tok == ")":
+            if in_cast:
+                in_cast.pop()
+            continue
+        if tok != "as" or (in_cast and in_cast[-1]):
+            continue
+        original = normalized[i + 1]
+        if original[0] == '"':
+            original = original[1:-1]
+        candidate = original.lower()
+        if (not re.match(r"^[a-z_][\w$]*$", candidate)
+                or candidate in _KEYWORDS
+                or candidate in reserved_lower
+                or candidate in placeholders):
+            continue
+        placeholders[candidate] = f"_a{len(placeholders) + 1}"
+        aliases.append(original)
+
+    # Rewrite every bare use of an alias (not a function call) to its placeholder
+    rewritten = []
+    for i, tok in enumerate(normalized):
+        bare = (tok[1:-1] if tok[0] == '"' else tok).lower()
+        next_tok = normalized[i + 1] if i + 1 < len(normalized) else ""
+        if bare in placeholders and next_tok != "(":
+            rewritten.append(placeholders[bare])
+        else:
+            rewritten.append(tok)
+
+    return CanonicalQuery(key=" ".join(rewritten), aliases=aliases)
+
+
+def estimate_result_bytes(result: Any) -> int:
+    """Estimate the in-memory footprint of a query result (pandas or Arrow)"""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    nbytes = getattr(result, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+    return 0
+
+
+@dataclass
+class _CacheEntry:
+    """Cached result with the aliases of the query that produced it"""
+    result: Any
+    aliases: List[str]
+    size_bytes: int
+
+
+class QueryResultCache:
+    """
+    Thread-safe LRU cache of query results bounded by total result size
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entry_fraction: float = 0.25):
+        """
+        Initialize cache
+
+        Args:
+            max_bytes: Total byte budget for cached results
+            max_entry_fraction: Results larger than this share of the budget are not cached
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self._entries: "OrderedDict[Tuple[str, int, str], _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, canonical: CanonicalQuery, data_version: int,
+            result_format: str = "pandas") -> Optional[Any]:
+        """
+        Look up a result, renaming alias columns to the caller's alias names
+
+        Args:
+            canonical: Canonicalized query
+            data_version: Current dataset version
+            result_format: 'pandas' or 'arrow'; each format is cached separately
+
+        Returns:
+            Cached result or None on a miss
+        """
+        if not canonical.cacheable:
+            return None
+
+        key = (canonical.key, data_version, result_format)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return self._rename_aliases(entry.result, entry.aliases, canonical.aliases)
+
+    def put(self, canonical: CanonicalQuery, data_version: int, result: Any,
+            result_format: str = "pandas"):
+        """Store a result, evicting least recently used entries to stay within budget"""
+        if not canonical.cacheable:
+            return
+
+        size = estimate_result_bytes(result)
+        if size > self.max_entry_bytes:
+            return
+
+        key = (canonical.key, data_version, result_format)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.size_bytes
+
+            # The caller keeps using the result it was given; the cache holds its own copy
+            stored = result.copy() if isinstance(result, pd.DataFrame) else result
+            self._entries[key] = _CacheEntry(result=stored, aliases=list(canonical.aliases), size_bytes=size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size_bytes
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss/eviction counters and current usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    @staticmethod
+    def _rename_aliases(result: Any, stored: List[str], requested: List[str]) -> Any:
+        """Give a cached result the column names the current query asked for"""
+        rename = {old: new for old, new in zip(stored, requested) if old != new}
+
+        if isinstance(result, pd.DataFrame):
+            # Every hit gets its own frame, so in-place edits never reach the cache
+            return result.copy().rename(columns=rename)
+
+        if rename and hasattr(result, "rename_columns"):
+            return result.rename_columns([rename.get(c, c) for c in result.column_names])
+        return result
@@ -0,0 +1,113 @@
+"""
+Per-query wall-clock deadlines for DuckDB
+A single watchdog thread interrupts cursors whose query runs past its deadline
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a query is cancelled for running past its deadline"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        super().__init__(
+            f"Query timed out after {timeout:g}s and was cancelled. "
+            "Rewrite it to scan less data: add filters, aggregate with GROUP BY, "
+            "avoid cross joins and add a LIMIT."
+        )
+
+
+class Deadline:
+    """Deadline of one running query"""
+
+    def __init__(self, cursor, timeout: float):
+        self.cursor = cursor
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.expired = False
+
+
+class QueryWatchdog:
+    """
+    Interrupts queries that outlive their deadline
+
+    Queries register their cursor for the duration of execution; the watchdog
+    thread sleeps until the earliest deadline and calls cursor.interrupt() on
+    anything still registered when it passes.
+    """
+
+    def __init__(self):
+        self._active: Dict[int, Deadline] = {}
+        self._heap = []
+        self._ids = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.timeouts = 0
+
+    @contextmanager
+    def watch(self, cursor, timeout: Optional[float]) -> Iterator[Deadline]:
+        """
+        Enforce a deadline on the query run inside the block
+
+        Args:
+            cursor: DuckDB cursor executing the query
+            timeout: Seconds allowed; None or <= 0 disables the deadline
+
+        Yields:
+            Deadline whose `expired` flag tells whether the query was interrupted
+        """
+        deadline = Deadline(cursor, timeout or 0)
+        if not timeout or timeout <= 0:
+            yield deadline
+            return
+
+        token = next(self._ids)
+        with self._cond:
+            self._active[token] = deadline
+            heapq.heappush(self._heap, (deadline.expires_at, token))
+            self._ensure_thread()
+            self._cond.notify()
+        try:
+            yield deadline
+        finally:
+            # Under the lock, so the cursor is never interrupted after its query finished
+            with self._cond:
+                self._active.pop(token, None)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="query-watchdog", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][1] not in self._active:
+                    heapq.heappop(self._heap)  # finished in time
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                expires_at, token = self._heap[0]
+                remaining = expires_at - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+
+                heapq.heappop(self._heap)
+                deadline = self._active.pop(token)
+                deadline.expired = True
+                self.timeouts += 1
+                try:
+                    deadline.cursor.interrupt()
+                    logger.warning(f"⏱️  Interrupted query after {deadline.timeout:g}s")
+                except Exception as e:
+                    logger.error(f"❌ Could not interrupt query: {e}")
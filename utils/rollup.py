@@ -0,0 +1,497 @@
+"""
+Materialized rollup cube for the sales table
+Pre-aggregates the common analysis dimensions at load time and rewrites matching
+queries to read the rollup instead of scanning the fact table
+"""
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.query_cache import _TOKEN_PATTERN, strip_sql_comments
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLE = "_rollup_sales"
+
+# Grouping dimensions, in the order they appear in the rollup. Columns that are
+# functions of these (quarter of month, is_cancelled of status, ...) add no rows.
+ROLLUP_DIMENSIONS = [
+    "year", "quarter", "month", "month_name", "quarter_name", "state", "category",
+    "status", "is_b2b", "is_cancelled", "is_shipped"
+]
+
+# Numeric columns that may appear inside SUM/AVG/COUNT/MIN/MAX
+ROLLUP_MEASURES = ["revenue", "estimated_profit", "amount", "quantity"]
+
+# Row count of each rollup group
+ROWS_COLUMN = "_rows"
+
+# SQL words allowed outside aggregates. 'date' is deliberately absent: it is a column.
+_SQL_WORDS = {
+    "select", "from", "where", "group", "by", "having", "order", "limit", "offset",
+    "and", "or", "not", "in", "is", "null", "like", "ilike", "between", "case", "when",
+    "then", "else", "end", "as", "asc", "desc", "nulls", "first", "last", "true",
+    "false", "cast", "all", "varchar", "integer", "bigint", "double", "decimal", "float"
+}
+
+# Constructs the rollup cannot answer
+_UNSUPPORTED_WORDS = {
+    "join", "with", "union", "intersect", "except", "over", "distinct", "qualify",
+    "window", "using", "filter", "within", "pivot", "unpivot", "sample", "tablesample"
+}
+
+_AGGREGATES = {"sum", "count", "avg", "min", "max"}
+
+# Row-wise functions that may wrap dimensions or rollup aggregates. Any other
+# call (COUNT_IF, MODE, STDDEV, ...) may be an aggregate that would run over
+# pre-aggregated rows, so it keeps the query on the fact table.
+_SCALAR_FUNCTIONS = {
+    "round", "coalesce", "cast", "try_cast", "nullif", "ifnull", "abs", "floor",
+    "ceil", "ceiling", "trunc", "sign", "sqrt", "power", "pow", "ln", "log", "exp",
+    "greatest", "least", "upper", "lower", "concat", "length", "trim", "substr",
+    "substring", "left", "right", "replace", "lpad", "rpad", "printf", "format"
+}
+
+
+class RollupCube:
+    """
+    Rollup of the sales table grouped by every analysis dimension
+
+    Because the rollup keeps one row per distinct dimension combination (with
+    partial sums, counts, minima and maxima per measure), any query that groups
+    and filters only on those dimensions can be answered from it exactly.
+    """
+
+    def __init__(self, table: str = "sales", name: str = ROLLUP_TABLE):
+        """
+        Initialize cube
+
+        Args:
+            table: Fact table the rollup summarizes
+            name: Name of the rollup table
+        """
+        self.table = table
+        self.name = name
+        self.dimensions: List[str] = []
+        self.measures: List[str] = []
+        self.columns: Set[str] = set()
+        self.row_count = 0
+        self.data_version: Optional[int] = None
+        self.source: Optional[str] = None
+        self.rewrites = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.dimensions)
+
+    def build(self, conn, columns: List[str], data_version: int, source: Optional[str] = None) -> bool:
+        """
+        Create (or replace) the rollup table from the fact table
+
+        Args:
+            conn: DuckDB connection
+            columns: Column names of the fact table
+            data_version: Data version the rollup reflects
+            source: Identity of the data the fact table was loaded from, stored
+                with the rollup so attach() can tell whether it still matches
+
+        Returns:
+            True if the rollup was built
+        """
+        available = set(columns)
+        dimensions = [d for d in ROLLUP_DIMENSIONS if d in available]
+        measures = [m for m in ROLLUP_MEASURES if m in available]
+        if not dimensions or not measures:
+            self.clear(conn)
+            return False
+
+        dims = ", ".join(dimensions)
+
+        try:
+            conn.execute(f"""
+                CREATE OR REPLACE TABLE {self.name} AS
+                SELECT {dims}, {self._aggregate_list(measures)}
+                FROM {self.table}
+                GROUP BY {dims}
+            """)
+            stamp = (source or "").replace("'", "''")
+            conn.execute(f"COMMENT ON TABLE {self.name} IS '{stamp}'")
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        except Exception as e:
+            logger.warning(f"⚠️  Could not build rollup: {e}")
+            self.clear(conn)
+            return False
+
+        with self._lock:
+            self.dimensions, self.measures = dimensions, measures
+            self.columns = {c.lower() for c in columns}
+            self.row_count = row_count
+            self.data_version = data_version
+            self.source = source
+        logger.info(f"✅ Built rollup {self.name}: {row_count:,} rows over {len(dimensions)} dimensions")
+        return True
+
+    @staticmethod
+    def _aggregate_list(measures: List[str]) -> str:
+        """Rollup measure columns computed from fact rows"""
+        aggregates = [f"COUNT(*) AS {ROWS_COLUMN}"]
+        for m in measures:
+            aggregates.extend([
+                f"SUM({m}) AS _sum_{m}",
+                f"COUNT({m}) AS _count_{m}",
+                f"MIN({m}) AS _min_{m}",
+                f"MAX({m}) AS _max_{m}"
+            ])
+        return ", ".join(aggregates)
+
+    def apply_changes(self, conn, inserted: str, removed: Optional[str] = None) -> int:
+        """
+        Update the rollup for rows added to (and removed from) the fact table
+
+        Inserted rows are merged into their groups additively. Removing a row can
+        invalidate a group's minimum or maximum, so groups that lost rows are
+        recomputed from the fact table instead. Run this after the fact table
+        has been changed, inside the same transaction.
+
+        Args:
+            conn: DuckDB connection
+            inserted: Table holding the inserted rows (fact table schema)
+            removed: Optional table holding the removed rows
+
+        Returns:
+            Number of rollup groups touched
+        """
+        if not self.ready:
+            return 0
+
+        dims = ", ".join(self.dimensions)
+        aggregates = self._aggregate_list(self.measures)
+        match = self._same_group
+        touched = 0
+
+        conn.execute("CREATE OR REPLACE TEMP TABLE _rollup_recompute AS SELECT * FROM "
+                     f"(SELECT {dims} FROM {self.name} LIMIT 0)")
+        if removed:
+            conn.execute(f"INSERT INTO _rollup_recompute SELECT DISTINCT {dims} FROM {removed}")
+            conn.execute(f"""
+                DELETE FROM {self.name} r
+                WHERE EXISTS (SELECT 1 FROM _rollup_recompute g WHERE {match('g', 'r')})
+            """)
+            conn.execute(f"""
+                INSERT INTO {self.name}
+                SELECT {dims}, {aggregates}
+                FROM {self.table} f
+                WHERE EXISTS (SELECT 1 FROM _rollup_recompute g WHERE {match('g', 'f')})
+                GROUP BY {dims}
+            """)
+            touched += conn.execute("SELECT COUNT(*) FROM _rollup_recompute").fetchone()[0]
+
+        # Partial aggregates of the new rows, for groups not recomputed above
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _rollup_delta AS
+            SELECT {dims}, {aggregates}
+            FROM {inserted} d
+            WHERE NOT EXISTS (SELECT 1 FROM _rollup_recompute g WHERE {match('g', 'd')})
+            GROUP BY {dims}
+        """)
+
+        merged = [f"SUM({ROWS_COLUMN}) AS {ROWS_COLUMN}"]
+        for m in self.measures:
+            merged.extend([
+                f"SUM(_sum_{m}) AS _sum_{m}",
+                f"SUM(_count_{m}) AS _count_{m}",
+                f"MIN(_min_{m}) AS _min_{m}",
+                f"MAX(_max_{m}) AS _max_{m}"
+            ])
+        conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _rollup_merged AS
+            SELECT {dims}, {', '.join(merged)}
+            FROM (
+                SELECT * FROM {self.name} r
+                WHERE EXISTS (SELECT 1 FROM _rollup_delta d WHERE {match('d', 'r')})
+                UNION ALL
+                SELECT * FROM _rollup_delta
+            )
+            GROUP BY {dims}
+        """)
+        conn.execute(f"""
+            DELETE FROM {self.name} r
+            WHERE EXISTS (SELECT 1 FROM _rollup_delta d WHERE {match('d', 'r')})
+        """)
+        conn.execute(f"INSERT INTO {self.name} BY NAME SELECT * FROM _rollup_merged")
+        touched += conn.execute("SELECT COUNT(*) FROM _rollup_merged").fetchone()[0]
+
+        for temp in ("_rollup_recompute", "_rollup_delta", "_rollup_merged"):
+            conn.execute(f"DROP TABLE IF EXISTS {temp}")
+        self.row_count = conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        return touched
+
+    def _same_group(self, a: str, b: str) -> str:
+        """Join condition matching two relations on every dimension (NULLs included)"""
+        return " AND ".join(f"{a}.{d} IS NOT DISTINCT FROM {b}.{d}" for d in self.dimensions)
+
+    def attach(self, conn, data_version: int, source: Optional[str] = None) -> bool:
+        """
+        Reuse a rollup table persisted in the catalog
+
+        Args:
+            conn: DuckDB connection
+            data_version: Data version the rollup reflects
+            source: Identity of the data the fact table was loaded from; a rollup
+                built from anything else is stale
+
+        Returns:
+            True if an existing rollup of the same source was found
+        """
+        try:
+            stamp = conn.execute(
+                "SELECT comment FROM duckdb_tables() WHERE table_name = ? AND NOT temporary",
+                [self.name]
+            ).fetchone()
+            if stamp is None or not source or stamp[0] != source:
+                return False
+            cols = [row[0] for row in conn.execute(f"DESCRIBE {self.name}").fetchall()]
+            fact_cols = [row[0] for row in conn.execute(f"DESCRIBE {self.table}").fetchall()]
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()[0]
+        except Exception:
+            return False
+
+        dimensions = [c for c in cols if not c.startswith("_")]
+        measures = [c[len("_sum_"):] for c in cols if c.startswith("_sum_")]
+        if not dimensions or not measures or ROWS_COLUMN not in cols:
+            return False
+
+        with self._lock:
+            self.dimensions, self.measures = dimensions, measures
+            self.columns = {c.lower() for c in fact_cols}
+            self.row_count = row_count
+            self.data_version = data_version
+            self.source = source
+        return True
+
+    def clear(self, conn=None):
+        """
+        Stop answering queries from the rollup
+
+        Args:
+            conn: DuckDB connection; when given the rollup table is dropped too,
+                so a stale rollup is never left in the catalog
+        """
+        with self._lock:
+            self.dimensions, self.measures = [], []
+            self.columns = set()
+            self.data_version = None
+            self.source = None
+        if conn is not None:
+            self.drop(conn)
+
+    def drop(self, conn):
+        """Remove the rollup table from the catalog"""
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {self.name}")
+        except Exception as e:
+            logger.warning(f"⚠️  Could not drop rollup {self.name}: {e}")
+
+    def rewrite(self, query: str) -> Optional[str]:
+        """
+        Rewrite a query over the fact table into one over the rollup
+
+        Args:
+            query: SQL query against the fact table
+
+        Returns:
+            Equivalent query against the rollup, or None if the rollup cannot answer it
+        """
+        if not self.ready:
+            return None
+
+        tokens = _TOKEN_PATTERN.findall(strip_sql_comments(query).strip().rstrip(";"))
+        lowered = [t.lower() for t in tokens]
+        if (not tokens or lowered[0] != "select"
+                or lowered.count("select") != 1 or lowered.count("from") != 1
+                or any(t in _UNSUPPORTED_WORDS for t in lowered)
+                or any(t in (";", ".", "?", "$") or t[0] == '"' for t in tokens)):
+            return None
+
+        # Exactly "FROM sales", without a table alias
+        from_idx = lowered.index("from")
+        if from_idx + 1 >= len(tokens) or lowered[from_idx + 1] != self.table:
+            return None
+        if from_idx + 2 < len(tokens) and lowered[from_idx + 2] not in _SQL_WORDS:
+            return None
+
+        dimensions = set(self.dimensions)
+        measures = set(self.measures)
+        aliases = self._select_aliases(tokens, lowered)
+        if aliases & self.columns:
+            # WHERE/GROUP BY resolve such a name to the fact column but to the
+            # alias over the rollup, which lacks that column
+            return None
+
+        out: List[str] = []
+        clause = "select"
+        has_aggregate = False
+        i = 0
+        while i < len(tokens):
+            tok, low = tokens[i], lowered[i]
+            next_tok = tokens[i + 1] if i + 1 < len(tokens) else ""
+
+            if low in _AGGREGATES and next_tok == "(":
+                end = self._closing_paren(tokens, i + 1)
+                if end is None:
+                    return None
+                rewritten = self._rewrite_aggregate(low, tokens[i + 2:end], dimensions, measures)
+                if rewritten is None:
+                    return None
+                out.append(rewritten)
+                has_aggregate = True
+                i = end + 1
+                continue
+
+            if low in ("select", "from", "where", "group", "having", "order", "limit", "offset"):
+                clause = low
+            elif tok == "*" and lowered[i - 1] in ("select", ","):
+                return None  # SELECT * needs every fact column
+            elif tok[0].isalpha() or tok[0] == "_":
+                if i == from_idx + 1:
+                    tok = self.name
+                elif lowered[i - 1] == "as":
+                    pass  # alias definition
+                elif next_tok == "(":
+                    if low not in _SCALAR_FUNCTIONS:
+                        return None  # aggregates only go through _rewrite_aggregate
+                elif low in dimensions or low in _SQL_WORDS:
+                    pass
+                elif low in aliases:
+                    pass  # select-list alias
+                else:
+                    return None  # other fact-table column
+            out.append(tok)
+            i += 1
+
+        if not has_aggregate and "group" not in lowered:
+            return None  # row-level queries need the fact table
+
+        return " ".join(out)
+
+    def _rewrite_aggregate(self, func: str, args: List[str], dimensions, measures) -> Optional[str]:
+        """Re-express one aggregate over the fact table in terms of the rollup columns"""
+        lowered = [a.lower() for a in args]
+
+        if func == "count" and args == ["*"]:
+            return f"COALESCE(SUM({ROWS_COLUMN}), 0)::BIGINT"
+
+        if len(args) == 1 and lowered[0] in measures:
+            m = lowered[0]
+            if func == "sum":
+                return f"SUM(_sum_{m})"
+            if func == "count":
+                return f"COALESCE(SUM(_count_{m}), 0)::BIGINT"
+            if func == "avg":
+                return f"(SUM(_sum_{m}) / NULLIF(SUM(_count_{m}), 0))"
+            return f"{func.upper()}(_{func}_{m})"
+
+        # Expressions over dimensions only, e.g. SUM(CASE WHEN is_cancelled THEN 1 ELSE 0 END)
+        for j, (tok, low) in enumerate(zip(args, lowered)):
+            if tok[0] == "'" or tok[0].isdigit() or not (tok[0].isalpha() or tok[0] == "_"):
+                continue
+            next_tok = args[j + 1] if j + 1 < len(args) else ""
+            if low in _AGGREGATES and next_tok == "(":
+                return None
+            if next_tok == "(":
+                if low in _SCALAR_FUNCTIONS:
+                    continue
+                return None
+            if low in dimensions or low in _SQL_WORDS or (j and lowered[j - 1] == "as"):
+                continue
+            return None
+        if not args:
+            return None
+
+        inner = " ".join(args)
+        if func == "sum":
+            return f"SUM(({inner}) * {ROWS_COLUMN})"
+        if func in ("min", "max"):
+            return f"{func.upper()}({inner})"
+        return None
+
+    @staticmethod
+    def _select_aliases(tokens: List[str], lowered: List[str]) -> Set[str]:
+        """Names defined with AS outside parentheses (CAST's AS names a type)"""
+        aliases = set()
+        depth = 0
+        for i, tok in enumerate(tokens[:-1]):
+            if tok == "(":
+                depth += 1
+            elif tok == ")":
+                depth -= 1
+            elif depth == 0 and lowered[i] == "as":
+                aliases.add(lowered[i + 1])
+        return aliases
+
+    @staticmethod
+    def _closing_paren(tokens: List[str], open_idx: int) -> Optional[int]:
+        """Index of the parenthesis closing the one at open_idx"""
+        depth = 0
+        for j in range(open_idx, len(tokens)):
+            if tokens[j] == "(":
+                depth += 1
+            elif tokens[j] == ")":
+                depth -= 1
+                if depth == 0:
+                    return j
+        return None
+
+    def navigate(self, conn, query: str) -> Tuple[str, bool]:
+        """
+        Route a query to the rollup when it can answer it
+
+        The rewritten query keeps the original column names and types; anything
+        that does not bind identically falls back to the fact table.
+
+        Args:
+            conn: DuckDB connection (or cursor) used to bind the queries
+            query: SQL query against the fact table
+
+        Returns:
+            (query to run, whether it reads the rollup)
+        """
+        rewritten = self.rewrite(query)
+        if rewritten is None:
+            return query, False
+
+        try:
+            original = conn.execute(f"DESCRIBE {query}").fetchall()
+            candidate = conn.execute(f"DESCRIBE {rewritten}").fetchall()
+        except Exception as e:
+            logger.debug(f"Rollup rewrite did not bind: {e}")
+            self._count(rewritten=False)
+            return query, False
+
+        if [row[1] for row in original] != [row[1] for row in candidate]:
+            self._count(rewritten=False)
+            return query, False
+
+        names = ", ".join('"' + row[0].replace('"', '""') + '"' for row in original)
+        self._count(rewritten=True)
+        return f"SELECT * FROM ({rewritten}) AS _rollup({names})", True
+
+    def _count(self, rewritten: bool):
+        with self._lock:
+            if rewritten:
+                self.rewrites += 1
+            else:
+                self.fallbacks += 1
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get rollup size and how often queries were answered from it"""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "rows": self.row_count,
+                "dimensions": list(self.dimensions),
+                "rewrites": self.rewrites,
+                "fallbacks": self.fallbacks
+            }
@@ -0,0 +1,219 @@
+"""
+Streaming query results
+Lazy result handle over DuckDB record batches for results too large to materialize
+"""
+import logging
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import pyarrow as pa
+
+from utils.query_timeout import QueryTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingResult:
+    """
+    Lazy handle to a query result
+
+    Nothing is fetched until asked for: the row count and numeric summaries are
+    computed by DuckDB over the query, rows are pulled batch by batch with
+    fetch_record_batch, and the full result can be spilled to Parquet without
+    passing through Python memory.
+    """
+
+    def __init__(self, conn, query: str, batch_size: int = 65536, pool=None,
+                 watchdog=None, timeout: Optional[float] = None):
+        """
+        Initialize result handle
+
+        Args:
+            conn: DuckDB connection the query runs on
+            query: SELECT query producing the result
+            batch_size: Rows per record batch when iterating
+            pool: Optional CursorPool; when given, every query borrows a pooled cursor
+            watchdog: Optional QueryWatchdog enforcing timeout on every query
+            timeout: Seconds each query, and each batch fetch, may run (None or <= 0
+                for no deadline); Parquet exports run without one
+        """
+        self.conn = conn
+        self.pool = pool
+        self.watchdog = watchdog
+        self.timeout = timeout
+        self.query = query.strip().rstrip(";")
+        self.batch_size = batch_size
+        self._row_count: Optional[int] = None
+        self._schema: Optional[pa.Schema] = None
+
+    @property
+    def row_count(self) -> int:
+        """Total number of rows, counted by DuckDB without fetching them"""
+        if self._row_count is None:
+            with self._cursor() as cursor:
+                self._row_count = cursor.execute(
+                    f"SELECT COUNT(*) FROM ({self.query}) AS _streamed"
+                ).fetchone()[0]
+        return self._row_count
+
+    @property
+    def schema(self) -> pa.Schema:
+        """Arrow schema of the result"""
+        if self._schema is None:
+            with self._cursor() as cursor:
+                self._schema = cursor.execute(
+                    f"SELECT * FROM ({self.query}) AS _streamed LIMIT 0"
+                ).fetch_arrow_table().schema
+        return self._schema
+
+    @property
+    def columns(self) -> List[str]:
+        """Result column names"""
+        return self.schema.names
+
+    @contextmanager
+    def _cursor(self):
+        """
+        Borrow a cursor for one query, interrupted when it runs past the deadline
+
+        Raises:
+            QueryTimeoutError: If the watchdog interrupted the query
+        """
+        with self._borrow() as cursor, self._deadline(cursor):
+            yield cursor
+
+    @contextmanager
+    def _deadline(self, cursor):
+        """
+        Interrupt the DuckDB work done inside the block when it runs past the timeout
+
+        Raises:
+            QueryTimeoutError: If the watchdog interrupted it
+        """
+        if self.watchdog is None:
+            yield
+            return
+        with self.watchdog.watch(cursor, self.timeout) as deadline:
+            try:
+                yield
+            except Exception as e:
+                if deadline.expired:
+                    raise QueryTimeoutError(deadline.timeout) from e
+                raise
+
+    @contextmanager
+    def _borrow(self):
+        """Borrow a cursor of its own, so other queries don't invalidate an open stream"""
+        if self.pool is not None:
+            with self.pool.cursor() as cursor:
+                yield cursor
+        else:
+            cursor = self.conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        """
+        Iterate over the result one record batch at a time
+
+        Holds one cursor until exhausted. The deadline applies to starting the
+        query and to each batch fetch, not to the time the caller spends between
+        batches.
+        """
+        with self._borrow() as cursor:
+            with self._deadline(cursor):
+                batches = iter(cursor.execute(self.query).fetch_record_batch(self.batch_size))
+            while True:
+                with self._deadline(cursor):
+                    batch = next(batches, None)
+                if batch is None:
+                    return
+                yield batch
+
+    def head(self, n: int = 100) -> pa.Table:
+        """
+        First n rows as a pyarrow.Table, reading only as many batches as needed
+
+        Args:
+            n: Number of rows
+
+        Returns:
+            pyarrow.Table with at most n rows
+        """
+        batches, rows = [], 0
+        # closing() returns the cursor as soon as enough rows are read
+        with closing(self.iter_batches()) as stream:
+            for batch in stream:
+                batches.append(batch)
+                rows += batch.num_rows
+                if rows >= n:
+                    break
+
+        if not batches:
+            return self.schema.empty_table()
+        return pa.Table.from_batches(batches).slice(0, n)
+
+    def numeric_summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Count, sum, mean, min and max of every numeric column, computed in one DuckDB pass
+
+        Returns:
+            Dict mapping column name to its statistics
+        """
+        numeric_cols = [
+            field.name for field in self.schema
+            if pa.types.is_integer(field.type)
+            or pa.types.is_floating(field.type)
+            or pa.types.is_decimal(field.type)
+        ]
+        if not numeric_cols:
+            return {}
+
+        aggregates = []
+        for i, col in enumerate(numeric_cols):
+            quoted = '"' + col.replace('"', '""') + '"'
+            aggregates.append(
+                f"COUNT({quoted}) AS c{i}, SUM({quoted})::DOUBLE AS s{i}, AVG({quoted})::DOUBLE AS a{i}, "
+                f"MIN({quoted})::DOUBLE AS lo{i}, MAX({quoted})::DOUBLE AS hi{i}"
+            )
+        with self._cursor() as cursor:
+            row = cursor.execute(
+                f"SELECT {', '.join(aggregates)} FROM ({self.query}) AS _streamed"
+            ).fetchone()
+
+        summary = {}
+        for i, col in enumerate(numeric_cols):
+            count, total, mean, low, high = row[i * 5:(i + 1) * 5]
+            summary[col] = {"count": count, "sum": total, "mean": mean, "min": low, "max": high}
+        return summary
+
+    def to_parquet(self, path: str, compression: str = "snappy") -> str:
+        """
+        Spill the full result to a Parquet file inside DuckDB
+
+        Exports are not subject to the query timeout: writing out a large result
+        legitimately takes longer than an interactive query may.
+
+        Args:
+            path: Output file path
+            compression: Parquet compression codec
+
+        Returns:
+            The output path
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        escaped = str(path).replace("'", "''")
+        with self._borrow() as cursor:
+            cursor.execute(
+                f"COPY ({self.query}) TO '{escaped}' (FORMAT PARQUET, COMPRESSION '{compression}')"
+            )
+        logger.info(f"💾 Spilled query result to {path}")
+        return str(path)
+
+    def to_arrow(self) -> pa.Table:
+        """Materialize the whole result; only for results known to be small"""
+        return pa.Table.from_batches(list(self.iter_batches()), schema=self.schema)
+